@@ -0,0 +1,219 @@
+import asyncio
+import math
+from typing import Dict, List, Optional, Tuple, Any
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from models import get_db, User, StudyStats, UserProgress
+from auth import get_admin_user, invalidate_user, revoke_user_tokens
+from schemas import UserResponse
+from aggregates import TRAITS, STUDY_STATS_ID, current_revision
+from http_cache import make_etag, etag_matches, not_modified, cache_headers
+from responses import json_response
+from export import EXPORT_FORMATS, check_format, stream_export
+
+router = APIRouter(
+    prefix="/api/admin",
+    tags=["Admin"]
+)
+
+# --- Pydantic Schemas ---
+
+class TraitSummary(BaseModel):
+    n: int
+    mean: Optional[float] = None
+    sd: Optional[float] = None
+
+class AnnotatorProgress(BaseModel):
+    user_id: int
+    username: str
+    full_name: str
+    assigned_count: int
+    submitted_count: int
+    completion_rate: float
+
+class ProgressResponse(BaseModel):
+    revision: int
+    assigned_count: int
+    submitted_count: int
+    completion_rate: float
+    scores: Dict[str, TraitSummary]
+    annotators: List[AnnotatorProgress]
+
+class StatsResponse(BaseModel):
+    revision: int
+    n_ratings: int
+    traits: Dict[str, Dict[str, Any]]  # validate_stats.trait_statistics 결과 (계산 불가 값은 null)
+    evidence: Dict[str, Dict[str, Any]] = {}  # evidence_stats.evidence_report 결과 (근거 문장 일치도)
+
+# --- Memoization ---
+# 이름 -> (집계 revision, 결과). 제출/수정이 커밋되면 revision이 바뀌므로 다음 요청에서 다시 계산
+_report_cache: Dict[str, Tuple[int, Any]] = {}
+_report_locks: Dict[str, asyncio.Lock] = {}
+
+async def _memoized(name: str, revision: int, compute):
+    cached = _report_cache.get(name)
+    if cached and cached[0] == revision:
+        return cached[1]
+    # 같은 보고서를 동시에 여러 번 계산하지 않도록 이름별로 직렬화
+    lock = _report_locks.setdefault(name, asyncio.Lock())
+    async with lock:
+        cached = _report_cache.get(name)
+        if cached and cached[0] == revision:
+            return cached[1]
+        result = await compute()
+        _report_cache[name] = (revision, result)
+        return result
+
+def _rate(submitted: int, assigned: int) -> float:
+    return submitted / assigned if assigned else 0.0
+
+def _trait_summary(stats: Optional[StudyStats], trait: str) -> TraitSummary:
+    if stats is None:
+        return TraitSummary(n=0)
+    n, total, squares = (getattr(stats, f"{prefix}_{trait}") for prefix in ("n", "sum", "sumsq"))
+    if not n:
+        return TraitSummary(n=0)
+    mean = total / n
+    sd = math.sqrt(max(squares - n * mean * mean, 0) / (n - 1)) if n > 1 else None
+    return TraitSummary(n=n, mean=mean, sd=sd)
+
+def _finite_or_none(value):
+    return value if not isinstance(value, float) or math.isfinite(value) else None
+
+# --- Endpoints ---
+
+@router.get("/progress", response_model=ProgressResponse)
+async def get_progress(
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    admin: UserResponse = Depends(get_admin_user)
+):
+    """평가자별 진행률과 영역별 평균 점수 (집계 테이블만 조회)"""
+    revision = await current_revision(db)
+    etag = make_etag("progress", revision)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    async def compute():
+        stats = await db.get(StudyStats, STUDY_STATS_ID)
+        rows = (await db.execute(select(
+            User.id, User.username, User.full_name, UserProgress.assigned_count, UserProgress.submitted_count
+        ).select_from(UserProgress).join(User, UserProgress.user_id == User.id).order_by(UserProgress.user_id))).all()
+        assigned = stats.assigned_count if stats else 0
+        submitted = stats.submitted_count if stats else 0
+        return ProgressResponse(
+            revision=revision,
+            assigned_count=assigned,
+            submitted_count=submitted,
+            completion_rate=_rate(submitted, assigned),
+            scores={trait: _trait_summary(stats, trait) for trait in TRAITS},
+            annotators=[
+                AnnotatorProgress(
+                    user_id=row.id, username=row.username, full_name=row.full_name,
+                    assigned_count=row.assigned_count, submitted_count=row.submitted_count,
+                    completion_rate=_rate(row.submitted_count, row.assigned_count),
+                )
+                for row in rows
+            ],
+        )
+
+    response = json_response(await _memoized("progress", revision, compute))
+    response.headers.update(cache_headers(etag))
+    return response
+
+@router.get("/stats", response_model=StatsResponse)
+async def get_stats(
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    admin: UserResponse = Depends(get_admin_user)
+):
+    """
+    validate_stats.py의 평가자 일치도/타당성 지표 (점추정치)와 evidence_stats.py의 근거 문장 일치도.
+    제출 데이터가 바뀔 때만 다시 계산
+    """
+    revision = await current_revision(db)
+    etag = make_etag("stats", revision)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    try:
+        import pandas as pd
+        import validate_stats
+        import evidence_stats
+    except ImportError as e:
+        raise HTTPException(status_code=503, detail=f"통계 패키지가 설치되어 있지 않습니다. ({e.name})")
+
+    async def compute():
+        def load(session):
+            result = session.execute(text(validate_stats.SUBMITTED_SCORES_QUERY))
+            df = pd.DataFrame(result.fetchall(), columns=list(result.keys()))
+            evidence = evidence_stats.evidence_data(
+                session.execute(text(evidence_stats.SUBMITTED_ANNOTATIONS_QUERY)).fetchall(),
+                session.execute(text(evidence_stats.SUBMITTED_SELECTIONS_QUERY)).fetchall()
+            )
+            return df, evidence
+        df, evidence = await db.run_sync(load)
+
+        def finite(report):
+            return {
+                trait: {name: _finite_or_none(value) for name, value in values.items()}
+                for trait, values in report.items()
+            }
+
+        # 분석은 CPU 작업이므로 이벤트 루프 밖에서 실행
+        traits = {} if df.empty else finite(await run_in_threadpool(validate_stats.agreement_report, df))
+        evidence_report = {} if not len(evidence['essay_ids']) else \
+            finite(await run_in_threadpool(evidence_stats.evidence_report, evidence))
+        return StatsResponse(revision=revision, n_ratings=len(df), traits=traits, evidence=evidence_report)
+
+    response = json_response(await _memoized("stats", revision, compute))
+    response.headers.update(cache_headers(etag))
+    return response
+
+@router.get("/export")
+async def export_annotations(
+    format: str = Query("csv", description="csv | jsonl | parquet"),
+    include_unsubmitted: bool = Query(False, description="제출되지 않은 어노테이션도 포함"),
+    admin: UserResponse = Depends(get_admin_user)
+):
+    """어노테이션 + 에세이 메타데이터 스트리밍 내보내기 (chunk 단위로 읽고 바로 전송)"""
+    try:
+        check_format(format)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return StreamingResponse(
+        stream_export(format, include_unsubmitted),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="annotations.{format}"'},
+    )
+
+async def _require_user(db, user_id):
+    if await db.scalar(select(User.id).where(User.id == user_id)) is None:
+        raise HTTPException(status_code=404, detail="사용자를 찾을 수 없습니다.")
+
+@router.post("/users/{user_id}/revoke")
+async def revoke_tokens(
+    user_id: int,
+    db: AsyncSession = Depends(get_db),
+    admin: UserResponse = Depends(get_admin_user)
+):
+    """해당 사용자에게 지금까지 발급된 모든 토큰을 폐기 (다시 로그인해야 함)"""
+    await _require_user(db, user_id)
+    await revoke_user_tokens(db, user_id)
+    return {"message": "토큰을 폐기했습니다.", "user_id": user_id}
+
+@router.post("/users/{user_id}/refresh")
+async def refresh_user(
+    user_id: int,
+    db: AsyncSession = Depends(get_db),
+    admin: UserResponse = Depends(get_admin_user)
+):
+    """users 테이블에서 이름 등을 바꾼 뒤 호출: 기존 토큰도 다음 요청부터 DB의 사용자 정보를 사용"""
+    await _require_user(db, user_id)
+    invalidate_user(user_id)
+    return {"message": "사용자 정보를 다시 읽습니다.", "user_id": user_id}
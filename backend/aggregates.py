@@ -0,0 +1,194 @@
+"""
+집계 테이블 증분 갱신
+
+제출/수정 핸들러는 변경 전후의 어노테이션 상태를 AggregateChanges에 기록하고, 커밋 직전에
+apply()로 차이만큼 UPSERT 합니다. 어노테이션 변경과 같은 트랜잭션에서 반영되므로
+집계 값이 실제 데이터와 어긋나지 않고, 진행률·평균 점수 조회는 행 하나만 읽습니다.
+
+집계 기준: 제출된(is_submitted) 어노테이션의 NULL이 아닌 점수만 포함합니다.
+
+사용 예 (전체 재계산):
+    python aggregates.py
+"""
+from collections import defaultdict
+from sqlalchemy import select, delete, func, case, literal, insert
+from sqlalchemy.dialects.sqlite import insert as upsert
+
+from models import (
+    SessionLocal, Essay, Annotation,
+    StudyStats, UserProgress, EssayScoreStats, QuestionScoreHistogram
+)
+
+TRAITS = ("language", "organization", "content", "ai_feedback")
+STUDY_STATS_ID = 1
+
+def annotation_state(annotation):
+    """집계에 영향을 주는 어노테이션 상태 스냅샷 (변경 전/후 비교용)"""
+    return {
+        "submitted": bool(annotation.is_submitted),
+        "scores": {trait: getattr(annotation, f"score_{trait}") for trait in TRAITS},
+    }
+
+def _contribution(state):
+    if not state or not state["submitted"]:
+        return {}
+    return {trait: score for trait, score in state["scores"].items() if score is not None}
+
+def _score_delta(target, trait, score, sign):
+    target[f"n_{trait}"] += sign
+    target[f"sum_{trait}"] += sign * score
+    target[f"sumsq_{trait}"] += sign * score * score
+
+class AggregateChanges:
+    """한 트랜잭션 안의 집계 변경분 누적 (같은 키는 합산되어 UPSERT 한 번으로 반영)"""
+
+    def __init__(self):
+        self.study = defaultdict(int)
+        self.users = defaultdict(lambda: defaultdict(int))
+        self.essays = defaultdict(lambda: defaultdict(int))
+        self.histograms = defaultdict(int)  # (essay_id, trait, score) -> delta
+
+    def record(self, user_id, essay_id, before, after):
+        """before가 None이면 새로 할당된 어노테이션"""
+        if before is None:
+            self.study["assigned_count"] += 1
+            self.users[user_id]["assigned_count"] += 1
+        submitted_delta = int(after["submitted"]) - int(bool(before and before["submitted"]))
+        if submitted_delta:
+            self.study["submitted_count"] += submitted_delta
+            self.users[user_id]["submitted_count"] += submitted_delta
+
+        old, new = _contribution(before), _contribution(after)
+        for trait in TRAITS:
+            if old.get(trait) == new.get(trait):
+                continue
+            for score, sign in ((old.get(trait), -1), (new.get(trait), 1)):
+                if score is None:
+                    continue
+                _score_delta(self.study, trait, score, sign)
+                _score_delta(self.essays[essay_id], trait, score, sign)
+                self.histograms[(essay_id, trait, score)] += sign
+
+    def statements(self, question_keys):
+        """question_keys: essay_id -> (filename, q_id)"""
+        def increment(model, key_values, deltas):
+            deltas = {k: v for k, v in deltas.items() if v}
+            if not deltas:
+                return None
+            table = model.__table__
+            return upsert(model).values(**key_values, **deltas).on_conflict_do_update(
+                index_elements=list(key_values),
+                set_={k: table.c[k] + v for k, v in deltas.items()},
+            )
+
+        # revision은 점수 변화가 없는 수정(선택 문장 등)에도 증가시켜 캐시를 무효화
+        statements = [increment(StudyStats, {"id": STUDY_STATS_ID}, {**self.study, "revision": 1})]
+        statements += [increment(UserProgress, {"user_id": uid}, d) for uid, d in self.users.items()]
+        statements += [increment(EssayScoreStats, {"essay_id": eid}, d) for eid, d in self.essays.items()]
+
+        histograms = defaultdict(int)
+        for (essay_id, trait, score), delta in self.histograms.items():
+            filename, q_id = question_keys.get(essay_id, ("", ""))
+            histograms[(filename, q_id, trait, score)] += delta
+        statements += [
+            increment(QuestionScoreHistogram,
+                      {"filename": filename, "q_id": q_id, "trait": trait, "score": score},
+                      {"count": delta})
+            for (filename, q_id, trait, score), delta in histograms.items()
+        ]
+        return [stmt for stmt in statements if stmt is not None]
+
+    def _histogram_essay_ids(self):
+        return sorted({essay_id for (essay_id, _, _), delta in self.histograms.items() if delta})
+
+    def _question_keys_query(self):
+        essay_ids = self._histogram_essay_ids()
+        return select(Essay.id, Essay.filename, Essay.q_id).where(Essay.id.in_(essay_ids)) if essay_ids else None
+
+    async def apply(self, db):
+        """AsyncSession / ThreadedSession: 커밋 전에 호출 (커밋은 호출한 쪽에서)"""
+        query = self._question_keys_query()
+        rows = (await db.execute(query)).all() if query is not None else []
+        for stmt in self.statements({row.id: (row.filename or "", row.q_id or "") for row in rows}):
+            await db.execute(stmt)
+
+    def apply_sync(self, db):
+        """동기 Session용 apply (init_db.py 등 스크립트)"""
+        query = self._question_keys_query()
+        rows = db.execute(query).all() if query is not None else []
+        for stmt in self.statements({row.id: (row.filename or "", row.q_id or "") for row in rows}):
+            db.execute(stmt)
+
+def _trait_sum_columns(submitted):
+    """trait별 (n, sum, sumsq) 집계식. submitted가 거짓인 행과 NULL 점수는 제외"""
+    columns = {}
+    for trait in TRAITS:
+        score = getattr(Annotation, f"score_{trait}")
+        counted = case((submitted & score.isnot(None), score))
+        columns[f"n_{trait}"] = func.count(counted)
+        columns[f"sum_{trait}"] = func.coalesce(func.sum(counted), 0)
+        columns[f"sumsq_{trait}"] = func.coalesce(func.sum(counted * counted), 0)
+    return columns
+
+def rebuild_aggregates(db):
+    """어노테이션 테이블에서 모든 집계를 다시 계산 (동기 Session, 커밋하지 않음)"""
+    revision = db.scalar(select(StudyStats.revision).where(StudyStats.id == STUDY_STATS_ID)) or 0
+    for model in (StudyStats, UserProgress, EssayScoreStats, QuestionScoreHistogram):
+        db.execute(delete(model))
+
+    submitted = Annotation.is_submitted == True
+    submitted_count = func.coalesce(func.sum(case((submitted, 1), else_=0)), 0)
+    trait_columns = _trait_sum_columns(submitted)
+
+    study = select(
+        literal(STUDY_STATS_ID), literal(revision + 1), func.count(Annotation.id), submitted_count, *trait_columns.values()
+    )
+    db.execute(insert(StudyStats).from_select(
+        ["id", "revision", "assigned_count", "submitted_count", *trait_columns], study
+    ))
+    db.execute(insert(UserProgress).from_select(
+        ["user_id", "assigned_count", "submitted_count"],
+        select(Annotation.user_id, func.count(Annotation.id), submitted_count).group_by(Annotation.user_id)
+    ))
+    db.execute(insert(EssayScoreStats).from_select(
+        ["essay_id", *trait_columns],
+        select(Annotation.essay_id, *trait_columns.values()).where(submitted).group_by(Annotation.essay_id)
+    ))
+    for trait in TRAITS:
+        score = getattr(Annotation, f"score_{trait}")
+        filename, q_id = func.coalesce(Essay.filename, ""), func.coalesce(Essay.q_id, "")
+        db.execute(insert(QuestionScoreHistogram).from_select(
+            ["filename", "q_id", "trait", "score", "count"],
+            select(filename, q_id, literal(trait), score, func.count())
+            .join(Essay, Annotation.essay_id == Essay.id)
+            .where(submitted, score.isnot(None))
+            .group_by(filename, q_id, score)
+        ))
+
+async def current_revision(db):
+    """집계 revision (행 하나 조회). 캐시 키로 사용"""
+    return await db.scalar(select(StudyStats.revision).where(StudyStats.id == STUDY_STATS_ID)) or 0
+
+def ensure_aggregates():
+    """집계 테이블이 비어 있으면 (기존 DB에 처음 추가된 경우) 한 번 재계산"""
+    db = SessionLocal()
+    try:
+        if db.get(StudyStats, STUDY_STATS_ID) is None:
+            rebuild_aggregates(db)
+            db.commit()
+            return True
+        return False
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    from migrations import upgrade
+    upgrade()
+    db = SessionLocal()
+    try:
+        rebuild_aggregates(db)
+        db.commit()
+        stats = db.get(StudyStats, STUDY_STATS_ID)
+        print(f"✓ Aggregates rebuilt: {stats.submitted_count}/{stats.assigned_count} annotations submitted.")
+    finally:
+        db.close()
@@ -1,11 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List, Optional
-from pydantic import BaseModel, Field
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from sqlalchemy import select, update, bindparam
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Any, List, Optional
+from pydantic import BaseModel, Field, field_validator
 
-from models import get_db, Annotation, Essay, User
+from models import get_db, Annotation, Essay, EssaySentence, Question
 from auth import get_current_user
-from schemas import BlindAnnotationInfo
+from schemas import BlindAnnotationInfo, UserResponse, EssayDetail, AnnotationResponse, TraitAnnotation
+from sentences import SPLITTER_VERSION, split_sentences
+from http_cache import make_etag, etag_matches, not_modified, cache_headers
+from responses import json_response
+from aggregates import TRAITS, AggregateChanges, annotation_state
+from drafts import draft_buffer
+from selections import SELECTION_TRAITS, parse_selection, load_selections, replace_selections
 
 router = APIRouter(
     prefix="/api/annotations",
@@ -29,7 +36,26 @@ class EvaluationTaskResponse(BaseModel):
     question: str
     content: str  # 평가해야 할 에세이 본문
 
-class EvaluationSubmitRequest(BaseModel):
+class WorkspaceResponse(BaseModel):
+    blind_id: str
+    display_order: int
+    essay: EssayDetail  # 블라인드 처리된 에세이 (문장 분리 포함)
+    evidence: Optional[Any] = None  # 질문별 참고자료 JSON 배열 (questions 테이블에서 JOIN)
+    annotation: AnnotationResponse  # 현재까지 저장된 평가 상태
+
+class SelectionInput(BaseModel):
+    """selected_sentences_* 필드(JSON 배열 문자열) 형식 검사"""
+    @field_validator(*(f"selected_sentences_{trait}" for trait in SELECTION_TRAITS), check_fields=False)
+    @classmethod
+    def check_selection(cls, value):
+        if value is not None:
+            try:
+                parse_selection(value)
+            except (TypeError, ValueError):
+                raise ValueError("선택 문장은 0 이상의 정수 배열(JSON)이어야 합니다.")
+        return value
+
+class EvaluationSubmitRequest(SelectionInput):
     score_language: int = Field(..., ge=1, le=5)
     selected_sentences_language: Optional[str] = None
     
@@ -41,46 +67,109 @@ class EvaluationSubmitRequest(BaseModel):
     
     score_ai_feedback: int = Field(..., ge=1, le=5)
 
+class DraftRequest(SelectionInput):
+    """임시 저장: 보낸 필드만 이전 draft에 덮어씀"""
+    score_language: Optional[int] = Field(None, ge=1, le=5)
+    selected_sentences_language: Optional[str] = None
+    
+    score_organization: Optional[int] = Field(None, ge=1, le=5)
+    selected_sentences_organization: Optional[str] = None
+    
+    score_content: Optional[int] = Field(None, ge=1, le=5)
+    selected_sentences_content: Optional[str] = None
+    
+    score_ai_feedback: Optional[int] = Field(None, ge=1, le=5)
+
+class BatchSubmitItem(EvaluationSubmitRequest):
+    blind_id: str
+
+class BatchSubmitRequest(BaseModel):
+    items: List[BatchSubmitItem] = Field(..., min_length=1, max_length=500)
+
+class BatchItemResult(BaseModel):
+    blind_id: str
+    status: str  # submitted | not_found | already_submitted | duplicate
+    detail: Optional[str] = None
+
+class BatchSubmitResponse(BaseModel):
+    submitted_count: int
+    results: List[BatchItemResult]
+
+# --- Helpers ---
+
+def build_annotation_response(
+    annotation: Annotation, selections: Optional[dict] = None, draft: Optional[dict] = None
+) -> AnnotationResponse:
+    """
+    ORM Annotation + 선택 문장(load_selections 결과의 한 항목)을 trait 단위 응답 형태로 변환.
+    draft가 있으면 아직 기록되지 않은 임시 저장 값을 우선합니다.
+    """
+    selections = selections or {}
+
+    def value(column):
+        return draft[column] if draft and column in draft else getattr(annotation, column)
+
+    def trait(name):
+        column = f"selected_sentences_{name}"
+        return TraitAnnotation(
+            score=value(f"score_{name}"),
+            selected_sentences=parse_selection(draft[column]) if draft and column in draft else selections.get(name, [])
+        )
+
+    return AnnotationResponse(
+        id=annotation.id,
+        essay_id=annotation.essay_id,
+        language=trait("language"),
+        organization=trait("organization"),
+        content=trait("content"),
+        ai_feedback_score=value("score_ai_feedback"),
+        is_submitted=annotation.is_submitted,
+        version=annotation.version
+    )
+
 # --- API Endpoints ---
 
 @router.get("/pending", response_model=List[PendingAnnotationResponse])
-def get_pending_evaluations(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+async def get_pending_evaluations(
+    db: AsyncSession = Depends(get_db),
+    current_user: UserResponse = Depends(get_current_user)
 ):
     """
     현재 로그인한 평가자에게 할당된 평가 대기 목록을 display_order 순서대로 반환합니다.
     """
-    annotations = db.query(Annotation).join(Essay).filter(
+    rows = (await db.execute(select(
+        Annotation.blind_id, Annotation.display_order, Essay.question, Annotation.is_submitted
+    ).join(Essay, Annotation.essay_id == Essay.id).where(
         Annotation.user_id == current_user.id,
         Annotation.is_submitted == False
-    ).order_by(Annotation.display_order.asc()).all()
+    ).order_by(Annotation.display_order.asc()))).all()
     
-    result = []
-    for ann in annotations:
-        result.append({
-            "blind_id": ann.blind_id,
-            "display_order": ann.display_order,
-            "question": ann.essay.question,
-            "is_submitted": ann.is_submitted
-        })
-        
-    return result
+    return [
+        {
+            "blind_id": row.blind_id,
+            "display_order": row.display_order,
+            "question": row.question,
+            "is_submitted": row.is_submitted
+        }
+        for row in rows
+    ]
 
 @router.get("/blind-ids", response_model=List[BlindAnnotationInfo])
-def get_blind_annotation_ids(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+async def get_blind_annotation_ids(
+    current_user: UserResponse = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """
     현재 사용자의 모든 블라인드 ID와 에세이 ID 매핑 정보를 반환합니다.
     """
-    annotations = db.query(Annotation).filter(
+    rows = (await db.execute(select(
+        Annotation.blind_id, Annotation.display_order, Annotation.essay_id
+    ).where(
         Annotation.user_id == current_user.id
-    ).order_by(Annotation.display_order).all()
+    ).order_by(Annotation.display_order))).all()
 
     blind_infos = []
-    for annotation in annotations:
+    for annotation in rows:
         blind_infos.append(BlindAnnotationInfo(
             blind_id=annotation.blind_id,
             display_order=annotation.display_order,
@@ -88,46 +177,203 @@ def get_blind_annotation_ids(
         ))
     return blind_infos
 
+@router.get("/{blind_id}/workspace", response_model=WorkspaceResponse)
+async def get_workspace(
+    blind_id: str,
+    db: AsyncSession = Depends(get_db),
+    current_user: UserResponse = Depends(get_current_user)
+):
+    """
+    평가 화면에 필요한 에세이, 문장 목록, 질문별 참고자료, 현재 평가 상태를 한 번의 요청으로 반환합니다.
+    """
+    # 어노테이션 + 에세이 + 문장 인덱스를 하나의 JOIN 쿼리로 조회 (문장 수만큼 행이 생성됨)
+    rows = (await db.execute(select(
+        Annotation, Essay, Question.evidence, EssaySentence.text, EssaySentence.splitter_version
+    ).join(
+        Essay, Annotation.essay_id == Essay.id
+    ).outerjoin(
+        Question, Essay.question_id == Question.id
+    ).outerjoin(
+        EssaySentence, EssaySentence.essay_id == Essay.id
+    ).where(
+        Annotation.blind_id == blind_id,
+        Annotation.user_id == current_user.id
+    ).order_by(EssaySentence.idx.asc()))).all()
+
+    if not rows:
+        raise HTTPException(status_code=404, detail="해당 평가 문항을 찾을 수 없거나 권한이 없습니다.")
+
+    annotation, essay, evidence = rows[0][0], rows[0][1], rows[0][2]
+    if all(text is not None and version == SPLITTER_VERSION for *_, text, version in rows):
+        sentences = [text for *_, text, _ in rows]
+    else:
+        # 인덱스가 없거나 오래된 경우 저장하지 않고 메모리에서 분리 (인덱스는 서버 시작 시 생성)
+        sentences = split_sentences(essay.content)
+
+    return json_response(WorkspaceResponse(
+        blind_id=annotation.blind_id,
+        display_order=annotation.display_order,
+        essay=EssayDetail(
+            id=essay.id,
+            title=f"평가 문항 #{annotation.display_order}",
+            content=essay.content,
+            question=essay.question,
+            sentences=sentences,
+            summary=essay.summary,
+            paper_id=essay.paper_id,
+            question_id=essay.question_id,
+            blind_id=annotation.blind_id
+        ),
+        evidence=evidence,
+        annotation=build_annotation_response(
+            annotation,
+            (await load_selections(db, [annotation.id]))[annotation.id],
+            draft_buffer.get(current_user.id, annotation.blind_id)
+        )
+    ), raw_fields=("evidence", "essay.summary"))
+
+@router.put("/{blind_id}/draft", status_code=status.HTTP_202_ACCEPTED)
+async def save_draft(
+    blind_id: str,
+    payload: DraftRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user: UserResponse = Depends(get_current_user)
+):
+    """
+    작성 중인 평가를 임시 저장합니다. 메모리 버퍼에 병합해 두었다가 주기적으로 한 번에 기록하므로
+    요청마다 커밋하지 않습니다. 버퍼에 이미 있는 문항은 DB를 조회하지 않습니다.
+    """
+    if not draft_buffer.contains(current_user.id, blind_id):
+        row = (await db.execute(select(Annotation.is_submitted).where(
+            Annotation.blind_id == blind_id,
+            Annotation.user_id == current_user.id
+        ))).first()
+        if not row:
+            raise HTTPException(status_code=404, detail="해당 평가 문항을 찾을 수 없거나 권한이 없습니다.")
+        if row.is_submitted:
+            raise HTTPException(status_code=400, detail="이미 제출이 완료된 문항입니다.")
+
+    draft_buffer.put(current_user.id, blind_id, payload.model_dump(exclude_unset=True))
+    return {"message": "임시 저장되었습니다.", "blind_id": blind_id}
+
+@router.post("/batch", response_model=BatchSubmitResponse)
+async def submit_evaluations_batch(
+    payload: BatchSubmitRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user: UserResponse = Depends(get_current_user)
+):
+    """
+    여러 문항의 평가 결과를 한 트랜잭션으로 제출합니다. (PUT /{blind_id}를 여러 번 호출하는 것과 같은 결과)
+    조회 1회 + executemany UPDATE 1회 + 커밋 1회로 처리하며, 문항별 결과를 요청 순서대로 반환합니다.
+    제출할 수 없는 문항(없음/이미 제출/중복)은 건너뛰고 나머지는 제출됩니다.
+    """
+    blind_ids = [item.blind_id for item in payload.items]
+    annotations = {
+        annotation.blind_id: annotation
+        for annotation in (await db.execute(select(Annotation).where(
+            Annotation.blind_id.in_(blind_ids),
+            Annotation.user_id == current_user.id
+        ))).scalars()
+    }
+
+    results, rows, seen, selection_changes = [], [], set(), []
+    changes = AggregateChanges()
+    for item in payload.items:
+        annotation = annotations.get(item.blind_id)
+        if item.blind_id in seen:
+            results.append(BatchItemResult(blind_id=item.blind_id, status="duplicate", detail="같은 요청에 중복된 문항입니다."))
+            continue
+        seen.add(item.blind_id)
+        if annotation is None:
+            results.append(BatchItemResult(blind_id=item.blind_id, status="not_found", detail="해당 평가 문항을 찾을 수 없거나 권한이 없습니다."))
+            continue
+        if annotation.is_submitted:
+            results.append(BatchItemResult(blind_id=item.blind_id, status="already_submitted", detail="이미 제출이 완료된 문항입니다."))
+            continue
+
+        values = item.model_dump(exclude={"blind_id"})
+        before = annotation_state(annotation)
+        after = {"submitted": True, "scores": {trait: values[f"score_{trait}"] for trait in TRAITS}}
+        changes.record(annotation.user_id, annotation.essay_id, before, after)
+        rows.append({"annotation_id": annotation.id, **{f"score_{trait}": values[f"score_{trait}"] for trait in TRAITS}})
+        selection_changes += [
+            (annotation.id, annotation.essay_id, trait, parse_selection(values[f"selected_sentences_{trait}"]))
+            for trait in SELECTION_TRAITS
+        ]
+        results.append(BatchItemResult(blind_id=item.blind_id, status="submitted"))
+
+    if rows:
+        table = Annotation.__table__
+        stmt = update(table).where(
+            table.c.id == bindparam("annotation_id"),
+            table.c.is_submitted == False  # 조회 이후 다른 요청이 먼저 제출한 경우 갱신하지 않음
+        ).values(
+            is_submitted=True, version=table.c.version + 1,
+            **{f"score_{trait}": bindparam(f"score_{trait}") for trait in TRAITS}
+        )
+        result = await db.execute(stmt, rows)
+        if result.rowcount != len(rows):
+            await db.rollback()
+            raise HTTPException(status_code=409, detail="다른 요청에서 먼저 제출된 문항이 있습니다. 다시 시도해 주세요.")
+        await replace_selections(db, selection_changes)
+        await changes.apply(db)
+        await db.commit()
+        for item in payload.items:
+            draft_buffer.discard(current_user.id, item.blind_id)
+
+    return BatchSubmitResponse(submitted_count=len(rows), results=results)
+
 @router.get("/{blind_id}", response_model=EvaluationTaskResponse)
-def get_evaluation_task(
+async def get_evaluation_task(
     blind_id: str,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_db),
+    current_user: UserResponse = Depends(get_current_user)
 ):
     """
     특정 blind_id의 평가 대상 문항 상세 정보를 반환합니다.
     """
-    annotation = db.query(Annotation).filter(
+    row = (await db.execute(select(
+        Annotation.blind_id, Annotation.display_order, Essay.question, Essay.content
+    ).join(Essay, Annotation.essay_id == Essay.id).where(
         Annotation.blind_id == blind_id,
         Annotation.user_id == current_user.id
-    ).first()
+    ))).first()
     
-    if not annotation:
+    if not row:
         raise HTTPException(status_code=404, detail="해당 평가 문항을 찾을 수 없거나 권한이 없습니다.")
-        
-    essay = annotation.essay
+    
+    etag = make_etag(row.blind_id, row.display_order, row.question, row.content)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    response.headers.update(cache_headers(etag))
     
     return {
-        "blind_id": annotation.blind_id,
-        "display_order": annotation.display_order,
-        "question": essay.question,
-        "content": essay.content
+        "blind_id": row.blind_id,
+        "display_order": row.display_order,
+        "question": row.question,
+        "content": row.content
     }
 
 @router.put("/{blind_id}")
-def submit_evaluation(
+async def submit_evaluation(
     blind_id: str,
     payload: EvaluationSubmitRequest,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: UserResponse = Depends(get_current_user)
 ):
     """
     평가자가 채점한 결과를 DB에 저장하고 제출 상태로 변경합니다.
+    조회 이후 다른 요청이 먼저 제출/수정했다면 UPDATE가 0행이 되므로 409를 반환하고 집계는 반영하지 않습니다.
     """
-    annotation = db.query(Annotation).filter(
+    annotation = (await db.execute(select(
+        Annotation.id, Annotation.user_id, Annotation.essay_id, Annotation.is_submitted, Annotation.version,
+        *(getattr(Annotation, f"score_{trait}") for trait in TRAITS)
+    ).where(
         Annotation.blind_id == blind_id,
         Annotation.user_id == current_user.id
-    ).first()
+    ))).first()
     
     if not annotation:
         raise HTTPException(status_code=404, detail="해당 평가 문항을 찾을 수 없거나 권한이 없습니다.")
@@ -135,18 +381,31 @@ def submit_evaluation(
     if annotation.is_submitted:
         raise HTTPException(status_code=400, detail="이미 제출이 완료된 문항입니다.")
 
-    # 제출된 점수 업데이트
-    annotation.score_language = payload.score_language
-    annotation.selected_sentences_language = payload.selected_sentences_language
-    annotation.score_organization = payload.score_organization
-    annotation.selected_sentences_organization = payload.selected_sentences_organization
-    annotation.score_content = payload.score_content
-    annotation.selected_sentences_content = payload.selected_sentences_content
-    annotation.score_ai_feedback = payload.score_ai_feedback
-    
-    # 제출 상태 변경
-    annotation.is_submitted = True
+    # 제출된 점수 업데이트 + 제출 상태 변경 (조회한 상태 그대로일 때만)
+    scores = {f"score_{trait}": getattr(payload, f"score_{trait}") for trait in TRAITS}
+    table = Annotation.__table__
+    result = await db.execute(update(table).where(
+        table.c.id == annotation.id,
+        table.c.user_id == current_user.id,
+        table.c.is_submitted == False,
+        table.c.version == annotation.version
+    ).values(**scores, is_submitted=True, version=table.c.version + 1))
+    if result.rowcount != 1:
+        await db.rollback()
+        raise HTTPException(status_code=409, detail="다른 요청에서 먼저 제출된 문항입니다. 새로고침 후 확인해 주세요.")
+
+    await replace_selections(db, [
+        (annotation.id, annotation.essay_id, trait, parse_selection(getattr(payload, f"selected_sentences_{trait}")))
+        for trait in SELECTION_TRAITS
+    ])
     
-    db.commit()
+    # 집계 테이블도 같은 트랜잭션에서 갱신 (가드된 UPDATE가 성공한 뒤에만)
+    changes = AggregateChanges()
+    changes.record(annotation.user_id, annotation.essay_id, annotation_state(annotation), {
+        "submitted": True, "scores": {trait: scores[f"score_{trait}"] for trait in TRAITS}
+    })
+    await changes.apply(db)
+    await db.commit()
+    draft_buffer.discard(current_user.id, blind_id)  # 제출된 내용이 임시 저장을 대체
     
     return {"message": "평가가 성공적으로 제출되었습니다.", "blind_id": blind_id}
\ No newline at end of file
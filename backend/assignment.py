@@ -0,0 +1,161 @@
+"""
+평가 문항 할당 엔진
+
+N명의 평가자, M개 논문, K개 질문으로 구성된 문항 집합을 불완전 블록 설계(incomplete block
+design)로 분배하고, 평가자별로 같은 질문이 연속 노출되지 않는(앵커링 방지) 순서를 만듭니다.
+
+- stratified_blocks: 층(논문, 질문)별로 문항을 블록에 고르게 분산 (블록 크기와 층 구성이 균형)
+- cyclic_design: 평가자마다 연속된 overlap개 블록을 순환 할당 (블록별 평가자 수가 같고,
+  인접 평가자끼리 블록을 공유하여 평가자 간 일치도를 계산할 수 있는 연결된 설계)
+- anchoring_free_order: 같은 key가 인접하지 않는 무작위 순서 (기대 선형 시간)
+
+모든 무작위성은 전달받은 random.Random에서 나오므로 같은 seed면 같은 결과가 나옵니다.
+"""
+import random
+
+def stratified_blocks(items, n_blocks, strata_key, rng, priority=None):
+    """
+    층별로 문항을 섞은 뒤 블록에 순환 배분합니다. 층마다 시작 블록을 이어서 돌리므로
+    블록 크기 차이는 최대 1이고, 각 층의 문항도 블록 간 차이가 최대 1입니다.
+    priority(item)가 참인 문항(예: 정답 문항)은 층 안에서 먼저 배분되어 서로 다른 블록에 흩어집니다.
+    """
+    strata = {}
+    for item in items:
+        strata.setdefault(strata_key(item), []).append(item)
+
+    blocks = [[] for _ in range(n_blocks)]
+    cursor = 0
+    for members in strata.values():
+        rng.shuffle(members)
+        if priority is not None:
+            members.sort(key=lambda it: not priority(it))  # 안정 정렬: 우선 문항만 앞으로
+        for item in members:
+            blocks[cursor % n_blocks].append(item)
+            cursor += 1
+    return blocks
+
+def cyclic_design(n_annotators, n_blocks, overlap):
+    """
+    평가자 i에게 블록 start_i, start_i+1, ..., start_i+overlap-1 (mod n_blocks)을 할당합니다.
+    start_i = i * n_blocks // n_annotators 이므로 n_annotators가 n_blocks의 배수이거나
+    n_blocks가 n_annotators와 같으면 모든 블록의 평가자 수가 정확히 같습니다.
+    """
+    if not 1 <= overlap <= n_blocks:
+        raise ValueError(f"overlap must be between 1 and n_blocks ({n_blocks}), got {overlap}")
+    if n_annotators * overlap < n_blocks:
+        raise ValueError(
+            f"{n_annotators} annotators x overlap {overlap} cannot cover {n_blocks} blocks"
+        )
+    design = []
+    for i in range(n_annotators):
+        start = i * n_blocks // n_annotators
+        design.append([(start + j) % n_blocks for j in range(overlap)])
+    return design
+
+def anchoring_free_order(items, key, rng):
+    """
+    같은 key가 연속되지 않도록 무작위로 배열합니다.
+
+    남은 문항 중 하나를 균등하게 뽑되 직전 key는 거절하고, 남은 개수가 홀수 r이고
+    어떤 key가 (r+1)/2개 남아 있으면 그 key를 강제로 배치합니다. 이 규칙으로 배치가
+    가능한 입력(최다 key 개수 <= (n+1)/2)에서는 항상 인접 중복 없이 끝나며,
+    거절 횟수의 기댓값이 2 이하이므로 기대 O(n)입니다.
+    최다 key가 절반을 넘어 분리가 불가능한 입력은 단순 셔플 결과를 반환합니다.
+    """
+    n = len(items)
+    groups = {}
+    for item in items:
+        groups.setdefault(key(item), []).append(item)
+    if not groups or max(len(g) for g in groups.values()) > (n + 1) // 2:
+        result = list(items)
+        rng.shuffle(result)
+        return result
+
+    for members in groups.values():
+        rng.shuffle(members)
+
+    # pool: 남은 문항의 key 목록 (균등 추출용), positions: key별 pool 내 위치
+    pool = []
+    positions = {}
+    for k, members in groups.items():
+        positions[k] = set(range(len(pool), len(pool) + len(members)))
+        pool.extend([k] * len(members))
+
+    # 개수별 key 버킷으로 최다 key를 상수 시간에 추적 (최댓값은 감소만 함)
+    counts = {k: len(members) for k, members in groups.items()}
+    buckets = {}
+    for k, c in counts.items():
+        buckets.setdefault(c, set()).add(k)
+    max_count = max(counts.values())
+
+    def take(index):
+        k = pool[index]
+        last = len(pool) - 1
+        moved = pool[last]
+        positions[k].discard(index)
+        if index != last:
+            positions[moved].discard(last)
+            positions[moved].add(index)
+            pool[index] = moved
+        pool.pop()
+        return k
+
+    result = []
+    prev = None
+    while pool:
+        r = len(pool)
+        forced = None
+        if r % 2 == 1 and max_count == (r + 1) // 2:
+            forced = next(iter(buckets[max_count]))
+        if forced is not None:
+            k = take(next(iter(positions[forced])))
+        else:
+            while True:
+                index = rng.randrange(r)
+                if pool[index] != prev:
+                    break
+            k = take(index)
+
+        c = counts[k]
+        buckets[c].discard(k)
+        counts[k] = c - 1
+        if c > 1:
+            buckets.setdefault(c - 1, set()).add(k)
+        while max_count > 0 and not buckets.get(max_count):
+            max_count -= 1
+
+        result.append(groups[k].pop())
+        prev = k
+    return result
+
+def build_assignments(items, annotators, overlap=2, n_blocks=None, seed=None,
+                      strata_key=None, order_key=None, priority=None):
+    """
+    문항 목록을 평가자들에게 할당하고 평가자별 노출 순서까지 정해 반환합니다.
+
+    Args:
+        items: 할당할 문항 목록
+        annotators: 평가자 식별자 목록 (예: username)
+        overlap: 평가자 1명이 맡는 블록 수 (= n_blocks가 평가자 수와 같을 때 문항당 평가자 수)
+        n_blocks: 블록 수 (기본값: 평가자 수)
+        seed: 난수 시드 (같은 입력과 시드면 같은 할당)
+        strata_key: 블록 층화 기준 (기본값: 문항 자체, 즉 층화 없음)
+        order_key: 연속 노출을 피할 기준 (기본값: strata_key)
+        priority: 층 안에서 먼저 배분할 문항 판별 함수
+
+    Returns:
+        {평가자: [문항, ...]} (리스트 순서가 곧 display_order)
+    """
+    rng = random.Random(seed)
+    n_blocks = n_blocks or len(annotators)
+    strata_key = strata_key or (lambda item: None)
+    order_key = order_key or strata_key
+
+    blocks = stratified_blocks(items, n_blocks, strata_key, rng, priority)
+    design = cyclic_design(len(annotators), n_blocks, overlap)
+    return {
+        annotator: anchoring_free_order(
+            [item for b in block_ids for item in blocks[b]], order_key, rng
+        )
+        for annotator, block_ids in zip(annotators, design)
+    }
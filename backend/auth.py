@@ -1,36 +1,147 @@
+import os
+import time
+import asyncio
+import threading
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Dict, Optional, Tuple
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
-from models import User, get_db
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from models import SessionLocal, User, get_db
+from schemas import UserResponse
 
 SECRET_KEY = "your-secret-key-change-in-production"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_HOURS = 8
+USER_CACHE_TTL_SECONDS = 300
+
+# 관리자 API(/api/admin) 접근 허용 계정 (쉼표로 구분, 비어 있으면 관리자 없음)
+ADMIN_USERNAMES = {name.strip() for name in os.getenv("ADMIN_USERNAMES", "").split(",") if name.strip()}
+
+# bcrypt 검증 전용 프로세스 풀 크기와 대기열 한도 (초과 시 503 반환)
+PASSWORD_WORKERS = int(os.getenv("PASSWORD_WORKERS", "2"))
+PASSWORD_QUEUE_LIMIT = int(os.getenv("PASSWORD_QUEUE_LIMIT", "16"))
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login")
 
+# user_id -> (만료 시각, 인증된 사용자). 토큰 클레임으로 식별하므로 요청마다 DB를 조회하지 않음
+_user_cache: Dict[int, Tuple[float, UserResponse]] = {}
+# user_id -> 폐기 시각(초). iat가 이 값 이하인 토큰은 거부 (같은 초에 발급된 토큰도 거부)
+_revoked_at: Dict[int, int] = {}
+# user_id -> 사용자 정보 변경 시각(초). iat가 이 값 이하인 토큰의 클레임은 믿지 않고 DB에서 조회
+_claims_stale_at: Dict[int, int] = {}
+_cache_lock = threading.Lock()
+# 폐기는 users.tokens_revoked_at에도 기록하지만 다른 워커에는 재시작 전까지 반영되지 않으므로
+# API는 단일 워커로 실행 (drafts.py와 같은 전제)
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
+_password_pool: Optional[ProcessPoolExecutor] = None
+_password_pending = 0  # 이벤트 루프 스레드에서만 변경됨
+
+def _get_password_pool() -> ProcessPoolExecutor:
+    global _password_pool
+    if _password_pool is None:
+        _password_pool = ProcessPoolExecutor(max_workers=PASSWORD_WORKERS)
+    return _password_pool
+
+def shutdown_password_pool() -> None:
+    global _password_pool
+    if _password_pool is not None:
+        _password_pool.shutdown(wait=False, cancel_futures=True)
+        _password_pool = None
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """
+    bcrypt 검증을 별도 프로세스 풀에서 수행합니다.
+    로그인 요청이 몰려도 다른 API의 스레드풀을 점유하지 않으며,
+    대기 중인 검증이 PASSWORD_QUEUE_LIMIT를 넘으면 즉시 503을 반환합니다.
+    """
+    global _password_pending
+    if _password_pending >= PASSWORD_WORKERS + PASSWORD_QUEUE_LIMIT:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="로그인 요청이 많습니다. 잠시 후 다시 시도해 주세요.",
+            headers={"Retry-After": "1"},
+        )
+    _password_pending += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_get_password_pool(), verify_password, plain_password, hashed_password)
+    finally:
+        _password_pending -= 1
+
+def _now() -> int:
+    """토큰 iat와 폐기/변경 시각에 같이 쓰는 현재 시각 (정수 초)"""
+    return int(time.time())
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(hours=ACCESS_TOKEN_EXPIRE_HOURS)
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "iat": _now()})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
+def create_user_token(user: User) -> str:
+    """사용자 ID와 이름을 클레임에 담은 액세스 토큰 발급"""
+    return create_access_token(data={"sub": user.username, "uid": user.id, "name": user.full_name})
+
+def invalidate_user(user_id: int) -> None:
+    """
+    사용자 정보(이름 등)가 바뀌었을 때 호출. 캐시를 비우고, 지금까지 발급된 토큰은 클레임 대신
+    DB에서 사용자를 조회하게 합니다. (새로 로그인해 받은 토큰은 다시 클레임만 사용)
+    """
+    with _cache_lock:
+        _claims_stale_at[user_id] = _now()
+        _user_cache.pop(user_id, None)
+
+def revoke_user(user_id: int, revoked_at: Optional[int] = None) -> None:
+    """revoked_at(기본: 지금) 이하에 해당 사용자에게 발급된 토큰을 거부 (메모리에만 반영)"""
+    with _cache_lock:
+        _revoked_at[user_id] = max(_revoked_at.get(user_id, -1), _now() if revoked_at is None else revoked_at)
+        _user_cache.pop(user_id, None)
+
+async def revoke_user_tokens(db: AsyncSession, user_id: int) -> None:
+    """지금까지 발급된 토큰을 폐기하고 users.tokens_revoked_at에 기록 (로그아웃, 관리자 폐기)"""
+    revoked_at = _now()
+    await db.execute(update(User).where(User.id == user_id).values(tokens_revoked_at=revoked_at))
+    await db.commit()
+    revoke_user(user_id, revoked_at)
+
+def load_revocations() -> int:
+    """서버 시작 시 users.tokens_revoked_at을 메모리에 올림 (재시작 후에도 폐기 유지)"""
+    db = SessionLocal()
+    try:
+        rows = db.execute(select(User.id, User.tokens_revoked_at).where(User.tokens_revoked_at.isnot(None))).all()
+    finally:
+        db.close()
+    for user_id, revoked_at in rows:
+        revoke_user(user_id, revoked_at)
+    return len(rows)
+
+def _cache_user(user: UserResponse) -> UserResponse:
+    with _cache_lock:
+        _user_cache[user.id] = (time.monotonic() + USER_CACHE_TTL_SECONDS, user)
+    return user
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)) -> UserResponse:
+    """
+    토큰 클레임(uid, name)으로 사용자를 만들고 USER_CACHE_TTL_SECONDS 동안 캐시합니다.
+    다음 경우에만 DB를 조회합니다: uid/name 클레임이 없는 이전 형식 토큰, invalidate_user() 이전에 발급된 토큰.
+    폐기 여부는 두 경로 모두 사용자 id와 iat(초)로 확인합니다. (iat가 없는 토큰은 0으로 취급)
+    """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -41,10 +152,31 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
         username: str = payload.get("sub")
         if username is None:
             raise credentials_exception
-    except JWTError:
+        issued_at = int(payload.get("iat", 0))
+    except (JWTError, TypeError, ValueError):
         raise credentials_exception
-    
-    user = db.query(User).filter(User.username == username).first()
-    if user is None:
+
+    def check_revoked(user_id):
+        if issued_at <= _revoked_at.get(user_id, -1):
+            raise credentials_exception
+
+    user_id = payload.get("uid")
+    if user_id is not None:
+        check_revoked(user_id)
+        cached = _user_cache.get(user_id)
+        if cached and cached[0] > time.monotonic():
+            return cached[1]
+        if payload.get("name") is not None and issued_at > _claims_stale_at.get(user_id, -1):
+            return _cache_user(UserResponse(id=user_id, username=username, full_name=payload["name"]))
+
+    # 이전 형식의 토큰이나 사용자 정보가 바뀌기 전에 발급된 토큰은 DB에서 조회
+    user = (await db.execute(select(User).where(User.username == username))).scalars().first()
+    if user is None or (user_id is not None and user.id != user_id):
         raise credentials_exception
-    return user
+    check_revoked(user.id)
+    return _cache_user(UserResponse.from_orm(user))
+
+async def get_admin_user(current_user: UserResponse = Depends(get_current_user)) -> UserResponse:
+    if current_user.username not in ADMIN_USERNAMES:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="관리자 권한이 필요합니다.")
+    return current_user
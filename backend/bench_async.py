@@ -0,0 +1,120 @@
+"""
+동기(DB_ASYNC=0) / 비동기(DB_ASYNC=1) DB 모드 비교 벤치마크
+
+모드별로 annotation.db 사본을 사용하는 서버를 띄우고, 다수의 평가자가 동시에
+대시보드 조회 → 평가 화면 조회 → 저장(PATCH)을 반복하는 부하를 주어
+처리량과 지연 시간(p50/p99)을 비교합니다. 원본 annotation.db는 변경하지 않습니다.
+
+사용 예:
+    python bench_async.py --annotators 64 --seconds 10
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import random
+import sqlite3
+import argparse
+import tempfile
+import threading
+import subprocess
+import urllib.error
+import urllib.request
+
+from auth import create_access_token
+from bench_login import percentile, request
+
+def load_sessions(db_path):
+    """평가자별 토큰과 할당된 (blind_id, annotation_id) 목록"""
+    conn = sqlite3.connect(db_path)
+    users = conn.execute("SELECT id, username, full_name FROM users ORDER BY id").fetchall()
+    sessions = []
+    for user_id, username, full_name in users:
+        token = create_access_token(data={"sub": username, "uid": user_id, "name": full_name})
+        items = conn.execute(
+            "SELECT blind_id, id FROM annotations WHERE user_id = ? ORDER BY display_order", (user_id,)
+        ).fetchall()
+        sessions.append(({"Authorization": f"Bearer {token}"}, items))
+    conn.close()
+    return sessions
+
+def wait_until_ready(base_url, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(f"{base_url}/", timeout=1).read()
+            return
+        except (urllib.error.URLError, ConnectionError):
+            time.sleep(0.2)
+    raise RuntimeError("서버가 시작되지 않았습니다.")
+
+def run_mode(mode, args):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_copy = os.path.join(tmp, "annotation.db")
+        shutil.copyfile(args.db, db_copy)
+        env = dict(os.environ, DB_ASYNC="1" if mode == "async" else "0", DB_PROFILE=args.profile,
+                   DATABASE_URL=f"sqlite:///{db_copy}")
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--port", str(args.port), "--log-level", "warning"],
+            env=env, cwd=os.path.dirname(os.path.abspath(__file__))
+        )
+        base_url = f"http://127.0.0.1:{args.port}"
+        try:
+            wait_until_ready(base_url)
+            sessions = load_sessions(db_copy)
+            stop = threading.Event()
+            latencies, errors = [], [0]
+            lock = threading.Lock()
+
+            def annotator(index):
+                headers, items = sessions[index % len(sessions)]
+                json_headers = dict(headers, **{"Content-Type": "application/json"})
+                while not stop.is_set():
+                    blind_id, annotation_id = random.choice(items)
+                    body = json.dumps({"language": {"score": random.randint(1, 5), "selected_sentences": [0, 2]}}).encode()
+                    calls = [
+                        (f"{base_url}/api/essays?fields=id,title,question,is_annotated,blind_id", None, headers, "GET"),
+                        (f"{base_url}/api/annotations/{blind_id}/workspace", None, headers, "GET"),
+                        (f"{base_url}/api/annotations/{annotation_id}", body, json_headers, "PATCH"),
+                    ]
+                    for url, data, hdrs, method in calls:
+                        status, _, elapsed = request(url, data=data, headers=hdrs, method=method)
+                        with lock:
+                            latencies.append(elapsed)
+                            if status >= 400:
+                                errors[0] += 1
+
+            threads = [threading.Thread(target=annotator, args=(i,)) for i in range(args.annotators)]
+            for t in threads:
+                t.start()
+            time.sleep(args.seconds)
+            stop.set()
+            for t in threads:
+                t.join()
+            return len(latencies) / args.seconds, latencies, errors[0]
+        finally:
+            server.terminate()
+            server.wait()
+
+def main():
+    parser = argparse.ArgumentParser(description="동기/비동기 DB 모드 동시 평가자 부하 비교")
+    parser.add_argument("--db", default="annotation.db", help="복사해서 사용할 원본 DB 파일")
+    parser.add_argument("--modes", default="sync,async")
+    parser.add_argument("--annotators", type=int, default=64, help="동시 평가자 수")
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--profile", default="production", help="DB_PROFILE (models.STORAGE_PROFILES)")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print(f"동시 평가자 {args.annotators}명, {args.seconds:.0f}초, DB_PROFILE={args.profile}")
+    print("-" * 60)
+    for mode in args.modes.split(","):
+        throughput, latencies, errors = run_mode(mode, args)
+        print(f"{mode:<6} | {throughput:>8.1f} req/s | p50 {percentile(latencies, 50) * 1000:>7.1f}ms | "
+              f"p99 {percentile(latencies, 99) * 1000:>7.1f}ms | errors {errors}")
+    print("=" * 60)
+
+if __name__ == "__main__":
+    main()
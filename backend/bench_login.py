@@ -0,0 +1,112 @@
+"""
+로그인 폭주 벤치마크
+
+실행 중인 서버를 대상으로 다수의 동시 로그인 요청을 보내면서,
+같은 시간 동안 다른 API(/api/essays, /api/users/me)의 지연 시간(p50/p99)을 측정합니다.
+
+사용 예:
+    python main.py                      # 다른 터미널에서 서버 실행
+    python bench_login.py --logins 200 --concurrency 50
+"""
+import json
+import time
+import argparse
+import threading
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+def percentile(values, pct):
+    if not values:
+        return float('nan')
+    ordered = sorted(values)
+    k = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[k]
+
+def request(url, data=None, headers=None, method=None):
+    req = urllib.request.Request(url, data=data, headers=headers or {}, method=method)
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req) as resp:
+            body = resp.read()
+            status = resp.status
+    except urllib.error.HTTPError as e:
+        body = e.read()
+        status = e.code
+    return status, body, time.perf_counter() - start
+
+def login(base_url, username, password):
+    data = urllib.parse.urlencode({"username": username, "password": password}).encode()
+    return request(f"{base_url}/api/auth/login", data=data,
+                   headers={"Content-Type": "application/x-www-form-urlencoded"})
+
+def main():
+    parser = argparse.ArgumentParser(description="로그인 폭주 중 다른 API 지연 시간 측정")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--username", default="annotator1")
+    parser.add_argument("--password", default="password123")
+    parser.add_argument("--logins", type=int, default=200, help="전체 로그인 요청 수")
+    parser.add_argument("--concurrency", type=int, default=50, help="동시 로그인 요청 수")
+    parser.add_argument("--readers", type=int, default=4, help="다른 API를 호출하는 동시 클라이언트 수")
+    args = parser.parse_args()
+
+    status, body, _ = login(args.url, args.username, args.password)
+    if status != 200:
+        print(f"Error: 로그인 실패 ({status}) {body[:200]!r}")
+        return
+    headers = {"Authorization": f"Bearer {json.loads(body)['access_token']}"}
+
+    stop = threading.Event()
+    read_latencies = {"/api/essays": [], "/api/users/me": []}
+
+    def reader():
+        while not stop.is_set():
+            for path, latencies in read_latencies.items():
+                _, _, elapsed = request(f"{args.url}{path}", headers=headers)
+                latencies.append(elapsed)
+
+    def run_readers():
+        threads = [threading.Thread(target=reader) for _ in range(args.readers)]
+        for t in threads:
+            t.start()
+        return threads
+
+    # 1. 기준선: 로그인 부하 없이 측정
+    threads = run_readers()
+    time.sleep(3)
+    stop.set()
+    for t in threads:
+        t.join()
+    baseline = {path: list(lat) for path, lat in read_latencies.items()}
+
+    # 2. 로그인 폭주 중 측정
+    for lat in read_latencies.values():
+        lat.clear()
+    stop.clear()
+    threads = run_readers()
+    login_statuses = {}
+    login_latencies = []
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        for status, _, elapsed in pool.map(lambda _: login(args.url, args.username, args.password), range(args.logins)):
+            login_statuses[status] = login_statuses.get(status, 0) + 1
+            login_latencies.append(elapsed)
+    storm_seconds = time.perf_counter() - started
+    stop.set()
+    for t in threads:
+        t.join()
+
+    print("=" * 60)
+    print(f"로그인 {args.logins}건 (동시 {args.concurrency}) 완료: {storm_seconds:.2f}s, 상태 코드 {login_statuses}")
+    print(f"로그인 지연: p50 {percentile(login_latencies, 50) * 1000:.1f}ms / p99 {percentile(login_latencies, 99) * 1000:.1f}ms")
+    print("-" * 60)
+    print(f"{'endpoint':<16} | {'baseline p50/p99 (ms)':<24} | {'storm p50/p99 (ms)':<24}")
+    for path, lat in read_latencies.items():
+        base = baseline[path]
+        print(f"{path:<16} | {percentile(base, 50) * 1000:>8.1f} / {percentile(base, 99) * 1000:<12.1f} | "
+              f"{percentile(lat, 50) * 1000:>8.1f} / {percentile(lat, 99) * 1000:<12.1f}")
+    print("=" * 60)
+
+if __name__ == "__main__":
+    main()
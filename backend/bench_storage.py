@@ -0,0 +1,122 @@
+"""
+SQLite 저장소 프로파일 벤치마크
+
+annotation.db 사본을 프로파일별로 만들어 동시 읽기(에세이 목록 조회)와
+동시 쓰기(평가 제출)를 일정 시간 실행하고 처리량과 잠금 오류 수를 비교합니다.
+원본 annotation.db는 변경하지 않습니다.
+
+사용 예:
+    python bench_storage.py --readers 16 --writers 8 --seconds 10
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import random
+import argparse
+import tempfile
+import threading
+import subprocess
+
+def run_workload(readers: int, writers: int, seconds: float) -> dict:
+    """DATABASE_URL/DB_PROFILE 환경변수가 적용된 자식 프로세스에서 실행"""
+    from sqlalchemy import update, delete, insert
+    from sqlalchemy.exc import OperationalError
+    from models import SessionLocal, Annotation, AnnotationSentence, Essay
+
+    db = SessionLocal()
+    pairs = db.query(Annotation.id, Annotation.user_id, Annotation.essay_id).all()
+    db.close()
+
+    stop = threading.Event()
+    counts = {"reads": 0, "writes": 0, "read_errors": 0, "write_errors": 0}
+    lock = threading.Lock()
+
+    def bump(key):
+        with lock:
+            counts[key] += 1
+
+    def reader():
+        while not stop.is_set():
+            user_id = random.choice(pairs)[1]
+            db = SessionLocal()
+            try:
+                db.query(Essay.id, Essay.question, Annotation.blind_id, Annotation.is_submitted).join(
+                    Essay, Annotation.essay_id == Essay.id
+                ).filter(Annotation.user_id == user_id).order_by(Annotation.display_order).all()
+                bump("reads")
+            except OperationalError:
+                bump("read_errors")
+            finally:
+                db.close()
+
+    def writer():
+        while not stop.is_set():
+            annotation_id, _, essay_id = random.choice(pairs)
+            db = SessionLocal()
+            try:
+                db.execute(update(Annotation).where(Annotation.id == annotation_id).values(
+                    score_language=random.randint(1, 5),
+                ))
+                db.execute(delete(AnnotationSentence).where(
+                    AnnotationSentence.annotation_id == annotation_id, AnnotationSentence.trait == "language"
+                ))
+                db.execute(insert(AnnotationSentence), [
+                    {"annotation_id": annotation_id, "essay_id": essay_id, "trait": "language", "sentence_idx": idx}
+                    for idx in random.sample(range(10), 3)
+                ])
+                db.commit()
+                bump("writes")
+            except OperationalError:
+                db.rollback()
+                bump("write_errors")
+            finally:
+                db.close()
+
+    threads = [threading.Thread(target=reader) for _ in range(readers)]
+    threads += [threading.Thread(target=writer) for _ in range(writers)]
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+    return counts
+
+def main():
+    parser = argparse.ArgumentParser(description="SQLite 저장소 프로파일별 동시 읽기/쓰기 벤치마크")
+    parser.add_argument("--db", default="annotation.db", help="복사해서 사용할 원본 DB 파일")
+    parser.add_argument("--profiles", default="default,production")
+    parser.add_argument("--readers", type=int, default=16)
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_workload(args.readers, args.writers, args.seconds)))
+        return
+
+    print("=" * 60)
+    print(f"동시 읽기 {args.readers} / 쓰기 {args.writers}, {args.seconds:.0f}초")
+    print("-" * 60)
+    with tempfile.TemporaryDirectory() as tmp:
+        for profile in args.profiles.split(","):
+            db_copy = os.path.join(tmp, f"{profile}.db")
+            shutil.copyfile(args.db, db_copy)
+            env = dict(os.environ, DB_PROFILE=profile, DATABASE_URL=f"sqlite:///{db_copy}")
+            out = subprocess.run(
+                [sys.executable, __file__, "--worker", "--readers", str(args.readers),
+                 "--writers", str(args.writers), "--seconds", str(args.seconds)],
+                env=env, cwd=os.path.dirname(os.path.abspath(__file__)),
+                capture_output=True, text=True, check=True
+            ).stdout
+            counts = json.loads(out.strip().splitlines()[-1])
+            print(f"{profile:<12} | reads/s {counts['reads'] / args.seconds:>9.1f} | "
+                  f"writes/s {counts['writes'] / args.seconds:>8.1f} | "
+                  f"locked: read {counts['read_errors']}, write {counts['write_errors']}")
+    print("=" * 60)
+
+if __name__ == "__main__":
+    main()
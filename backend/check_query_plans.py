@@ -0,0 +1,152 @@
+"""
+쿼리 플랜 회귀 검사
+
+annotation.db 사본에 마이그레이션을 적용한 뒤 각 API 엔드포인트 함수를 직접 호출하여
+실행되는 모든 SQL을 수집하고, EXPLAIN QUERY PLAN 결과에 전체 테이블 스캔(SCAN)이
+있으면 실패(exit code 1)합니다. 원본 annotation.db는 변경하지 않습니다.
+같은 검사를 테스트 DB에 대해 실행하는 pytest 버전: tests/test_query_plans.py
+
+사용 예:
+    python check_query_plans.py
+"""
+import os
+import sys
+import asyncio
+import shutil
+import tempfile
+
+# 테이블 스캔이 허용되는 플랜 (상수 행 등)
+ALLOWED_SCANS = ("SCAN CONSTANT ROW",)
+
+def endpoint_calls(db, user, sample, essay):
+    """
+    (이름, 호출 함수[, 허용 스캔]) 목록. 새 엔드포인트를 추가하면 여기에도 추가합니다.
+    허용 스캔은 전체 목록/전체 분석처럼 스캔이 본질적인 엔드포인트에만 지정합니다.
+    """
+    from starlette.requests import Request
+    from starlette.responses import Response
+    import main
+    import annotation
+    import admin
+    from schemas import AnnotationUpdate, TraitAnnotation
+
+    def request():
+        return Request({"type": "http", "method": "GET", "path": "/", "headers": []})
+
+    async def consume(response_coro):
+        # 스트리밍 응답은 본문을 끝까지 읽어야 쿼리가 실행됨
+        response = await response_coro
+        async for _ in response.body_iterator:
+            pass
+
+    trait = TraitAnnotation(score=3, selected_sentences=[0, 1])
+    submit_payload = annotation.EvaluationSubmitRequest(
+        score_language=3, score_organization=3, score_content=3, score_ai_feedback=3
+    )
+    return [
+        ("GET /api/essays", lambda: main.get_essays(fields=None, current_user=user, db=db)),
+        ("GET /api/essays/{id}", lambda: main.get_essay(sample.essay_id, request(), db=db, current_user=user)),
+        ("GET /api/papers/{id}", lambda: main.get_paper(essay.paper_id or 0, request(), db=db, current_user=user)),
+        ("GET /api/questions/{id}", lambda: main.get_question(essay.question_id or 0, request(), db=db, current_user=user)),
+        ("GET /api/annotations/essay-data/{id}", lambda: main.get_annotation(sample.essay_id, current_user=user, db=db)),
+        ("GET /api/annotations/pending", lambda: annotation.get_pending_evaluations(db=db, current_user=user)),
+        ("GET /api/annotations/blind-ids", lambda: annotation.get_blind_annotation_ids(current_user=user, db=db)),
+        ("GET /api/annotations/{blind_id}", lambda: annotation.get_evaluation_task(sample.blind_id, request(), Response(), db=db, current_user=user)),
+        ("GET /api/annotations/{blind_id}/workspace", lambda: annotation.get_workspace(sample.blind_id, db=db, current_user=user)),
+        ("PUT /api/annotations/{blind_id}/draft", lambda: annotation.save_draft(
+            sample.blind_id, annotation.DraftRequest(score_language=3), db=db, current_user=user
+        )),
+        ("POST /api/annotations/batch", lambda: annotation.submit_evaluations_batch(annotation.BatchSubmitRequest(items=[
+            annotation.BatchSubmitItem(blind_id=sample.blind_id, **submit_payload.model_dump())
+        ]), db=db, current_user=user)),
+        ("PUT /api/annotations/{blind_id}", lambda: annotation.submit_evaluation(sample.blind_id, submit_payload, db=db, current_user=user)),
+        ("PATCH /api/annotations/{id}", lambda: main.update_annotation(sample.id, AnnotationUpdate(language=trait), current_user=user, db=db)),
+        ("POST /api/annotations/submit-all", lambda: main.submit_all_annotations(current_user=user, db=db)),
+        ("GET /api/admin/progress", lambda: admin.get_progress(request(), db=db, admin=user),
+         ("SCAN user_progress",)),  # 평가자 전체 목록
+        ("GET /api/admin/stats", lambda: admin.get_stats(request(), db=db, admin=user),
+         ("SCAN a", "SCAN s", "SCAN essay_sentences")),  # 제출된 어노테이션/근거 문장 전체 분석 (revision이 바뀔 때만 실행)
+        ("GET /api/admin/export", lambda: consume(admin.export_annotations("jsonl", True, admin=user)),
+         ("SCAN annotations",)),  # 전체 내보내기
+    ]
+
+def query_plan_scans():
+    """
+    현재 DATABASE_URL의 DB로 endpoint_calls()를 차례로 실행하고 (이름, 쿼리 수, [(SQL, 스캔 플랜)]) 를 생성합니다.
+    각 호출의 변경은 롤백합니다. (tests/test_query_plans.py에서도 사용)
+    """
+    from fastapi import HTTPException
+    from sqlalchemy import event
+    from models import engine, ThreadedSessionLocal, ThreadedSession, User, Essay, Annotation
+    from schemas import UserResponse
+
+    session = ThreadedSessionLocal()
+    db = ThreadedSession(session)  # 엔드포인트와 동일한 await 인터페이스
+    try:
+        sample = session.query(Annotation).order_by(Annotation.id).first()
+        if sample is None:
+            raise LookupError("검사에 사용할 어노테이션 데이터가 없습니다. (init_db.py 실행 필요)")
+        user = UserResponse.model_validate(session.query(User).filter(User.id == sample.user_id).one())
+        essay = session.get(Essay, sample.essay_id)
+
+        captured = []
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE", "INSERT")):
+                # executemany는 첫 번째 파라미터 세트로 실행 계획 확인
+                captured.append((statement, parameters[0] if executemany else parameters))
+
+        for name, call, *allowed in endpoint_calls(db, user, sample, essay):
+            allowed_scans = ALLOWED_SCANS + tuple(allowed[0] if allowed else ())
+            captured.clear()
+            event.listen(engine, "before_cursor_execute", capture)
+            try:
+                asyncio.run(call())
+            except HTTPException:
+                pass  # 이미 제출된 문항 등 예상된 오류 응답도 실행된 쿼리는 검사
+            finally:
+                event.remove(engine, "before_cursor_execute", capture)
+                session.rollback()
+
+            scans = []
+            with engine.connect() as conn:
+                for statement, parameters in captured:
+                    for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters):
+                        detail = row[-1]
+                        if detail.startswith("SCAN ") and not detail.startswith(allowed_scans):
+                            scans.append((" ".join(statement.split()), detail))
+            yield name, len(captured), scans
+    finally:
+        session.close()
+
+def check(db_path: str) -> int:
+    with tempfile.TemporaryDirectory() as tmp:
+        db_copy = os.path.join(tmp, "annotation.db")
+        shutil.copyfile(db_path, db_copy)
+        os.environ["DATABASE_URL"] = f"sqlite:///{db_copy}"
+
+        from models import engine
+        from migrations import upgrade
+
+        upgrade(engine)
+        failures = 0
+        print("=" * 60)
+        try:
+            for name, n_queries, scans in query_plan_scans():
+                status = "FAIL" if scans else "ok"
+                print(f"[{status:>4}] {name} ({n_queries} queries)")
+                for statement, detail in scans:
+                    print(f"       {detail}")
+                    print(f"       {statement[:200]}")
+                failures += len(scans)
+        except LookupError as exc:
+            print(f"Error: {exc}")
+            return 1
+        finally:
+            engine.dispose()
+
+    print("=" * 60)
+    print("테이블 스캔 없음." if not failures else f"테이블 스캔 {failures}건 발견.")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(check(sys.argv[1] if len(sys.argv) > 1 else "annotation.db"))
@@ -0,0 +1,139 @@
+"""
+임시 저장(draft) write-behind 버퍼
+
+작성 중인 점수/선택 문장을 (user_id, blind_id)별로 메모리에 모아 두었다가, 주기적으로
+(DRAFT_FLUSH_INTERVAL초마다) 또는 버퍼가 DRAFT_MAX_PENDING건을 넘으면 한 트랜잭션에 기록합니다.
+같은 문항을 여러 번 저장해도 마지막 값만 기록되므로 자주 저장하는 클라이언트도 커밋은 주기당 한 번입니다.
+
+- 기록 대상은 제출되지 않은 어노테이션뿐입니다. (제출 후 늦게 도착한 draft는 무시)
+- 제출 시 해당 문항의 draft는 버려지고, 일괄 제출(submit-all) 전에는 버퍼를 먼저 기록합니다.
+- 서버가 정상 종료되면 stop()에서 남은 draft를 모두 기록합니다.
+  (비정상 종료 시 최대 DRAFT_FLUSH_INTERVAL초 분량의 draft가 유실될 수 있음)
+- draft는 제출 데이터가 아니므로 집계 테이블과 version은 바꾸지 않습니다.
+- 버퍼는 프로세스 메모리에 있으므로 API 서버는 단일 워커로 실행해야 합니다. (uvicorn --workers 1, 기본값)
+  워커가 여럿이면 다른 워커의 draft는 submit-all 전에 기록되지 않고, 작업 화면에도 보이지 않습니다.
+"""
+import os
+import asyncio
+import logging
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from sqlalchemy import select, update, bindparam
+
+from models import get_db, Annotation
+from selections import SELECTION_TRAITS, parse_selection, replace_selections
+
+DRAFT_FLUSH_INTERVAL = float(os.getenv("DRAFT_FLUSH_INTERVAL", "5"))
+DRAFT_MAX_PENDING = int(os.getenv("DRAFT_MAX_PENDING", "500"))
+
+logger = logging.getLogger(__name__)
+open_session = asynccontextmanager(get_db)
+
+async def write_drafts(db, drafts):
+    """
+    draft를 어노테이션에 반영 (커밋은 호출한 쪽에서).
+    점수는 executemany UPDATE로 기록하며, 파라미터 키가 같아야 하므로 저장된 컬럼 조합별로 한 번씩 실행합니다.
+    선택 문장은 annotation_sentences 행을 교체합니다.
+    대상 조회 이후 다른 요청이 제출했을 수 있으므로 점수와 선택 문장 모두 기록 시점에 제출 여부를 다시 확인합니다.
+    """
+    targets = {
+        (row.user_id, row.blind_id): row
+        for row in (await db.execute(select(
+            Annotation.id, Annotation.user_id, Annotation.blind_id, Annotation.essay_id
+        ).where(
+            Annotation.blind_id.in_([blind_id for _, blind_id in drafts]),
+            Annotation.is_submitted == False
+        ))).all()
+    }
+
+    groups, selection_changes = defaultdict(list), []
+    for key, values in drafts.items():
+        target = targets.get(key)
+        if target is None:
+            continue  # 이미 제출된 문항
+        scores = {column: value for column, value in values.items() if column.startswith("score_")}
+        if scores:
+            groups[tuple(sorted(scores))].append({"draft_annotation_id": target.id, **scores})
+        selection_changes += [
+            (target.id, target.essay_id, trait, parse_selection(values[f"selected_sentences_{trait}"]))
+            for trait in SELECTION_TRAITS if f"selected_sentences_{trait}" in values
+        ]
+
+    table = Annotation.__table__
+    for columns, rows in groups.items():
+        await db.execute(update(table).where(
+            table.c.id == bindparam("draft_annotation_id"),
+            table.c.is_submitted == False
+        ).values({column: bindparam(column) for column in columns}), rows)
+    await replace_selections(db, selection_changes, unsubmitted_only=True)
+
+class DraftBuffer:
+    def __init__(self, interval=DRAFT_FLUSH_INTERVAL, max_pending=DRAFT_MAX_PENDING):
+        self.interval = interval
+        self.max_pending = max_pending
+        self.pending = {}  # (user_id, blind_id) -> {컬럼: 값}
+        self._lock = asyncio.Lock()  # flush 간 기록 순서 보장
+        self._wakeup = None
+        self._task = None
+
+    def contains(self, user_id, blind_id):
+        return (user_id, blind_id) in self.pending
+
+    def get(self, user_id, blind_id):
+        return self.pending.get((user_id, blind_id))
+
+    def put(self, user_id, blind_id, values):
+        """이전 draft에 덮어써서 병합 (보내지 않은 컬럼은 유지)"""
+        self.pending.setdefault((user_id, blind_id), {}).update(values)
+        if len(self.pending) >= self.max_pending and self._wakeup is not None:
+            self._wakeup.set()
+
+    def discard(self, user_id, blind_id):
+        self.pending.pop((user_id, blind_id), None)
+
+    async def flush(self):
+        """버퍼의 draft를 한 트랜잭션에 기록하고 기록한 건수를 반환. 실패하면 버퍼로 되돌림"""
+        async with self._lock:
+            drafts, self.pending = self.pending, {}
+            if not drafts:
+                return 0
+            try:
+                async with open_session() as db:
+                    await write_drafts(db, drafts)
+                    await db.commit()
+            except BaseException:  # 종료 중 취소된 경우도 포함
+                # 기록하는 동안 새로 들어온 값이 우선
+                for key, values in drafts.items():
+                    self.pending[key] = {**values, **self.pending.get(key, {})}
+                raise
+            return len(drafts)
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Draft flush failed; %d drafts kept for the next attempt", len(self.pending))
+
+    def start(self):
+        """서버 시작 시 호출 (주기적 flush 태스크 시작)"""
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """서버 종료 시 호출: 주기적 flush를 멈추고 남은 draft를 모두 기록"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = self._wakeup = None
+        await self.flush()
+
+draft_buffer = DraftBuffer()
@@ -0,0 +1,230 @@
+"""
+근거 문장 선택 일치도 분석
+
+제출된 어노테이션의 trait별 선택 문장을 에세이 문장 인덱스 위의 비트셋(np.packbits)으로 바꾸고,
+같은 에세이를 평가한 평가자 쌍마다 Jaccard / F1(Dice) 겹침을, 문장마다 선택률을 계산합니다.
+trait 수준 일치도는 (에세이, 문장)을 단위로 한 이진 Krippendorff's alpha입니다.
+
+모든 계산이 어노테이션 수에 선형인 NumPy 배열 연산이라 수만 건도 1초 안에 끝납니다.
+
+사용 예:
+    python evidence_stats.py
+    python evidence_stats.py --rates sentence_rates.csv   # 문장별 선택률 저장
+"""
+import csv
+import sqlite3
+import argparse
+import numpy as np
+
+from validate_stats import alpha_from_coincidence
+
+EVIDENCE_TRAITS = {
+    'language': '언어 영역 (Language)',
+    'organization': '구성 영역 (Organization)',
+    'content': '내용 영역 (Content)'
+}
+
+# 분석 대상: 제출된 어노테이션 (아무 문장도 선택하지 않은 경우도 빈 집합으로 포함)
+SUBMITTED_ANNOTATIONS_QUERY = """
+SELECT a.id, a.essay_id, COALESCE(n.sentence_count, 0) AS sentence_count
+FROM annotations a
+LEFT JOIN (
+    SELECT essay_id, COUNT(*) AS sentence_count FROM essay_sentences GROUP BY essay_id
+) n ON n.essay_id = a.essay_id
+WHERE a.is_submitted = 1
+ORDER BY a.essay_id, a.id
+"""
+
+SUBMITTED_SELECTIONS_QUERY = """
+SELECT s.annotation_id, s.trait, s.sentence_idx
+FROM annotation_sentences s
+JOIN annotations a ON a.id = s.annotation_id
+WHERE a.is_submitted = 1
+"""
+
+# 바이트 값별 1의 개수 (np.bitwise_count가 없는 NumPy 버전에서도 동작)
+POPCOUNT = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(axis=1).astype(np.int64)
+
+def popcount(packed):
+    """packbits 행렬의 행별 1의 개수"""
+    return POPCOUNT[packed].sum(axis=1)
+
+def evidence_data(annotation_rows, selection_rows):
+    """
+    쿼리 결과 → 분석 입력 배열.
+    어노테이션은 essay_id 순으로 정렬되어 있어야 하며(SUBMITTED_ANNOTATIONS_QUERY), 문장 인덱스가
+    없는 에세이는 선택된 문장 번호의 최댓값 + 1을 문장 수로 사용합니다.
+    """
+    annotations = np.array(annotation_rows, dtype=np.int64).reshape(-1, 3)
+    annotation_ids, essay_ids, sentence_counts = annotations.T
+    essays, starts, n_raters = np.unique(essay_ids, return_index=True, return_counts=True)
+    essay_of_row = np.repeat(np.arange(len(essays)), n_raters)
+
+    # 어노테이션 id → 행 번호 (id 정렬 후 searchsorted)
+    order = np.argsort(annotation_ids)
+    ids, traits, idx = (np.array(column) for column in zip(*selection_rows)) if selection_rows else \
+        (np.empty(0, dtype=np.int64), np.empty(0, dtype=str), np.empty(0, dtype=np.int64))
+    pos = np.searchsorted(annotation_ids, ids, sorter=order).clip(max=max(len(order) - 1, 0))
+    found = annotation_ids[order[pos]] == ids if len(order) else np.zeros(len(ids), dtype=bool)
+    found &= idx >= 0  # 음수 번호는 행렬 인덱싱에서 뒤쪽 문장으로 해석되므로 제외
+    selections = {
+        trait: (order[pos[found & (traits == trait)]], idx[found & (traits == trait)].astype(np.int64))
+        for trait in EVIDENCE_TRAITS
+    }
+
+    n_sentences = sentence_counts[starts].copy()
+    for row, idx in selections.values():
+        if len(row):
+            np.maximum.at(n_sentences, essay_of_row[row], idx + 1)
+
+    return {
+        'essay_ids': essays,
+        'starts': starts,
+        'n_raters': n_raters,
+        'essay_of_row': essay_of_row,
+        'n_sentences': n_sentences,
+        'selections': selections,
+    }
+
+def selection_matrix(data, trait):
+    """어노테이션 × 문장 선택 여부 (bool). 열 수는 가장 긴 에세이의 문장 수"""
+    row, idx = data['selections'][trait]
+    width = int(data['n_sentences'].max()) if len(data['n_sentences']) else 0
+    selected = np.zeros((len(data['essay_of_row']), max(width, 1)), dtype=bool)
+    selected[row, idx] = True
+    return selected
+
+def rater_pairs(starts, n_raters):
+    """같은 에세이를 평가한 어노테이션 쌍 (행 번호 a < b). 평가자 수가 같은 에세이끼리 묶어 한 번에 생성"""
+    pair_a, pair_b = [], []
+    for k in np.unique(n_raters[n_raters >= 2]):
+        iu, ju = np.triu_indices(k, 1)
+        group_starts = starts[n_raters == k][:, None]
+        pair_a.append((group_starts + iu).ravel())
+        pair_b.append((group_starts + ju).ravel())
+    if not pair_a:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    return np.concatenate(pair_a), np.concatenate(pair_b)
+
+def pairwise_overlap(packed, pair_a, pair_b):
+    """
+    평가자 쌍별 (Jaccard, F1, 둘 다 빈 선택 여부).
+    한쪽을 정답으로 본 F1은 대칭이므로 Dice 계수 2|A∩B| / (|A|+|B|)와 같습니다.
+    둘 다 아무 문장도 선택하지 않은 쌍은 NaN.
+    """
+    sizes = popcount(packed)
+    intersection = popcount(packed[pair_a] & packed[pair_b])
+    total = sizes[pair_a] + sizes[pair_b]
+    both_empty = total == 0
+    with np.errstate(invalid='ignore', divide='ignore'):
+        jaccard = np.where(both_empty, np.nan, intersection / (total - intersection))
+        f1 = np.where(both_empty, np.nan, 2 * intersection / total)
+    return jaccard, f1, both_empty
+
+def sentence_selection_counts(data, selected):
+    """에세이 × 문장 선택 횟수와 유효 문장 마스크 (에세이 길이를 넘는 칸은 False)"""
+    counts = np.add.reduceat(selected.astype(np.int64), data['starts'], axis=0) if len(data['starts']) else \
+        np.zeros((0, selected.shape[1]), dtype=np.int64)
+    valid = np.arange(selected.shape[1])[None, :] < data['n_sentences'][:, None]
+    return counts, valid
+
+def sentence_alpha(counts, n_raters, valid):
+    """(에세이, 문장)을 단위로 선택/비선택 이진 판단의 Krippendorff's alpha (nominal)"""
+    m = np.broadcast_to(n_raters[:, None], counts.shape)
+    unit = valid & (m >= 2)
+    n1, m = counts[unit].astype(float), m[unit].astype(float)
+    if len(m) == 0:
+        return np.nan
+    n0 = m - n1
+    # o_ck = Σ_u n_uc (n_uk - [c==k]) / (m_u - 1)
+    o_01 = np.sum(n0 * n1 / (m - 1))
+    coincidence = np.array([
+        [np.sum(n0 * (n0 - 1) / (m - 1)), o_01],
+        [o_01, np.sum(n1 * (n1 - 1) / (m - 1))],
+    ])
+    return float(alpha_from_coincidence(coincidence, 'nominal', np.arange(2)))
+
+def trait_evidence(data, trait):
+    """trait 하나의 요약 지표와 문장별 선택 횟수"""
+    selected = selection_matrix(data, trait)
+    packed = np.packbits(selected, axis=1)
+    pair_a, pair_b = rater_pairs(data['starts'], data['n_raters'])
+    jaccard, f1, both_empty = pairwise_overlap(packed, pair_a, pair_b)
+    counts, valid = sentence_selection_counts(data, selected)
+    rates = counts / np.maximum(data['n_raters'], 1)[:, None]
+
+    scored = ~both_empty
+    return {
+        'n_annotations': int(len(selected)),
+        'mean_selected': float(selected.sum(axis=1).mean()) if len(selected) else np.nan,
+        'n_pairs': int(len(pair_a)),
+        'n_empty_pairs': int(both_empty.sum()),
+        'jaccard': float(jaccard[scored].mean()) if scored.any() else np.nan,
+        'f1': float(f1[scored].mean()) if scored.any() else np.nan,
+        'alpha': sentence_alpha(counts, data['n_raters'], valid),
+        'selection_rate': float(rates[valid].mean()) if valid.any() else np.nan,
+    }, counts, valid
+
+def evidence_report(data):
+    """trait별 요약 지표 (관리자 API 등에서 사용)"""
+    return {trait: trait_evidence(data, trait)[0] for trait in EVIDENCE_TRAITS}
+
+def iter_sentence_rates(data):
+    """(essay_id, trait, sentence_idx, n_raters, n_selected, rate) 행"""
+    for trait in EVIDENCE_TRAITS:
+        counts, valid = sentence_selection_counts(data, selection_matrix(data, trait))
+        essay_index, sentence_idx = np.nonzero(valid)
+        n_selected = counts[essay_index, sentence_idx]
+        n_raters = data['n_raters'][essay_index]
+        for essay_id, idx, raters, chosen in zip(data['essay_ids'][essay_index], sentence_idx, n_raters, n_selected):
+            yield int(essay_id), trait, int(idx), int(raters), int(chosen), chosen / raters
+
+def load(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return evidence_data(
+            conn.execute(SUBMITTED_ANNOTATIONS_QUERY).fetchall(),
+            conn.execute(SUBMITTED_SELECTIONS_QUERY).fetchall()
+        )
+    finally:
+        conn.close()
+
+def analyze(db_path='annotation.db', rates_path=None):
+    try:
+        data = load(db_path)
+    except sqlite3.Error as e:
+        print(f"Error: DB를 읽을 수 없습니다. ({e})")
+        return
+    if not len(data['essay_ids']):
+        print("분석할 데이터가 없습니다. (제출된 어노테이션이 필요합니다.)")
+        return
+
+    print("=" * 60)
+    print("🔎 근거 문장 선택 일치도 리포트")
+    print(f"   (제출 어노테이션 {len(data['essay_of_row'])}건, 에세이 {len(data['essay_ids'])}개)")
+    print("=" * 60)
+    for trait, result in evidence_report(data).items():
+        print(f"[{EVIDENCE_TRAITS[trait]}]")
+        print("-" * 30)
+        print(f"1. 어노테이션당 평균 선택 문장 수: {result['mean_selected']:.2f}, 문장별 평균 선택률: {result['selection_rate']:.4f}")
+        if result['n_pairs'] > result['n_empty_pairs']:
+            print(f"2. 평가자 쌍 겹침 ({result['n_pairs'] - result['n_empty_pairs']}쌍, 둘 다 미선택 {result['n_empty_pairs']}쌍 제외): "
+                  f"Jaccard {result['jaccard']:.4f}, F1 {result['f1']:.4f}")
+        else:
+            print("2. 평가자 쌍 겹침: 데이터 부족 (같은 에세이에 근거 문장을 선택한 평가자 쌍 필요)")
+        print(f"3. 문장 단위 Krippendorff's alpha (선택/비선택): {result['alpha']:.4f}")
+
+    if rates_path:
+        with open(rates_path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["essay_id", "trait", "sentence_idx", "n_raters", "n_selected", "rate"])
+            writer.writerows(iter_sentence_rates(data))
+        print(f"✓ 문장별 선택률 저장: {rates_path}")
+    print("=" * 60)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="근거 문장 선택 일치도 분석")
+    parser.add_argument("--db", default="annotation.db")
+    parser.add_argument("--rates", help="문장별 선택률 CSV 경로")
+    args = parser.parse_args()
+    analyze(args.db, args.rates)
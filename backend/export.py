@@ -0,0 +1,192 @@
+"""
+어노테이션 결과 내보내기 (CSV / JSONL / Parquet)
+
+어노테이션 + 평가자 + 에세이 메타데이터를 JOIN한 결과를 yield_per로 chunk 단위로 읽어
+바로 기록하므로, 어노테이션 수와 관계없이 메모리 사용량이 chunk 크기에 비례합니다.
+selected_sentences_* 컬럼은 annotation_sentences에서 chunk마다 한 번에 조회한 정수 리스트입니다.
+(CSV는 리스트 타입이 없으므로 JSON 배열 문자열 "[0, 2]"로 기록)
+
+사용 예:
+    python export.py --format parquet --output annotations.parquet
+    python export.py --format jsonl --include-unsubmitted > annotations.jsonl
+"""
+import io
+import csv
+import sys
+import json
+import argparse
+import orjson
+from sqlalchemy import select
+
+from models import SessionLocal, User, Essay, Annotation
+from selections import SELECTION_TRAITS, selections_query, group_selections
+
+EXPORT_FORMATS = {
+    "csv": "text/csv",  # StreamingResponse가 text/* 에 "; charset=utf-8"을 붙임
+    "jsonl": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+EXPORT_CHUNK_SIZE = 1000
+SENTENCE_COLUMNS = tuple(f"selected_sentences_{trait}" for trait in SELECTION_TRAITS)
+
+EXPORT_COLUMNS = [
+    Annotation.id.label("annotation_id"),
+    Annotation.user_id,
+    User.username,
+    Annotation.essay_id,
+    Annotation.blind_id,
+    Annotation.display_order,
+    Essay.filename,
+    Essay.q_id,
+    Essay.is_original,
+    Essay.noise_level,
+    Annotation.score_language,
+    Annotation.score_organization,
+    Annotation.score_content,
+    Annotation.score_ai_feedback,
+    Annotation.is_submitted,
+    Annotation.created_at,
+    Annotation.updated_at,
+]
+# 선택 문장 컬럼은 점수 다음에 위치
+_split = [column.key for column in EXPORT_COLUMNS].index("score_ai_feedback") + 1
+COLUMN_NAMES = [column.key for column in EXPORT_COLUMNS[:_split]] + list(SENTENCE_COLUMNS) + [
+    column.key for column in EXPORT_COLUMNS[_split:]
+]
+
+def iter_export_chunks(db, include_unsubmitted=False, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    dict 행 리스트를 chunk 단위로 반환합니다.
+    yield_per는 SQLite 커서에서 chunk_size 행씩만 가져오므로 전체 결과를 메모리에 올리지 않습니다.
+    """
+    stmt = select(*EXPORT_COLUMNS).join(User, Annotation.user_id == User.id).join(
+        Essay, Annotation.essay_id == Essay.id
+    ).order_by(Annotation.id)
+    if not include_unsubmitted:
+        stmt = stmt.where(Annotation.is_submitted == True)
+
+    result = db.execute(stmt.execution_options(yield_per=chunk_size))
+    for partition in result.partitions():
+        selections = group_selections(db.execute(selections_query([row.annotation_id for row in partition])).all())
+        rows = []
+        for row in partition:
+            values = row._asdict()
+            selected = selections.get(row.annotation_id, {})
+            for trait in SELECTION_TRAITS:
+                values[f"selected_sentences_{trait}"] = selected.get(trait, [])
+            rows.append({name: values[name] for name in COLUMN_NAMES})
+        yield rows
+
+def _csv_chunks(chunks):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=COLUMN_NAMES)
+    writer.writeheader()
+    for rows in chunks:
+        for values in rows:
+            writer.writerow({
+                k: json.dumps(v) if k in SENTENCE_COLUMNS else v for k, v in values.items()
+            })
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+def _jsonl_chunks(chunks):
+    for rows in chunks:
+        yield b"".join(orjson.dumps(values) + b"\n" for values in rows)
+
+class _DrainableSink(io.RawIOBase):
+    """pyarrow가 쓴 바이트를 모아 두었다가 chunk마다 꺼내는 쓰기 전용 스트림"""
+    def __init__(self):
+        self.pending = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.pending.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self):
+        data = b"".join(self.pending)
+        self.pending.clear()
+        return data
+
+def _parquet_schema():
+    import pyarrow as pa
+    sentences = pa.list_(pa.int32())
+    return pa.schema([
+        ("annotation_id", pa.int64()), ("user_id", pa.int64()), ("username", pa.string()),
+        ("essay_id", pa.int64()), ("blind_id", pa.string()), ("display_order", pa.int32()),
+        ("filename", pa.string()), ("q_id", pa.string()), ("is_original", pa.bool_()), ("noise_level", pa.int32()),
+        ("score_language", pa.int8()), ("score_organization", pa.int8()),
+        ("score_content", pa.int8()), ("score_ai_feedback", pa.int8()),
+        ("selected_sentences_language", sentences), ("selected_sentences_organization", sentences),
+        ("selected_sentences_content", sentences),
+        ("is_submitted", pa.bool_()), ("created_at", pa.string()), ("updated_at", pa.string()),
+    ])
+
+def _parquet_chunks(chunks):
+    """chunk마다 row group 하나를 기록하고 그때까지 쓰인 바이트를 반환"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    schema = _parquet_schema()
+    sink = _DrainableSink()
+    with pq.ParquetWriter(sink, schema) as writer:
+        for rows in chunks:
+            writer.write_table(pa.Table.from_pylist(rows, schema=schema))
+            yield sink.drain()
+    yield sink.drain()  # footer
+
+FORMAT_WRITERS = {"csv": _csv_chunks, "jsonl": _jsonl_chunks, "parquet": _parquet_chunks}
+
+def check_format(fmt):
+    """지원하지 않는 형식이거나 선택 의존성(pyarrow)이 없으면 ValueError"""
+    if fmt not in FORMAT_WRITERS:
+        raise ValueError(f"Unknown export format '{fmt}' (choose from: {', '.join(FORMAT_WRITERS)})")
+    if fmt == "parquet":
+        try:
+            import pyarrow.parquet  # noqa: F401
+        except ImportError:
+            raise ValueError("Parquet export requires pyarrow (pip install pyarrow)")
+
+def stream_export(fmt, include_unsubmitted=False, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    내보내기 바이트 스트림. 자체 동기 세션을 열고 닫으므로 StreamingResponse에 그대로 전달할 수
+    있습니다 (동기 제너레이터는 스레드풀에서 순회됨).
+    """
+    check_format(fmt)
+    db = SessionLocal()
+    try:
+        chunks = iter_export_chunks(db, include_unsubmitted, chunk_size)
+        for data in FORMAT_WRITERS[fmt](chunks):
+            if data:
+                yield data
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="어노테이션 결과 내보내기")
+    parser.add_argument("--format", choices=list(FORMAT_WRITERS), default="csv")
+    parser.add_argument("--output", help="출력 파일 (생략 시 표준 출력)")
+    parser.add_argument("--include-unsubmitted", action="store_true", help="제출되지 않은 어노테이션도 포함")
+    parser.add_argument("--chunk-size", type=int, default=EXPORT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    try:
+        check_format(args.format)
+    except ValueError as e:
+        sys.exit(f"Error: {e}")
+    out = open(args.output, "wb") if args.output else sys.stdout.buffer
+    try:
+        for data in stream_export(args.format, args.include_unsubmitted, args.chunk_size):
+            out.write(data)
+    finally:
+        if args.output:
+            out.close()
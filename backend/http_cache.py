@@ -0,0 +1,33 @@
+import hashlib
+from typing import Optional
+
+from fastapi import Request, Response
+
+# 에세이/참고자료/논문 요약은 init_db.py 실행 이후 변하지 않지만,
+# 사용자별 블라인드 정보가 포함되므로 공유 캐시에는 저장하지 않고 매번 ETag로 재검증
+IMMUTABLE_CACHE_CONTROL = "private, no-cache"
+
+def make_etag(*parts) -> str:
+    """응답을 구성하는 값들의 해시로 강한(strong) ETag 생성"""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(str(part if part is not None else "").encode("utf-8"))
+        digest.update(b"\x1f")
+    return f'"{digest.hexdigest()[:32]}"'
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """If-None-Match 헤더가 주어진 ETag와 일치하는지 확인"""
+    header: Optional[str] = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # If-None-Match는 약한 비교를 사용하므로 W/ 접두사는 무시
+    candidates = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return etag in candidates
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers=cache_headers(etag))
+
+def cache_headers(etag: str) -> dict:
+    return {"ETag": etag, "Cache-Control": IMMUTABLE_CACHE_CONTROL}
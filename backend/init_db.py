@@ -1,116 +1,283 @@
+import re
 import json
 import os
-import random
+import sys
 import uuid
-from models import Base, engine, SessionLocal, User, Essay, Annotation
+import hashlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from sqlalchemy import insert, select, update, bindparam, func
+from models import Base, engine, SessionLocal, User, Paper, Question, Essay, Annotation, EssaySentence, StudyStats
 from auth import get_password_hash
+from migrations import upgrade
+from assignment import build_assignments
+from aggregates import STUDY_STATS_ID, AggregateChanges, rebuild_aggregates
+from sentences import SPLITTER_VERSION, split_sentences
 
-# 테이블 생성 및 초기화
-Base.metadata.drop_all(bind=engine)
-Base.metadata.create_all(bind=engine)
+DATASET_PATH = os.path.join(os.path.dirname(__file__), '..', 'paperclinic_generated_dataset_gemini_1.json')
+SUMMARY_PATH = os.path.join(os.path.dirname(__file__), '..', 'paperclinic_papers_summary_1.json')
 
-def load_and_distribute_essays():
-    json_path = os.path.join(os.path.dirname(__file__), '..', 'paperclinic_generated_dataset_gemini_1.json')
-    if not os.path.exists(json_path):
-        print(f"Error: JSON file not found at {json_path}")
-        return [], {}
-
-    with open(json_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-    
-    all_raw_data = data.get('data', [])
-    
-    # 1. 파일별 그룹화 및 65개 세트(Q1~Q5 각 13개)가 완벽한 논문 찾기
+QUESTIONS_PER_PAPER = 5
+NOISE_PER_QUESTION = 12
+
+# JSON 값 바로 뒤에 올 수 있는 문자 (공백, 구분자, 닫는 괄호)
+VALUE_DELIMITERS = frozenset(' \t\r\n,:]}')
+
+def iter_json_array(path, key='data', chunk_size=1 << 20):
+    """
+    최상위 객체의 key 배열 원소를 하나씩 파싱하여 반환합니다.
+    파일 전체를 메모리에 올리지 않으므로 수 GB 데이터셋도 일정한 메모리로 처리합니다.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, 'r', encoding='utf-8') as f:
+        buf, pos, eof = '', 0, False
+
+        def fill():
+            nonlocal buf, pos, eof
+            chunk = f.read(chunk_size)
+            if not chunk:
+                eof = True
+            buf = buf[pos:] + chunk
+            pos = 0
+
+        def skip_ws():
+            nonlocal pos
+            while True:
+                while pos < len(buf) and buf[pos] in ' \t\r\n':
+                    pos += 1
+                if pos < len(buf) or eof:
+                    return
+                fill()
+
+        def expect(chars):
+            nonlocal pos
+            skip_ws()
+            if pos >= len(buf) or buf[pos] not in chars:
+                raise ValueError(f"Invalid JSON near offset {pos}: expected one of {chars!r}")
+            pos += 1
+            return buf[pos - 1]
+
+        def decode():
+            # 값이 버퍼 경계에서 잘렸을 수 있으므로 파싱에 실패하거나 값 뒤에 구분자가 없으면 더 읽고 재시도
+            # ("4." + "5"처럼 잘린 숫자도 raw_decode는 앞부분만 숫자로 받아들이므로 구분자까지 확인)
+            nonlocal pos
+            skip_ws()
+            while True:
+                try:
+                    value, end = decoder.raw_decode(buf, pos)
+                    if eof or (end < len(buf) and buf[end] in VALUE_DELIMITERS):
+                        pos = end
+                        return value
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                fill()
+
+        expect('{')
+        skip_ws()
+        if buf[pos:pos + 1] == '}':
+            return
+        while True:
+            name = decode()
+            expect(':')
+            if name == key:
+                expect('[')
+                skip_ws()
+                if buf[pos:pos + 1] == ']':
+                    pos += 1
+                else:
+                    while True:
+                        yield decode()
+                        if expect(',]') == ']':
+                            break
+            else:
+                decode()  # 다른 키의 값은 건너뜀
+            if expect(',}') == '}':
+                return
+
+def item_hash(item):
+    """데이터셋 항목의 내용 해시 (키 순서와 무관한 정규화 JSON 기준)"""
+    canonical = json.dumps(item, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+def find_target_papers(items, n_papers=1, known_hashes=frozenset()):
+    """
+    파일별/질문별로 그룹화하면서, Q1~Q5 각각 정답 1개 + 노이즈 12개(총 65개)가
+    갖춰진 논문을 n_papers개 찾는 즉시 중단합니다. 그룹마다 필요한 개수까지만 보관합니다.
+    이미 수집된 항목(known_hashes)은 건너뛰므로 증분 수집 시 새 논문만 선택됩니다.
+    """
     papers = {}
-    for item in all_raw_data:
+    found = []
+    for item in items:
+        item['content_hash'] = item_hash(item)
+        if item['content_hash'] in known_hashes:
+            continue
         fname = item.get('filename')
-        if fname not in papers: papers[fname] = []
-        papers[fname].append(item)
-    
-    target_filename = None
-    target_data = []
-    
-    for fname, items in papers.items():
-        # 질문별 개수 확인 (Q1~Q5 각 13개씩 있는지)
-        q_groups = {}
-        for it in items:
-            q = it.get('question')
-            if q not in q_groups: q_groups[q] = []
-            q_groups[q].append(it)
-        
-        # 5개 질문이 모두 있고, 각 질문당 최소 13개(정답1+노이즈12)가 있는 논문 선택
-        if len(q_groups) == 5:
+        if fname in papers and papers[fname] is None:
+            continue  # 이미 선택된 논문
+        q_groups = papers.setdefault(fname, {})
+        group = q_groups.setdefault(item.get('question'), {'orig': [], 'noise': []})
+        if item.get('is_original'):
+            if not group['orig']:
+                group['orig'].append(item)
+        elif len(group['noise']) < NOISE_PER_QUESTION:
+            group['noise'].append(item)
+
+        complete = [
+            g for g in q_groups.values()
+            if g['orig'] and len(g['noise']) >= NOISE_PER_QUESTION
+        ]
+        if len(complete) == QUESTIONS_PER_PAPER:
             valid_set = []
-            for q_text, q_items in q_groups.items():
-                orig = [it for it in q_items if it.get('is_original')]
-                noise = [it for it in q_items if not it.get('is_original')]
-                if orig and len(noise) >= 12:
-                    valid_set.append(orig[0])
-                    valid_set.extend(noise[:12])
-                else:
-                    break
-            
-            if len(valid_set) == 65:
-                target_filename = fname
-                target_data = valid_set
+            for g in complete:
+                valid_set.append(g['orig'][0])
+                valid_set.extend(g['noise'])
+            found.append((fname, valid_set))
+            papers[fname] = None
+            if len(found) == n_papers:
                 break
-    
-    if not target_filename:
-        print("Error: 65개 세트(Q1~Q5 각 13개)가 완벽한 논문을 찾을 수 없습니다.")
-        return [], {}
-
-    print(f"✓ Target paper identified for blind test: {target_filename} (65 items selected)")
-
-    # 질문 ID 태깅 (Q1~Q5)
-    unique_questions = list(set([item['question'] for item in target_data]))
-    for item in target_data:
-        item['q_id'] = f"Q{unique_questions.index(item['question']) + 1}"
-
-    # 2. 블록(A~E) 층화 분배 (각 블록 13개)
-    blocks = {'A': [], 'B': [], 'C': [], 'D': [], 'E': []}
-    block_names = list(blocks.keys())
-    
-    # 질문별로 13개를 A~E에 고르게 분산
-    for q_idx in range(5):
-        q_id = f"Q{q_idx + 1}"
-        q_pool = [it for it in target_data if it['q_id'] == q_id]
-        orig = [it for it in q_pool if it.get('is_original')][0]
-        noises = [it for it in q_pool if not it.get('is_original')]
-        
-        # 정답 문장은 블록 A~E 중 하나씩 배치 (Q1->A, Q2->B, Q3->C, Q4->D, Q5->E)
-        blocks[block_names[q_idx]].append(orig)
-        
-        # 노이즈 12개를 나머지 블록에 분배
-        random.shuffle(noises)
-        for i, n_item in enumerate(noises):
-            # 순환하며 분배
-            chosen_block = block_names[(q_idx + 1 + i) % 5]
-            blocks[chosen_block].append(n_item)
-
-    return target_data, blocks
-
-def anti_anchoring_shuffle(items):
-    """앵커링 방지를 위해 동일한 Q_id가 연속 노출되지 않도록 셔플"""
-    random.shuffle(items)
-    for i in range(1, len(items) - 1):
-        if items[i].get('q_id') == items[i-1].get('q_id'):
-            for j in range(i+1, len(items)):
-                if items[j].get('q_id') != items[i-1].get('q_id') and items[j].get('q_id') != items[i].get('q_id'):
-                    items[i], items[j] = items[j], items[i]
-                    break
-    return items
-
-db = SessionLocal()
-
-# DB 초기화
-print("! Resetting database for new blind test...")
-db.query(Annotation).delete()
-db.query(Essay).delete()
-db.query(User).delete()
-db.commit()
-
-# 1. 평가자(User) 5명 생성
-test_users = [
+    return found
+
+def load_essays(json_path=DATASET_PATH, n_papers=1, known_hashes=frozenset()):
+    if not os.path.exists(json_path):
+        print(f"Error: JSON file not found at {json_path}")
+        return []
+
+    # 파일별 그룹화 및 65개 세트(Q1~Q5 각 13개)가 완벽한 논문 찾기 (스트리밍)
+    targets = find_target_papers(iter_json_array(json_path, 'data'), n_papers, known_hashes)
+
+    if not targets:
+        if known_hashes:
+            print("✓ 새로 수집할 논문이 없습니다. (모든 항목이 이미 수집됨)")
+        else:
+            print("Error: 65개 세트(Q1~Q5 각 13개)가 완벽한 논문을 찾을 수 없습니다.")
+        return []
+    if len(targets) < n_papers:
+        print(f"! Only {len(targets)} of {n_papers} requested papers are complete.")
+
+    all_data = []
+    for target_filename, target_data in targets:
+        print(f"✓ Target paper identified for blind test: {target_filename} ({len(target_data)} items selected)")
+        # 질문 ID 태깅 (Q1~Q5, 데이터셋 등장 순서 기준이라 실행마다 동일)
+        unique_questions = list(dict.fromkeys(item['question'] for item in target_data))
+        for item in target_data:
+            item['q_id'] = f"Q{unique_questions.index(item['question']) + 1}"
+        all_data.extend(target_data)
+    return all_data
+
+# noise_level 필드가 없는 데이터셋에서 레벨을 추출할 항목 식별자 필드
+NOISE_ID_FIELDS = ('id', 'item_id', 'title')
+
+def parse_noise_level(identifier):
+    """
+    파일명_Q번호_노이즈레벨_인덱스 포맷에서 노이즈 레벨 추출
+    예: 2302.03287v3.pdf_Q1_L2_0 -> 2
+    예: ..._Orig_1 -> 0
+    """
+    if not isinstance(identifier, str):
+        return None
+    if 'Orig' in identifier:
+        return 0
+    match = re.search(r'_L(\d+)_', identifier)
+    if match:
+        return int(match.group(1))
+    return None
+
+def item_noise_level(item):
+    """
+    원본 문항은 0, 노이즈 문항은 데이터셋의 noise_level(또는 level) 값.
+    둘 다 없으면 항목 식별자(NOISE_ID_FIELDS)에서 parse_noise_level로 추출하고, 그래도 없으면 None
+    """
+    if item.get('is_original'):
+        return 0
+    level = item.get('noise_level', item.get('level'))
+    if level is not None:
+        try:
+            return int(level)
+        except (TypeError, ValueError):
+            pass
+    for field in NOISE_ID_FIELDS:
+        parsed = parse_noise_level(item.get(field))
+        if parsed is not None:
+            return parsed
+    return None
+
+def build_essay_row(idx, item, paper_ids, question_ids):
+    output = item.get('output', {})
+    keys = list(output.keys())
+
+    scores = {
+        "content": output.get(keys[0]) if len(keys) > 0 else None,
+        "organization": output.get(keys[1]) if len(keys) > 1 else None,
+        "language": output.get(keys[2]) if len(keys) > 2 else None,
+        "consistency": output.get(keys[3]) if len(keys) > 3 else None
+    }
+
+    ai_feedback = {
+        "evidence_list": item.get('evidence_list', []),
+        "reasoning": item.get('reasoning', '') or item.get('organization_reasoning', ''),
+        "scores": scores,
+        "consistency_score": scores["consistency"],
+        "feedback": item.get('feedback', '')
+    }
+
+    orig_filename = item.get('filename')
+    return {
+        # 파일명을 숨기기 위해 순차적인 번호로 타이틀 부여
+        "title": f"평가 문항 #{idx + 1}",
+        "content": item.get('input', ''),
+        "question": item.get('question', ''),
+        "summary": json.dumps(ai_feedback, ensure_ascii=False),
+        # 논문 요약과 질문별 공통 참고자료는 papers / questions 행을 참조
+        "paper_id": paper_ids[orig_filename],
+        "question_id": question_ids[(orig_filename, item.get('q_id'))],
+        "content_hash": item['content_hash'],
+        "filename": orig_filename,
+        "q_id": item.get('q_id'),
+        "is_original": bool(item.get('is_original')),
+        "noise_level": item_noise_level(item),
+    }
+
+def ensure_papers_and_questions(db, all_data, paper_summaries):
+    """
+    새 에세이가 참조할 논문/질문 행을 만들고 (filename -> paper_id, (filename, q_id) -> question_id)를 반환.
+    증분 수집 시 이미 있는 논문/질문은 그대로 재사용합니다.
+    """
+    filenames = list(dict.fromkeys(item.get('filename') for item in all_data))
+    paper_ids = dict(db.execute(select(Paper.filename, Paper.id).where(Paper.filename.in_(filenames))).all())
+    new_papers = [filename for filename in filenames if filename not in paper_ids]
+    if new_papers:
+        # 실제 논문 요약 매칭 (filename 기반)
+        ids = db.scalars(insert(Paper).returning(Paper.id, sort_by_parameter_order=True), [
+            {"filename": filename, "summary": paper_summaries.get(filename, "요약 정보가 제공되지 않았습니다.")}
+            for filename in new_papers
+        ]).all()
+        paper_ids.update(zip(new_papers, ids))
+
+    # 질문 기반 공통 참고자료 (정답 문항의 evidence_list)
+    question_evidence = {}
+    for item in all_data:
+        key = (item.get('filename'), item.get('q_id'))
+        question_evidence.setdefault(key, [])
+        if item.get('is_original') and item.get('evidence_list'):
+            question_evidence[key] = item.get('evidence_list')
+
+    question_ids = {
+        (filename, q_id): question_id
+        for filename, q_id, question_id in db.execute(select(Paper.filename, Question.q_id, Question.id).join(
+            Paper, Question.paper_id == Paper.id
+        ).where(Paper.filename.in_(filenames))).all()
+    }
+    new_questions = [key for key in question_evidence if key not in question_ids]
+    if new_questions:
+        ids = db.scalars(insert(Question).returning(Question.id, sort_by_parameter_order=True), [
+            {"paper_id": paper_ids[filename], "q_id": q_id, "evidence": json.dumps(question_evidence[(filename, q_id)], ensure_ascii=False)}
+            for filename, q_id in new_questions
+        ]).all()
+        question_ids.update(zip(new_questions, ids))
+    return paper_ids, question_ids
+
+TEST_USERS = [
     {"username": "annotator1", "password": "password123", "full_name": "양윤모"},
     {"username": "annotator2", "password": "password123", "full_name": "최다온"},
     {"username": "annotator3", "password": "password123", "full_name": "홍윤이"},
@@ -118,114 +285,266 @@ test_users = [
     {"username": "annotator5", "password": "password123", "full_name": "송준하"},
 ]
 
-user_map = {}
-for u_data in test_users:
-    user = User(username=u_data["username"], password_hash=get_password_hash(u_data["password"]), full_name=u_data["full_name"])
-    db.add(user)
-    db.flush()
-    user_map[user.username] = user.id
-db.commit()
-print("✓ Created 5 evaluator accounts.")
-
-# 2. 에세이(Essay) 생성
-all_data, blocks = load_and_distribute_essays()
-
-# 질문별 공통 참고자료(정답 문항의 evidence_list) 추출
-question_evidence_map = {}
-for item in all_data:
-    if item.get('is_original') and item.get('evidence_list'):
-        question_evidence_map[item.get('question')] = item.get('evidence_list')
-
-# 논문 요약 데이터 로드
-summary_json_path = os.path.join(os.path.dirname(__file__), '..', 'paperclinic_papers_summary_1.json')
-paper_summaries = {}
-if os.path.exists(summary_json_path):
-    with open(summary_json_path, 'r', encoding='utf-8') as f:
-        paper_summaries = json.load(f)
-    print(f"✓ Loaded {len(paper_summaries)} paper summaries from JSON.")
-
-if all_data:
-    for idx, item in enumerate(all_data):
-        output = item.get('output', {})
-        keys = list(output.keys())
-        
-        scores = {
-            "content": output.get(keys[0]) if len(keys) > 0 else None,
-            "organization": output.get(keys[1]) if len(keys) > 1 else None,
-            "language": output.get(keys[2]) if len(keys) > 2 else None,
-            "consistency": output.get(keys[3]) if len(keys) > 3 else None
-        }
+def make_test_users(n_annotators):
+    """TEST_USERS보다 평가자가 많으면 annotator6, annotator7, ... 계정을 추가로 만듦"""
+    users = TEST_USERS[:n_annotators]
+    for i in range(len(users), n_annotators):
+        users.append({"username": f"annotator{i + 1}", "password": "password123", "full_name": f"평가자{i + 1}"})
+    return users
 
-        ai_feedback = {
-            "evidence_list": item.get('evidence_list', []),
-            "reasoning": item.get('reasoning', '') or item.get('organization_reasoning', ''),
-            "scores": scores,
-            "consistency_score": scores["consistency"],
-            "feedback": item.get('feedback', '')
+def count_unhashed_essays():
+    """content_hash가 없는 (이 기능 이전에 수집된) 에세이 수"""
+    db = SessionLocal()
+    try:
+        return db.scalar(select(func.count(Essay.id)).where(Essay.content_hash.is_(None)))
+    finally:
+        db.close()
+
+def backfill_metadata(dataset_path=DATASET_PATH):
+    """
+    content_hash가 없는 (메타데이터 컬럼 도입 이전에 수집된) 에세이를 데이터셋 항목과 본문·질문으로 매칭해
+    content_hash / filename / q_id / is_original / noise_level을 채우고 집계를 다시 계산합니다.
+    제목은 블라인드 번호라 매칭에 쓸 수 없으므로 (input, question)이 정확히 한 항목과 한 에세이에 대응할 때만 채웁니다.
+    q_id는 load_essays와 같이 논문 안에서 질문이 데이터셋에 처음 등장한 순서로 부여합니다.
+    매칭 결과 {"matched", "unmatched", "ambiguous", "unknown_levels"} 개수를 반환합니다. (데이터셋이 없으면 None)
+    """
+    if not os.path.exists(dataset_path):
+        print(f"Error: JSON file not found at {dataset_path}")
+        return None
+    upgrade()
+    db = SessionLocal()
+    try:
+        essays = db.execute(select(Essay.id, Essay.content, Essay.question, Essay.paper_id, Essay.question_id)
+                            .where(Essay.content_hash.is_(None))).all()
+        by_key = {}
+        for essay in essays:
+            by_key.setdefault((essay.content, essay.question), []).append(essay)
+
+        # 데이터셋을 한 번 스트리밍하며 매칭 후보와 논문별 질문 등장 순서만 보관
+        items, question_order = {}, {}
+        for item in iter_json_array(dataset_path):
+            question_order.setdefault(item.get('filename'), {}).setdefault(item.get('question'), None)
+            key = (item.get('input', ''), item.get('question', ''))
+            if key in by_key:
+                items.setdefault(key, []).append(item)
+
+        matched, ambiguous, unmatched = [], 0, 0
+        for key, key_essays in by_key.items():
+            candidates = items.get(key, [])
+            if not candidates:
+                unmatched += len(key_essays)
+            elif len(candidates) > 1 or len(key_essays) > 1:
+                ambiguous += len(key_essays)
+            else:
+                matched.append((key_essays[0], candidates[0]))
+
+        # 논문 안에서 DB에 있는 질문(이전에 채운 에세이 포함)만 등장 순서대로 Q1, Q2, ...
+        present = {}
+        for _, item in matched:
+            present.setdefault(item.get('filename'), set()).add(item.get('question'))
+        for filename, question in db.execute(select(Essay.filename, Essay.question).where(
+            Essay.filename.in_(list(present))
+        ).distinct()).all():
+            present[filename].add(question)
+        q_ids = {
+            (filename, question): f"Q{rank + 1}"
+            for filename, questions in present.items()
+            for rank, question in enumerate(q for q in question_order[filename] if q in questions)
         }
-        
-        # 파일명을 숨기기 위해 순차적인 번호로 타이틀 부여
-        blind_title = f"평가 문항 #{idx + 1}"
-        
-        # 실제 논문 요약 매칭 (filename 기반)
-        orig_filename = item.get('filename')
-        actual_paper_summary = paper_summaries.get(orig_filename, "요약 정보가 제공되지 않았습니다.")
-        
-        # 질문 기반 공통 참고자료 할당
-        common_evidence = question_evidence_map.get(item.get('question'), [])
-        
-        essay = Essay(
-            title=blind_title,
-            content=item.get('input', ''),
-            question=item.get('question', ''),
-            evidence=json.dumps(common_evidence, ensure_ascii=False),
-            summary=json.dumps(ai_feedback, ensure_ascii=False),
-            paper_summary=actual_paper_summary # 새 컬럼에 저장
-        )
-        db.add(essay)
-        db.flush()
-        
-        # 할당을 위해 DB ID 매핑
-        item['db_id'] = essay.id
-        
-    db.commit()
-    # 검증: Essay 개수 확인 (정확히 65개여야 함)
-    essay_count = db.query(Essay).count()
-    print(f"✓ Validation: {essay_count} essays created. (Expected: 65)")
-
-# 3. 빈 어노테이션(Annotation) 레코드로 할당 (130개)
-if all_data and blocks:
-    evaluator_mapping = {
-        "annotator1": blocks['A'] + blocks['B'],
-        "annotator2": blocks['B'] + blocks['C'],
-        "annotator3": blocks['C'] + blocks['D'],
-        "annotator4": blocks['D'] + blocks['E'],
-        "annotator5": blocks['E'] + blocks['A']
+
+        rows = [
+            {
+                "essay_id": essay.id, "content_hash": item_hash(item), "filename": item.get('filename'),
+                "q_id": q_ids[(item.get('filename'), item.get('question'))],
+                "is_original": bool(item.get('is_original')), "noise_level": item_noise_level(item),
+            }
+            for essay, item in matched
+        ]
+        if rows:
+            table = Essay.__table__
+            db.execute(update(table).where(table.c.id == bindparam("essay_id")).values(
+                content_hash=bindparam("content_hash"), filename=bindparam("filename"), q_id=bindparam("q_id"),
+                is_original=bindparam("is_original"), noise_level=bindparam("noise_level"),
+            ), rows)
+            # 마이그레이션이 메타데이터 없이 만든 논문/질문 행에도 식별자를 채워 --append가 재사용하게 함
+            papers = {(essay.paper_id, row["filename"]) for (essay, _), row in zip(matched, rows) if essay.paper_id}
+            questions = {(essay.question_id, row["q_id"]) for (essay, _), row in zip(matched, rows) if essay.question_id}
+            taken = set(db.scalars(select(Paper.filename).where(Paper.filename.isnot(None))))
+            for paper_id, filename in sorted(papers, key=str):
+                if filename not in taken:
+                    db.execute(update(Paper).where(Paper.id == paper_id, Paper.filename.is_(None)).values(filename=filename))
+                    taken.add(filename)
+            for question_id, q_id in sorted(questions, key=str):
+                db.execute(update(Question).where(Question.id == question_id, Question.q_id.is_(None)).values(q_id=q_id))
+            # 질문별 히스토그램이 (filename, q_id)로 나뉘도록 집계 재계산
+            rebuild_aggregates(db)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+    result = {
+        "matched": len(rows), "unmatched": unmatched, "ambiguous": ambiguous,
+        "unknown_levels": sum(row["noise_level"] is None for row in rows),
     }
-    
-    assign_count = 0
-    for username, assigned_items in evaluator_mapping.items():
-        user_id = user_map.get(username)
-        if not user_id: continue
-        
-        # 유저별 26개 문항 앵커링 방지 셔플
-        shuffled_items = anti_anchoring_shuffle(assigned_items.copy())
-        
-        for order_idx, item in enumerate(shuffled_items):
-            annotation = Annotation(
-                user_id=user_id,
-                essay_id=item['db_id'],
-                blind_id=f"{uuid.uuid4().hex[:8].upper()}", 
-                display_order=order_idx + 1,
-                is_submitted=False
+    print(f"✓ Backfilled metadata for {result['matched']} essays.")
+    if unmatched or ambiguous:
+        print(f"! 데이터셋에서 찾지 못한 에세이 {unmatched}개, 여러 항목과 일치해 건너뛴 에세이 {ambiguous}개")
+    if result["unknown_levels"]:
+        print(f"! noise_level을 알 수 없는 문항 {result['unknown_levels']}개. 노이즈 레벨별 통계에서 제외됩니다.")
+    return result
+
+def main(append=False, n_papers=1, n_annotators=len(TEST_USERS), overlap=2, seed=None,
+         dataset_path=DATASET_PATH, summary_path=SUMMARY_PATH):
+    test_users = make_test_users(n_annotators)
+
+    if append:
+        # 증분 수집: 기존 데이터와 제출된 평가는 유지하고 스키마만 최신으로 맞춤
+        print("! Appending new essays and assignments (existing data is kept)...")
+        upgrade()
+        # 해시가 없는 에세이는 이미 수집된 항목인지 알 수 없어 같은 논문을 다시 수집하게 되므로 중단
+        unhashed = count_unhashed_essays()
+        if unhashed:
+            print(f"Error: content_hash가 없는 에세이가 {unhashed}개 있어 증분 수집을 할 수 없습니다. "
+                  f"(content_hash 도입 이전에 수집된 DB) 먼저 --backfill-metadata를 실행하세요.")
+            return False
+    else:
+        # 테이블 생성 및 초기화
+        print("! Resetting database for new blind test...")
+        Base.metadata.drop_all(bind=engine)
+        Base.metadata.create_all(bind=engine)
+
+    # 모든 쓰기는 하나의 트랜잭션에서 executemany로 수행
+    db = SessionLocal()
+    try:
+        known_hashes = set(db.scalars(select(Essay.content_hash).where(Essay.content_hash.isnot(None))))
+        user_map = dict(db.execute(select(User.username, User.id)).all())
+
+        # 1. 평가자(User) 생성 (없는 계정만)
+        new_users = [u for u in test_users if u["username"] not in user_map]
+        if new_users:
+            # bcrypt 해시는 CPU 작업이므로 프로세스 풀에서 병렬 계산
+            with ProcessPoolExecutor() as pool:
+                password_hashes = list(pool.map(get_password_hash, [u["password"] for u in new_users]))
+            user_ids = db.scalars(
+                insert(User).returning(User.id, sort_by_parameter_order=True),
+                [
+                    {"username": u["username"], "password_hash": h, "full_name": u["full_name"]}
+                    for u, h in zip(new_users, password_hashes)
+                ]
+            ).all()
+            user_map.update({u["username"]: user_id for u, user_id in zip(new_users, user_ids)})
+        print(f"✓ Created {len(new_users)} evaluator accounts. ({len(user_map)} total)")
+
+        all_data = load_essays(dataset_path, n_papers=n_papers, known_hashes=known_hashes)
+
+        # 논문 요약 데이터 로드
+        paper_summaries = {}
+        if all_data and os.path.exists(summary_path):
+            with open(summary_path, 'r', encoding='utf-8') as f:
+                paper_summaries = json.load(f)
+            print(f"✓ Loaded {len(paper_summaries)} paper summaries from JSON.")
+
+        # 2. 논문/질문 + 에세이(Essay) 생성 + 문장 인덱스 (문장 분리는 수집 시점에 한 번만 수행)
+        if all_data:
+            paper_ids, question_ids = ensure_papers_and_questions(db, all_data, paper_summaries)
+            print(f"✓ {len(set(paper_ids.values()))} papers and {len(set(question_ids.values()))} questions referenced.")
+            title_offset = db.scalar(select(func.count(Essay.id)))
+            essay_rows = [
+                build_essay_row(title_offset + idx, item, paper_ids, question_ids)
+                for idx, item in enumerate(all_data)
+            ]
+            unknown_levels = sum(row["noise_level"] is None for row in essay_rows)
+            if unknown_levels:
+                # 노이즈 레벨별 통계(validate_stats.py, 관리자 /stats)에서 제외되므로 수집 시점에 알림
+                print(f"! noise_level을 알 수 없는 문항 {unknown_levels}개 (noise_level / level / 식별자 {'/'.join(NOISE_ID_FIELDS)} 없음). "
+                      f"노이즈 레벨별 통계에서 제외됩니다.")
+            essay_ids = db.scalars(
+                insert(Essay).returning(Essay.id, sort_by_parameter_order=True), essay_rows
+            ).all()
+            sentence_rows = []
+            for item, essay_id, row in zip(all_data, essay_ids, essay_rows):
+                # 할당을 위해 DB ID 매핑
+                item['db_id'] = essay_id
+                sentence_rows.extend(
+                    {"essay_id": essay_id, "idx": i, "text": text, "splitter_version": SPLITTER_VERSION}
+                    for i, text in enumerate(split_sentences(row["content"]))
+                )
+            if sentence_rows:
+                db.execute(insert(EssaySentence), sentence_rows)
+            print(f"✓ {len(essay_ids)} essays created. (Expected: {QUESTIONS_PER_PAPER * (NOISE_PER_QUESTION + 1) * n_papers})")
+            print(f"✓ Sentence index built for {len(essay_ids)} essays.")
+
+        # 3. 빈 어노테이션(Annotation) 레코드로 할당 (새 에세이만, 기존 순서 뒤에 이어 붙임)
+        annotation_rows = []
+        if all_data:
+            # (논문, 질문) 층별로 블록에 고르게 나누고 평가자마다 overlap개 블록을 순환 할당.
+            # 같은 논문의 같은 질문은 연속 노출하지 않으며, 정답 문항은 서로 다른 블록에 분산
+            question_key = lambda item: (item.get('filename'), item['q_id'])
+            assignments = build_assignments(
+                all_data, [u["username"] for u in test_users], overlap=overlap, seed=seed,
+                strata_key=question_key, priority=lambda item: item.get('is_original')
             )
-            db.add(annotation)
-            assign_count += 1
-            
-    db.commit()
-    # 검증: Annotation 할당 개수 확인 (정확히 130개여야 함)
-    total_annotations = db.query(Annotation).count()
-    print(f"✓ Validation: {total_annotations} annotations assigned. (Expected: 130)")
-
-db.close()
-print("\n✓ Database for Blind Test initialized successfully!")
+            order_offsets = dict(db.execute(
+                select(Annotation.user_id, func.max(Annotation.display_order)).group_by(Annotation.user_id)
+            ).all())
+
+            for username, ordered_items in assignments.items():
+                user_id = user_map[username]
+                order_offset = order_offsets.get(user_id) or 0
+
+                for order_idx, item in enumerate(ordered_items):
+                    annotation_rows.append({
+                        "user_id": user_id,
+                        "essay_id": item['db_id'],
+                        "blind_id": f"{uuid.uuid4().hex[:8].upper()}",
+                        "display_order": order_offset + order_idx + 1,
+                        "is_submitted": False,
+                    })
+            db.execute(insert(Annotation), annotation_rows)
+            print(f"✓ {len(annotation_rows)} annotations assigned. (Expected: {len(all_data) * overlap})")
+
+        # 4. 진행률/점수 집계 테이블 갱신 (같은 트랜잭션)
+        if append and db.get(StudyStats, STUDY_STATS_ID) is not None:
+            # 새 할당은 모두 미제출이므로 할당 수만 증가 (기존 데이터는 다시 읽지 않음)
+            changes = AggregateChanges()
+            for row in annotation_rows:
+                changes.record(row["user_id"], row["essay_id"], None, {"submitted": False, "scores": {}})
+            changes.apply_sync(db)
+        else:
+            rebuild_aggregates(db)
+
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+    # 검증: 커밋 후 실제 저장된 개수 확인
+    db = SessionLocal()
+    print(f"✓ Validation: {db.query(Essay).count()} essays, {db.query(Annotation).count()} annotations in database.")
+    db.close()
+    print("\n✓ Database for Blind Test initialized successfully!")
+    return True
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="블라인드 평가용 DB 초기화 / 증분 수집")
+    parser.add_argument("--append", action="store_true",
+                        help="DB를 초기화하지 않고 새 항목과 할당만 추가 (제출된 평가 유지)")
+    parser.add_argument("--papers", type=int, default=1, help="수집할 논문 수 (논문당 65문항)")
+    parser.add_argument("--annotators", type=int, default=len(TEST_USERS), help="평가자 수")
+    parser.add_argument("--overlap", type=int, default=2, help="문항당 평가자 수 (평가자당 블록 수)")
+    parser.add_argument("--seed", type=int, default=None, help="할당 난수 시드 (지정 시 재현 가능)")
+    parser.add_argument("--backfill-metadata", action="store_true",
+                        help="기존 에세이의 content_hash / filename / q_id / noise_level을 데이터셋과 매칭해 채움 (다른 데이터는 유지)")
+    parser.add_argument("--dataset", default=DATASET_PATH, help="데이터셋 JSON 경로")
+    parser.add_argument("--summaries", default=SUMMARY_PATH, help="논문 요약 JSON 경로")
+    args = parser.parse_args()
+    if args.backfill_metadata:
+        sys.exit(0 if backfill_metadata(args.dataset) is not None else 1)
+    ok = main(append=args.append, n_papers=args.papers, n_annotators=args.annotators,
+              overlap=args.overlap, seed=args.seed, dataset_path=args.dataset, summary_path=args.summaries)
+    sys.exit(0 if ok else 1)
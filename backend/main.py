@@ -1,23 +1,40 @@
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
-from annotation import router as annotations_router
-from typing import List
-import json
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from annotation import router as annotations_router, build_annotation_response
+from admin import router as admin_router
+from typing import List, Optional
 
-from models import get_db, User, Essay, Annotation
+from models import get_db, dispose_engines, User, Paper, Question, Essay, Annotation
 from schemas import (
     UserLogin, Token, UserResponse,
-    EssayResponse, EssayDetail,
+    EssayResponse, EssayDetail, PaperResponse, QuestionResponse,
     AnnotationCreate, AnnotationUpdate, AnnotationResponse,
     TraitAnnotation, BlindAnnotationInfo
 )
 from auth import (
-    verify_password, create_access_token, get_current_user
+    verify_password_async, shutdown_password_pool, create_user_token, get_current_user, revoke_user_tokens, load_revocations
 )
+from sentences import SPLITTER_VERSION, get_sentences, ensure_sentence_index
+from http_cache import make_etag, etag_matches, not_modified, cache_headers
+from responses import json_response, add_compression
+from migrations import upgrade
+from aggregates import TRAITS, AggregateChanges, annotation_state, ensure_aggregates
+from drafts import draft_buffer
+from selections import SELECTION_TRAITS, parse_selection, load_selections, replace_selections
 
-app = FastAPI(title="Annotation Tool API")
+# 기존 annotation.db에 새로 추가된 테이블/컬럼/인덱스 반영 (집계 테이블이 새로 생겼으면 채움)
+upgrade()
+ensure_aggregates()
+ensure_sentence_index()  # 요청 처리 중에는 문장 인덱스를 쓰지 않음
+load_revocations()  # 재시작 전에 폐기된 토큰
+
+ANNOTATION_CONFLICT_DETAIL = "다른 창에서 먼저 저장된 내용이 있습니다. 새로고침 후 다시 저장해 주세요."
+
+app = FastAPI(title="Annotation Tool API", default_response_class=ORJSONResponse)
 
 # CORS middleware
 app.add_middleware(
@@ -27,144 +44,221 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+add_compression(app)
 app.include_router(annotations_router)
+app.include_router(admin_router)
+
+@app.on_event("startup")
+async def on_startup():
+    draft_buffer.start()
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    await draft_buffer.stop()  # 남은 임시 저장을 기록한 뒤 커넥션 정리
+    shutdown_password_pool()
+    await dispose_engines()
+
 # ============ AUTH ENDPOINTS ============
 
 @app.post("/api/auth/login", response_model=Token)
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.username == form_data.username).first()
-    if not user or not verify_password(form_data.password, user.password_hash):
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)):
+    user = (await db.execute(select(User).where(User.username == form_data.username))).scalars().first()
+    # bcrypt 검증은 프로세스 풀에서 수행하여 요청 스레드를 막지 않음.
+    # 검증을 기다리는 동안 DB 커넥션을 점유하지 않도록 세션을 먼저 반환
+    await db.close()
+    if not user or not await verify_password_async(form_data.password, user.password_hash):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password"
         )
     
-    access_token = create_access_token(data={"sub": user.username})
+    access_token = create_user_token(user)
     return {
         "access_token": access_token,
         "token_type": "bearer",
         "user": UserResponse.from_orm(user)
     }
 
+@app.post("/api/auth/logout")
+async def logout(current_user: UserResponse = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    """현재 사용자에게 지금까지 발급된 모든 토큰을 폐기 (다른 기기/탭의 토큰 포함)"""
+    await revoke_user_tokens(db, current_user.id)
+    return {"message": "로그아웃되었습니다."}
+
 @app.get("/api/users/me", response_model=UserResponse)
-def get_current_user_info(current_user: User = Depends(get_current_user)):
-    return UserResponse.from_orm(current_user)
+async def get_current_user_info(current_user: UserResponse = Depends(get_current_user)):
+    return current_user
 
 # ============ ESSAY ENDPOINTS ============
 
-@app.get("/api/essays", response_model=List[EssayResponse])
-def get_essays(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    # 해당 사용자의 어노테이션 목록을 display_order 순서로 가져옴
-    annotations = db.query(Annotation).filter(
+# 목록 화면에서 선택적으로 요청할 수 있는 본문 컬럼 (나머지는 Annotation/Essay의 가벼운 컬럼)
+ESSAY_TEXT_COLUMNS = {
+    "content": Essay.content,
+    "summary": Essay.summary,
+}
+
+# fields 생략 시 목록 응답: 본문/AI 요약 같은 대용량 텍스트는 요청할 때만 포함
+ESSAY_LISTING_FIELDS = set(EssayResponse.model_fields) - set(ESSAY_TEXT_COLUMNS)
+
+def parse_fields(fields: Optional[str], allowed, default=None) -> set:
+    """fields=a,b,c 쿼리 파라미터를 검증하여 집합으로 반환 (None이면 default, 없으면 전체)"""
+    if fields is None:
+        return set(allowed if default is None else default)
+    requested = {f.strip() for f in fields.split(",") if f.strip()}
+    unknown = requested - set(allowed)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+    return requested
+
+@app.get("/api/essays", response_model=List[EssayResponse], response_model_exclude_unset=True)
+async def get_essays(
+    fields: Optional[str] = Query(None, description="쉼표로 구분한 응답 필드 목록 (예: title,question,is_annotated). 생략 시 content/summary 제외"),
+    current_user: UserResponse = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    selected = parse_fields(fields, EssayResponse.model_fields, default=ESSAY_LISTING_FIELDS)
+    # 대시보드 이동에 필요한 식별자는 항상 포함
+    selected |= {"id", "blind_id"}
+    text_columns = [name for name in ESSAY_TEXT_COLUMNS if name in selected]
+
+    # 해당 사용자의 어노테이션 목록을 display_order 순서로 한 번의 JOIN 쿼리로 가져옴
+    rows = (await db.execute(select(
+        Essay.id, Essay.question, Essay.paper_id, Essay.question_id,
+        Annotation.display_order, Annotation.is_submitted, Annotation.blind_id,
+        *[ESSAY_TEXT_COLUMNS[name] for name in text_columns]
+    ).join(Essay, Annotation.essay_id == Essay.id).where(
         Annotation.user_id == current_user.id
-    ).order_by(Annotation.display_order.asc()).all()
+    ).order_by(Annotation.display_order.asc()))).all()
     
     result = []
-    for ann in annotations:
-        essay = ann.essay
-        result.append(EssayResponse(
-            id=essay.id,
-            title=f"평가 문항 #{ann.display_order}", # 블라인드 순번 제목
-            content=essay.content,
-            question=essay.question,
-            is_annotated=ann.is_submitted,
-            summary=essay.summary,
-            paper_summary=essay.paper_summary,
-            blind_id=ann.blind_id
-        ))
-    return result
+    for row in rows:
+        values = {
+            "id": row.id,
+            "title": f"평가 문항 #{row.display_order}", # 블라인드 순번 제목
+            "question": row.question,
+            "is_annotated": row.is_submitted,
+            "paper_id": row.paper_id,
+            "question_id": row.question_id,
+            "blind_id": row.blind_id,
+        }
+        for name in text_columns:
+            values[name] = getattr(row, name)
+        result.append(EssayResponse(**{k: v for k, v in values.items() if k in selected}))
+    return json_response(result, exclude_unset=True, raw_fields=("summary",))
 
 @app.get("/api/essays/{essay_id}", response_model=EssayDetail)
-def get_essay(essay_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    essay = db.query(Essay).filter(Essay.id == essay_id).first()
+async def get_essay(
+    essay_id: int,
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    current_user: UserResponse = Depends(get_current_user)
+):
+    essay = await db.get(Essay, essay_id)
     if not essay:
         raise HTTPException(status_code=404, detail="Essay not found")
     
-    # [Refactored Sentence Splitter]
-    import re
-    raw_content = essay.content.strip()
-    
-    # 1. 단순 분리: 온점/물음표/느낌표 뒤에 공백이 오면 일단 분리
-    # (?<=[.!?]) : 문장 부호 뒤를 보되
-    # \s+(?=[A-Z가-힣]) : 뒤에 공백이 있고 그 다음에 대문자나 한글이 올 때만 분리
-    split_pattern = r'(?<=[.!?])\s+(?=[A-Z가-힣])|\n'
-    
-    temp_sentences = [s.strip() for s in re.split(split_pattern, raw_content) if s.strip()]
-    
-    # 2. 예외 케이스 병합 (후처리)
-    # 약어 목록 (이 단어들로 문장이 끝나면 다음 문장과 합침)
-    exceptions = ('et al.', 'e.g.', 'i.e.', 'Fig.', 'vs.', 'Eq.', 'Dr.', 'Mr.', 'Mrs.', '.NET', '. NET')
-    
-    final_sentences = []
-    for s in temp_sentences:
-        if final_sentences:
-            prev = final_sentences[-1]
-            # 이전 문장이 약어로 끝나거나, 현재 문장이 NET 등으로 시작하면 합침
-            if prev.endswith(exceptions) or s.startswith(('.NET', '. NET', 'NET')):
-                final_sentences[-1] = prev + " " + s
-                continue
-        final_sentences.append(s)
-    
     # 해당 사용자의 어노테이션 정보 조회 (블라인드 ID 및 순서 확인용)
-    annotation = db.query(Annotation).filter(
+    annotation = (await db.execute(select(Annotation.blind_id, Annotation.display_order).where(
         Annotation.user_id == current_user.id,
         Annotation.essay_id == essay.id
-    ).first()
+    ))).first()
+    
+    # 에세이 본문은 변하지 않으므로 내용 해시가 같으면 본문을 다시 만들지 않고 304 반환
+    etag = make_etag(
+        essay.id, essay.content, essay.question, essay.summary, essay.paper_id, essay.question_id,
+        annotation.blind_id if annotation else None,
+        annotation.display_order if annotation else None,
+        SPLITTER_VERSION
+    )
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    
+    # 수집 시점에 만들어 둔 문장 인덱스를 그대로 사용
+    final_sentences = await db.run_sync(get_sentences, essay)
     
-    return EssayDetail(
+    response = json_response(EssayDetail(
         id=essay.id,
         title=f"평가 문항 #{annotation.display_order}" if annotation else "평가 문항", # 블라인드 처리
         content=essay.content,
         question=essay.question,
-        evidence=essay.evidence,
         sentences=final_sentences,
         summary=essay.summary,
-        paper_summary=essay.paper_summary,
+        paper_id=essay.paper_id,
+        question_id=essay.question_id,
         blind_id=annotation.blind_id if annotation else None
+    ), raw_fields=("summary",))
+    response.headers.update(cache_headers(etag))
+    return response
+
+# ============ PAPER / QUESTION ENDPOINTS ============
+# 논문 요약과 질문별 참고자료는 여러 에세이가 공유하므로 에세이 응답에는 id만 넣고 따로 제공.
+# 사용자와 무관하고 수집 이후 변하지 않으므로 같은 논문/질문의 다른 에세이로 이동하면 304로 재사용됨
+
+@app.get("/api/papers/{paper_id}", response_model=PaperResponse)
+async def get_paper(
+    paper_id: int,
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    current_user: UserResponse = Depends(get_current_user)
+):
+    paper = (await db.execute(select(Paper.id, Paper.summary).where(Paper.id == paper_id))).first()
+    if not paper:
+        raise HTTPException(status_code=404, detail="Paper not found")
+
+    etag = make_etag(paper.id, paper.summary)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    response = json_response(PaperResponse(id=paper.id, summary=paper.summary))
+    response.headers.update(cache_headers(etag))
+    return response
+
+@app.get("/api/questions/{question_id}", response_model=QuestionResponse)
+async def get_question(
+    question_id: int,
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    current_user: UserResponse = Depends(get_current_user)
+):
+    question = (await db.execute(select(
+        Question.id, Question.paper_id, Question.evidence
+    ).where(Question.id == question_id))).first()
+    if not question:
+        raise HTTPException(status_code=404, detail="Question not found")
+
+    etag = make_etag(question.id, question.paper_id, question.evidence)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    response = json_response(
+        QuestionResponse(id=question.id, paper_id=question.paper_id, evidence=question.evidence), raw_fields=("evidence",)
     )
+    response.headers.update(cache_headers(etag))
+    return response
 
 # ============ ANNOTATION ENDPOINTS ============
 
 @app.get("/api/annotations/essay-data/{essay_id}")
-def get_annotation(essay_id: int, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    annotation = db.query(Annotation).filter(
+async def get_annotation(essay_id: int, current_user: UserResponse = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    annotation = (await db.execute(select(Annotation).where(
         Annotation.user_id == current_user.id,
         Annotation.essay_id == essay_id
-    ).first()
+    ))).scalars().first()
     
     if not annotation:
         return None
     
-    return AnnotationResponse(
-        id=annotation.id,
-        essay_id=annotation.essay_id,
-        language=TraitAnnotation(
-            score=annotation.score_language,
-            selected_sentences=json.loads(annotation.selected_sentences_language) if annotation.selected_sentences_language else []
-        ),
-        organization=TraitAnnotation(
-            score=annotation.score_organization,
-            selected_sentences=json.loads(annotation.selected_sentences_organization) if annotation.selected_sentences_organization else []
-        ),
-        content=TraitAnnotation(
-            score=annotation.score_content,
-            selected_sentences=json.loads(annotation.selected_sentences_content) if annotation.selected_sentences_content else []
-        ),
-        ai_feedback_score=annotation.score_ai_feedback,
-        is_submitted=annotation.is_submitted
-    )
+    return build_annotation_response(annotation, (await load_selections(db, [annotation.id]))[annotation.id])
 
 @app.post("/api/annotations", response_model=AnnotationResponse)
-def create_annotation(
+async def create_annotation(
     data: AnnotationCreate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: UserResponse = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
     # Check if annotation already exists
-    existing = db.query(Annotation).filter(
+    existing = (await db.execute(select(Annotation.id).where(
         Annotation.user_id == current_user.id,
         Annotation.essay_id == data.essay_id
-    ).first()
+    ))).first()
     
     if existing:
         raise HTTPException(status_code=400, detail="Annotation already exists. Use PATCH to update.")
@@ -173,18 +267,23 @@ def create_annotation(
         user_id=current_user.id,
         essay_id=data.essay_id,
         score_language=data.language.score,
-        selected_sentences_language=json.dumps(data.language.selected_sentences),
         score_organization=data.organization.score,
-        selected_sentences_organization=json.dumps(data.organization.selected_sentences),
         score_content=data.content.score,
-        selected_sentences_content=json.dumps(data.content.selected_sentences),
         score_ai_feedback=data.ai_feedback_score,
         is_submitted=True
     )
     
     db.add(annotation)
-    db.commit()
-    db.refresh(annotation)
+    await db.flush()  # 선택 문장 행에 필요한 id 할당
+    await replace_selections(db, [
+        (annotation.id, data.essay_id, trait, parse_selection(getattr(data, trait).selected_sentences))
+        for trait in SELECTION_TRAITS
+    ])
+    changes = AggregateChanges()
+    changes.record(current_user.id, data.essay_id, None, annotation_state(annotation))
+    await changes.apply(db)
+    await db.commit()
+    await db.refresh(annotation)
     
     return AnnotationResponse(
         id=annotation.id,
@@ -193,79 +292,118 @@ def create_annotation(
         organization=data.organization,
         content=data.content,
         ai_feedback_score=annotation.score_ai_feedback,
-        is_submitted=annotation.is_submitted
+        is_submitted=annotation.is_submitted,
+        version=annotation.version
     )
 
 @app.patch("/api/annotations/{annotation_id}", response_model=AnnotationResponse)
-def update_annotation(
+async def update_annotation(
     annotation_id: int,
     data: AnnotationUpdate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: UserResponse = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
-    annotation = db.query(Annotation).filter(
+    # 집계 변경분 계산에 필요한 컬럼만 조회 (ORM 객체를 만들지 않음)
+    current = (await db.execute(select(
+        Annotation.essay_id, Annotation.blind_id, Annotation.is_submitted, Annotation.version,
+        *(getattr(Annotation, f"score_{trait}") for trait in TRAITS)
+    ).where(
         Annotation.id == annotation_id,
         Annotation.user_id == current_user.id
-    ).first()
+    ))).first()
     
-    if not annotation:
+    if not current:
         raise HTTPException(status_code=404, detail="Annotation not found")
+    if data.version is not None and data.version != current.version:
+        raise HTTPException(status_code=409, detail=ANNOTATION_CONFLICT_DETAIL)
     
-    if data.language:
-        annotation.score_language = data.language.score
-        annotation.selected_sentences_language = json.dumps(data.language.selected_sentences)
+    values, selected = {}, {}
+    for trait in SELECTION_TRAITS:
+        trait_data = getattr(data, trait)
+        if trait_data:
+            values[f"score_{trait}"] = trait_data.score
+            selected[trait] = parse_selection(trait_data.selected_sentences)
+    if data.ai_feedback_score is not None:
+        values["score_ai_feedback"] = data.ai_feedback_score
     
-    if data.organization:
-        annotation.score_organization = data.organization.score
-        annotation.selected_sentences_organization = json.dumps(data.organization.selected_sentences)
+    # 조회한 version과 같을 때만 반영: 다른 탭/요청이 먼저 저장했다면 0행이 갱신되어 409
+    # (클라이언트가 version을 보내지 않아도 집계 변경분이 어긋나지 않도록 항상 조건을 검)
+    table = Annotation.__table__
+    unchanged = [trait for trait in SELECTION_TRAITS if trait not in selected]
+    returning = [table.c.version] + [table.c[f"score_{trait}"] for trait in unchanged]
+    if data.ai_feedback_score is None:
+        returning.append(table.c.score_ai_feedback)
+    updated = (await db.execute(update(table).where(
+        table.c.id == annotation_id,
+        table.c.user_id == current_user.id,
+        table.c.version == current.version
+    ).values(**values, is_submitted=True, version=table.c.version + 1).returning(*returning))).first()
     
-    if data.content:
-        annotation.score_content = data.content.score
-        annotation.selected_sentences_content = json.dumps(data.content.selected_sentences)
+    if updated is None:
+        await db.rollback()
+        raise HTTPException(status_code=409, detail=ANNOTATION_CONFLICT_DETAIL)
     
-    if data.ai_feedback_score is not None:
-        annotation.score_ai_feedback = data.ai_feedback_score
+    await replace_selections(db, [
+        (annotation_id, current.essay_id, trait, indices) for trait, indices in selected.items()
+    ])
+    # 요청에 없는 trait의 선택 문장만 조회 (프론트엔드는 세 trait을 모두 보내므로 보통 생략됨)
+    stored = (await load_selections(db, [annotation_id], unchanged))[annotation_id] if unchanged else {}
     
-    annotation.is_submitted = True
+    # 집계 테이블도 같은 트랜잭션에서 갱신
+    before = {"submitted": bool(current.is_submitted), "scores": {trait: getattr(current, f"score_{trait}") for trait in TRAITS}}
+    after = {"submitted": True, "scores": {
+        trait: values.get(f"score_{trait}", getattr(current, f"score_{trait}")) for trait in TRAITS
+    }}
+    changes = AggregateChanges()
+    changes.record(current_user.id, current.essay_id, before, after)
+    await changes.apply(db)
+    await db.commit()
+    draft_buffer.discard(current_user.id, current.blind_id)
     
-    db.commit()
-    db.refresh(annotation)
+    # 응답은 요청 내용 + RETURNING 값으로 구성 (어노테이션을 다시 조회하지 않음)
+    def trait_response(trait):
+        if trait in selected:
+            return TraitAnnotation(score=values[f"score_{trait}"], selected_sentences=selected[trait])
+        return TraitAnnotation(score=getattr(updated, f"score_{trait}"), selected_sentences=stored.get(trait, []))
     
     return AnnotationResponse(
-        id=annotation.id,
-        essay_id=annotation.essay_id,
-        language=TraitAnnotation(
-            score=annotation.score_language,
-            selected_sentences=json.loads(annotation.selected_sentences_language) if annotation.selected_sentences_language else []
-        ),
-        organization=TraitAnnotation(
-            score=annotation.score_organization,
-            selected_sentences=json.loads(annotation.selected_sentences_organization) if annotation.selected_sentences_organization else []
-        ),
-        content=TraitAnnotation(
-            score=annotation.score_content,
-            selected_sentences=json.loads(annotation.selected_sentences_content) if annotation.selected_sentences_content else []
-        ),
-        ai_feedback_score=annotation.score_ai_feedback,
-        is_submitted=annotation.is_submitted
+        id=annotation_id,
+        essay_id=current.essay_id,
+        language=trait_response("language"),
+        organization=trait_response("organization"),
+        content=trait_response("content"),
+        ai_feedback_score=values["score_ai_feedback"] if "score_ai_feedback" in values else updated.score_ai_feedback,
+        is_submitted=True,
+        version=updated.version
     )
 
 @app.post("/api/annotations/submit-all")
-def submit_all_annotations(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    annotations = db.query(Annotation).filter(
-        Annotation.user_id == current_user.id,
-        Annotation.is_submitted == False
-    ).all()
+async def submit_all_annotations(current_user: UserResponse = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    # 임시 저장된 점수가 제출 내용과 집계에 포함되도록 먼저 기록
+    await draft_buffer.flush()
+    # 조회 후 갱신하지 않고 한 문장으로 제출 처리: 실제로 바뀐 행(RETURNING)만 집계에 반영하므로
+    # 동시에 제출된 문항을 두 번 세지 않음 (점수는 바뀌지 않고 제출 여부만 바뀜)
+    table = Annotation.__table__
+    annotations = (await db.execute(update(table).where(
+        table.c.user_id == current_user.id,
+        table.c.is_submitted == False
+    ).values(is_submitted=True, version=table.c.version + 1).returning(
+        table.c.essay_id, *(table.c[f"score_{trait}"] for trait in TRAITS)
+    ))).all()
     
+    changes = AggregateChanges()
     for annotation in annotations:
-        annotation.is_submitted = True
+        scores = {trait: getattr(annotation, f"score_{trait}") for trait in TRAITS}
+        changes.record(current_user.id, annotation.essay_id,
+                       {"submitted": False, "scores": scores}, {"submitted": True, "scores": scores})
     
-    db.commit()
+    await changes.apply(db)
+    await db.commit()
     
     return {"submitted_count": len(annotations)}
 
 @app.get("/")
-def root():
+async def root():
     return {"message": "Annotation Tool API", "version": "1.0"}
 
 if __name__ == "__main__":
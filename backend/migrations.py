@@ -0,0 +1,212 @@
+"""
+기존 annotation.db를 현재 모델 정의에 맞게 갱신하는 경량 마이그레이션
+
+데이터를 지우지 않고 다음만 수행합니다. (여러 번 실행해도 안전)
+1. 없는 테이블 생성
+2. 기존 테이블에 없는 컬럼 추가 (ALTER TABLE ... ADD COLUMN)
+3. 없는 인덱스 생성
+4. 이전 버전의 selected_sentences_* JSON 컬럼 값을 annotation_sentences 테이블로 복사 (한 번만)
+5. 이전 버전 essays 테이블의 paper_summary / evidence 값을 papers / questions 테이블로 복사
+6. 응답에 JSON으로 그대로 삽입하는 컬럼(essays.summary, questions.evidence)의 유효하지 않은 값을 JSON 문자열로 변환
+
+4, 5의 원래 컬럼은 그대로 남습니다. 복사 결과를 확인한 뒤 아래 명령으로 삭제합니다. (삭제 전에 백업 생성)
+    python migrations.py --drop-legacy-columns
+"""
+import sqlite3
+import argparse
+from datetime import datetime
+
+from sqlalchemy import inspect, insert, select, text
+from sqlalchemy.engine import Engine
+
+from models import Base, engine, Paper, Question, SchemaMigration
+
+def _add_column_sql(table_name: str, column, dialect) -> str:
+    column_type = column.type.compile(dialect=dialect)
+    sql = f'ALTER TABLE {table_name} ADD COLUMN {column.name} {column_type}'
+    if column.server_default is not None:
+        sql += f" DEFAULT {column.server_default.arg}"
+    return sql
+
+# 이전 버전 annotations 테이블의 JSON 배열 컬럼 -> trait
+LEGACY_SELECTION_COLUMNS = {
+    "selected_sentences_language": "language",
+    "selected_sentences_organization": "organization",
+    "selected_sentences_content": "content",
+}
+
+# 이전 버전 컬럼 (upgrade()는 값을 복사만 하고, 삭제는 drop_legacy_columns()에서)
+LEGACY_COLUMNS = {
+    "annotations": list(LEGACY_SELECTION_COLUMNS),
+    "essays": ["paper_summary", "evidence"],
+}
+
+def _run_once(conn, name) -> bool:
+    """name으로 기록된 데이터 이동이 없으면 기록하고 True (같은 트랜잭션에서 이동을 수행)"""
+    if conn.scalar(select(SchemaMigration.name).where(SchemaMigration.name == name)) is not None:
+        return False
+    conn.execute(insert(SchemaMigration), {"name": name, "applied_at": datetime.utcnow().isoformat()})
+    return True
+
+def _migrate_selected_sentences(conn, existing_columns) -> list:
+    """
+    JSON 배열을 annotation_sentences 행으로 복사 (원래 컬럼은 유지).
+    이후 API에서 바뀐 선택을 이전 값으로 되돌리지 않도록 schema_migrations에 기록해 한 번만 실행합니다.
+    """
+    columns = [column for column in LEGACY_SELECTION_COLUMNS if column in existing_columns]
+    if not columns or not _run_once(conn, "copy_selected_sentences"):
+        return []
+    applied = []
+    for column in columns:
+        # 잘못된 JSON이나 배열이 아닌 값은 빈 배열로, 음수 번호는 무시
+        source = f"CASE WHEN json_valid(a.{column}) AND json_type(a.{column}) = 'array' THEN a.{column} ELSE '[]' END"
+        copied = conn.execute(text(f"""
+            INSERT OR IGNORE INTO annotation_sentences (annotation_id, essay_id, trait, sentence_idx)
+            SELECT a.id, a.essay_id, :trait, CAST(j.value AS INTEGER)
+            FROM annotations a, json_each({source}) j
+            WHERE a.{column} IS NOT NULL AND CAST(j.value AS INTEGER) >= 0
+        """), {"trait": LEGACY_SELECTION_COLUMNS[column]}).rowcount
+        if copied:
+            applied.append(f"copy {copied} rows of annotations.{column} to annotation_sentences")
+    return applied
+
+def _migrate_papers_and_questions(conn, existing_columns) -> list:
+    """
+    에세이마다 복사되어 있던 논문 요약과 질문별 참고자료를 papers / questions 행 하나로 모음 (원래 컬럼은 유지).
+    paper_id / question_id가 채워진 에세이는 건너뛰므로 다시 실행해도 안전합니다.
+    """
+    if not {"paper_summary", "evidence"} <= existing_columns:
+        return []
+    n_papers = n_questions = 0
+
+    # 논문: filename 단위 (메타데이터가 없는 이전 데이터는 같은 요약끼리 묶음)
+    groups = conn.execute(text("""
+        SELECT filename, paper_summary FROM essays WHERE paper_id IS NULL
+        GROUP BY filename, CASE WHEN filename IS NULL THEN paper_summary END
+    """)).all()
+    for filename, summary in groups:
+        paper_id = conn.scalar(text("SELECT id FROM papers WHERE filename = :filename"), {"filename": filename})
+        if paper_id is None:
+            paper_id = conn.scalar(insert(Paper).returning(Paper.id), {"filename": filename, "summary": summary})
+            n_papers += 1
+        conn.execute(text("""
+            UPDATE essays SET paper_id = :paper_id
+            WHERE paper_id IS NULL AND filename IS :filename AND (filename IS NOT NULL OR paper_summary IS :summary)
+        """), {"paper_id": paper_id, "filename": filename, "summary": summary})
+
+    # 질문: (논문, 질문 번호) 단위 (질문 번호가 없는 이전 데이터는 질문 문장으로 묶음)
+    groups = conn.execute(text("""
+        SELECT paper_id, q_id, question, MAX(evidence) FROM essays WHERE question_id IS NULL
+        GROUP BY paper_id, q_id, CASE WHEN q_id IS NULL THEN question END
+    """)).all()
+    for paper_id, q_id, question, evidence in groups:
+        question_id = conn.scalar(
+            text("SELECT id FROM questions WHERE paper_id = :paper_id AND q_id = :q_id"), {"paper_id": paper_id, "q_id": q_id}
+        )
+        if question_id is None:
+            question_id = conn.scalar(
+                insert(Question).returning(Question.id), {"paper_id": paper_id, "q_id": q_id, "evidence": evidence}
+            )
+            n_questions += 1
+        conn.execute(text("""
+            UPDATE essays SET question_id = :question_id
+            WHERE question_id IS NULL AND paper_id IS :paper_id AND q_id IS :q_id AND (q_id IS NOT NULL OR question = :question)
+        """), {"question_id": question_id, "paper_id": paper_id, "q_id": q_id, "question": question})
+
+    if not (n_papers or n_questions):
+        return []
+    return [f"copy essays.paper_summary/evidence to {n_papers} papers and {n_questions} questions"]
+
+# 응답에 JSON 값으로 그대로 삽입하는 텍스트 컬럼 (responses.json_response의 raw_fields)
+RAW_JSON_COLUMNS = (("essays", "summary"), ("questions", "evidence"))
+
+def _normalize_json_columns(conn) -> list:
+    """유효한 JSON이 아닌 값(일반 텍스트 등)은 JSON 문자열로 감싸 저장 (값은 그대로 유지)"""
+    applied = []
+    for table, column in RAW_JSON_COLUMNS:
+        fixed = conn.execute(text(
+            f"UPDATE {table} SET {column} = json_quote({column}) WHERE {column} IS NOT NULL AND NOT json_valid({column})"
+        )).rowcount
+        if fixed:
+            applied.append(f"quote {fixed} non-JSON values of {table}.{column}")
+    return applied
+
+def upgrade(bind: Engine = engine) -> list:
+    """스키마를 최신으로 맞추고 적용한 변경 목록을 반환"""
+    applied = []
+    inspector = inspect(bind)
+    existing_tables = set(inspector.get_table_names())
+
+    Base.metadata.create_all(bind=bind)
+    applied += [f"create table {name}" for name in Base.metadata.tables if name not in existing_tables]
+
+    with bind.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            existing_columns = {col["name"] for col in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing_columns:
+                    conn.execute(text(_add_column_sql(table.name, column, bind.dialect)))
+                    applied.append(f"add column {table.name}.{column.name}")
+
+            existing_indexes = {idx["name"] for idx in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in existing_indexes:
+                    # 고유 인덱스는 중복 데이터가 있으면 실패하므로 이 경우 데이터를 먼저 정리해야 함
+                    index.create(conn)
+                    applied.append(f"create index {index.name}")
+
+        if "annotations" in existing_tables:
+            existing_columns = {col["name"] for col in inspector.get_columns("annotations")}
+            applied += _migrate_selected_sentences(conn, existing_columns)
+        if "essays" in existing_tables:
+            existing_columns = {col["name"] for col in inspector.get_columns("essays")}
+            applied += _migrate_papers_and_questions(conn, existing_columns)
+        applied += _normalize_json_columns(conn)
+    return applied
+
+def drop_legacy_columns(bind: Engine = engine, backup_path=None) -> list:
+    """
+    upgrade()로 복사해 둔 이전 버전 컬럼을 삭제합니다. 되돌릴 수 없으므로 먼저 DB 전체를 backup_path에 백업합니다.
+    (기본 경로: <DB 파일>.<시각>.bak, SQLite 3.35 이상의 ALTER TABLE ... DROP COLUMN 사용)
+    """
+    applied = upgrade(bind)
+    inspector = inspect(bind)
+    existing_tables = set(inspector.get_table_names())
+    targets = [
+        (table, column)
+        for table, columns in LEGACY_COLUMNS.items() if table in existing_tables
+        for column in columns if column in {col["name"] for col in inspector.get_columns(table)}
+    ]
+    if not targets:
+        return applied
+
+    backup_path = backup_path or f"{bind.url.database}.{datetime.now():%Y%m%d%H%M%S}.bak"
+    with bind.connect() as conn:
+        backup = sqlite3.connect(backup_path)
+        try:
+            conn.connection.dbapi_connection.backup(backup)
+        finally:
+            backup.close()
+    applied.append(f"backup database to {backup_path}")
+
+    with bind.begin() as conn:
+        for table, column in targets:
+            conn.execute(text(f"ALTER TABLE {table} DROP COLUMN {column}"))
+            applied.append(f"drop column {table}.{column}")
+    return applied
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="annotation.db 스키마 갱신")
+    parser.add_argument("--drop-legacy-columns", action="store_true",
+                        help="복사가 끝난 이전 버전 컬럼(selected_sentences_*, paper_summary, evidence) 삭제 (먼저 백업 생성)")
+    parser.add_argument("--backup", help="--drop-legacy-columns 백업 파일 경로 (기본: <DB>.<시각>.bak)")
+    args = parser.parse_args()
+
+    changes = drop_legacy_columns(backup_path=args.backup) if args.drop_legacy_columns else upgrade()
+    if changes:
+        for change in changes:
+            print(f"✓ {change}")
+    else:
+        print("✓ Schema is up to date.")
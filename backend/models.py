@@ -1,17 +1,86 @@
-from sqlalchemy import create_engine, Column, Integer, String, Text, Boolean, ForeignKey, CheckConstraint
+import os
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import create_engine, event, Column, Integer, String, Text, Boolean, ForeignKey, CheckConstraint, UniqueConstraint, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
+from sqlalchemy.engine import CursorResult, FrozenResult
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from datetime import datetime
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./annotation.db"
+SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./annotation.db")
+
+# SQLite 저장소 프로파일 (DB_PROFILE 환경변수로 선택)
+# - default: 기존 동작 (rollback journal, 기본 커넥션 풀)
+# - production: WAL + synchronous=NORMAL + busy_timeout 으로 동시 제출 시 "database is locked" 방지
+STORAGE_PROFILES = {
+    "default": {
+        "pragmas": {},
+        "pool": {},
+    },
+    "production": {
+        "pragmas": {
+            "journal_mode": "WAL",        # 읽기와 쓰기가 서로를 막지 않음
+            "synchronous": "NORMAL",      # WAL에서는 NORMAL로도 손상 없이 안전 (마지막 커밋 일부만 유실 가능)
+            "busy_timeout": 5000,         # 쓰기 잠금 대기 시간(ms)
+            "mmap_size": 268435456,       # 256MB 메모리 매핑 읽기
+            "cache_size": -65536,         # 커넥션당 64MB 페이지 캐시
+            "temp_store": "MEMORY",
+        },
+        "pool": {
+            "pool_size": 10,
+            "max_overflow": 20,
+            "pool_timeout": 30,
+        },
+    },
+}
+
+DB_PROFILE = os.getenv("DB_PROFILE", "default")
+if DB_PROFILE not in STORAGE_PROFILES:
+    raise ValueError(f"Unknown DB_PROFILE '{DB_PROFILE}' (choose from: {', '.join(STORAGE_PROFILES)})")
+storage_profile = STORAGE_PROFILES[DB_PROFILE]
 
 engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
+    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}, **storage_profile["pool"]
 )
+
+@event.listens_for(engine, "connect")
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    if not storage_profile["pragmas"]:
+        return
+    cursor = dbapi_connection.cursor()
+    for name, value in storage_profile["pragmas"].items():
+        cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# API 요청 처리 방식 (DB_ASYNC 환경변수로 선택)
+# - 0 (기본): 동기 Session을 스레드풀에서 실행 (동시성은 스레드풀 크기에 제한됨)
+# - 1: aiosqlite 기반 AsyncSession (동시성이 스레드 수가 아닌 커넥션 수에 비례)
+DB_ASYNC = os.getenv("DB_ASYNC", "0") == "1"
+
+if DB_ASYNC:
+    # aiosqlite의 기본 풀은 NullPool이므로 풀 설정이 있으면 큐 풀을 명시
+    async_pool = {"poolclass": AsyncAdaptedQueuePool, **storage_profile["pool"]} if storage_profile["pool"] else {}
+    async_engine = create_async_engine(
+        SQLALCHEMY_DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://", 1), **async_pool
+    )
+    event.listen(async_engine.sync_engine, "connect", _apply_sqlite_pragmas)
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+# 커밋 후 속성 접근 시 이벤트 루프에서 지연 로딩이 일어나지 않도록 expire_on_commit=False (AsyncSession과 동일)
+ThreadedSessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
+
 Base = declarative_base()
 
+class SchemaMigration(Base):
+    """migrations.py의 일회성 데이터 이동 기록 (이름별로 한 번만 실행)"""
+    __tablename__ = "schema_migrations"
+    
+    name = Column(String, primary_key=True)
+    applied_at = Column(String, default=lambda: datetime.utcnow().isoformat())
+
 class User(Base):
     __tablename__ = "users"
     
@@ -19,9 +88,32 @@ class User(Base):
     username = Column(String, unique=True, index=True, nullable=False)
     password_hash = Column(String, nullable=False)
     full_name = Column(String, nullable=False)
+    tokens_revoked_at = Column(Integer)  # 이 시각(초) 이하에 발급된 토큰은 거부 (auth.revoke_user_tokens)
     
     annotations = relationship("Annotation", back_populates="user")
 
+class Paper(Base):
+    """논문 요약 (같은 논문의 모든 에세이가 공유하므로 논문당 한 행)"""
+    __tablename__ = "papers"
+    
+    id = Column(Integer, primary_key=True)
+    filename = Column(String, unique=True, index=True)  # 원본 논문 파일명 (API 응답에는 노출하지 않음)
+    summary = Column(Text)  # Actual paper summary from papers_summary.json
+    
+    questions = relationship("Question", back_populates="paper")
+
+class Question(Base):
+    """질문별 공통 참고자료 (같은 질문의 정답/노이즈 문항이 공유하므로 질문당 한 행)"""
+    __tablename__ = "questions"
+    __table_args__ = (UniqueConstraint('paper_id', 'q_id', name='uq_questions_paper_q_id'),)
+    
+    id = Column(Integer, primary_key=True)
+    paper_id = Column(Integer, ForeignKey("papers.id"), index=True)
+    q_id = Column(String)   # 논문 내 질문 번호 (Q1~Q5)
+    evidence = Column(Text)  # JSON array of evidence
+    
+    paper = relationship("Paper", back_populates="questions")
+
 class Essay(Base):
     __tablename__ = "essays"
     
@@ -29,14 +121,42 @@ class Essay(Base):
     title = Column(String, nullable=False)
     content = Column(Text, nullable=False)
     question = Column(Text, nullable=False)
-    evidence = Column(Text)  # JSON array of evidence
     summary = Column(Text)   # AI feedback (reasoning, scores, etc.)
-    paper_summary = Column(Text) # Actual paper summary from papers_summary.json
+    # 논문 요약과 질문별 참고자료는 papers / questions 테이블에 한 번만 저장하고 id로 참조
+    paper_id = Column(Integer, ForeignKey("papers.id"), index=True)
+    question_id = Column(Integer, ForeignKey("questions.id"), index=True)
+    content_hash = Column(String, unique=True, index=True)  # 원본 데이터셋 항목의 SHA-256 (증분 수집 키)
+    
+    # 분석용 메타데이터 (블라인드 title과 별개로 수집 시점에 저장, API 응답에는 노출하지 않음)
+    filename = Column(String, index=True)       # 원본 논문 파일명
+    q_id = Column(String, index=True)           # 논문 내 질문 번호 (Q1~Q5)
+    is_original = Column(Boolean, index=True)   # 정답(원본) 문항 여부
+    noise_level = Column(Integer, index=True)   # 노이즈 레벨 (원본 = 0)
     
     annotations = relationship("Annotation", back_populates="essay")
+    sentences = relationship("EssaySentence", back_populates="essay", order_by="EssaySentence.idx")
+
+class EssaySentence(Base):
+    """수집(ingestion) 시점에 한 번 분리해 저장해 두는 문장 인덱스"""
+    __tablename__ = "essay_sentences"
+    __table_args__ = (UniqueConstraint('essay_id', 'idx', name='uq_essay_sentences_essay_idx'),)
+    
+    id = Column(Integer, primary_key=True)
+    essay_id = Column(Integer, ForeignKey("essays.id"), nullable=False, index=True)
+    idx = Column(Integer, nullable=False)  # 0부터 시작하는 문장 번호 (selected_sentences와 동일)
+    text = Column(Text, nullable=False)
+    splitter_version = Column(Integer, nullable=False)  # sentences.SPLITTER_VERSION
+    
+    essay = relationship("Essay", back_populates="sentences")
 
 class Annotation(Base):
     __tablename__ = "annotations"
+    # 실제 조회 패턴에 맞춘 복합 인덱스 (blind_id 조회는 ix_annotations_blind_id 고유 인덱스 사용)
+    __table_args__ = (
+        Index('ix_annotations_user_essay', 'user_id', 'essay_id', unique=True),  # 평가자당 에세이 1건
+        Index('ix_annotations_user_order', 'user_id', 'display_order'),
+        Index('ix_annotations_user_submitted_order', 'user_id', 'is_submitted', 'display_order'),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -48,31 +168,150 @@ class Annotation(Base):
     display_order = Column(Integer, nullable=False) # 1 ~ 26 번호
     # ---------------------------------------------------------
     
+    # 근거 문장 선택은 annotation_sentences 테이블에 저장 (selections.py)
+    # 이전 버전의 selected_sentences_* JSON 컬럼은 migrations.upgrade()가 한 번 복사 (삭제는 --drop-legacy-columns)
+    
     # Language
     score_language = Column(Integer, CheckConstraint('score_language BETWEEN 1 AND 5'))
-    selected_sentences_language = Column(Text)  # JSON array
     
     # Organization
     score_organization = Column(Integer, CheckConstraint('score_organization BETWEEN 1 AND 5'))
-    selected_sentences_organization = Column(Text)  # JSON array
     
     # Content
     score_content = Column(Integer, CheckConstraint('score_content BETWEEN 1 AND 5'))
-    selected_sentences_content = Column(Text)  # JSON array
 
     # AI Feedback
     score_ai_feedback = Column(Integer, CheckConstraint('score_ai_feedback BETWEEN 1 AND 5'))
     
     is_submitted = Column(Boolean, default=False)
+    # 낙관적 동시성 제어: 쓰기마다 1씩 증가, PATCH는 클라이언트가 읽은 version과 같을 때만 반영
+    version = Column(Integer, nullable=False, default=1, server_default="1")
     created_at = Column(String, default=lambda: datetime.utcnow().isoformat())
     updated_at = Column(String, default=lambda: datetime.utcnow().isoformat(), onupdate=lambda: datetime.utcnow().isoformat())
     
     user = relationship("User", back_populates="annotations")
     essay = relationship("Essay", back_populates="annotations")
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+class AnnotationSentence(Base):
+    """평가자가 trait별 근거로 선택한 문장 (선택 하나당 한 행)"""
+    __tablename__ = "annotation_sentences"
+    __table_args__ = (
+        # 에세이·trait별 문장 선택 빈도를 인덱스만으로 집계
+        Index('ix_annotation_sentences_essay_trait_idx', 'essay_id', 'trait', 'sentence_idx'),
+    )
+    
+    annotation_id = Column(Integer, ForeignKey("annotations.id"), primary_key=True)
+    trait = Column(String, primary_key=True)  # language | organization | content
+    sentence_idx = Column(Integer, primary_key=True)  # EssaySentence.idx
+    essay_id = Column(Integer, ForeignKey("essays.id"), nullable=False)  # annotations.essay_id와 같음 (집계용)
+
+class TraitScoreSums:
+    """trait별 제출 점수의 개수/합/제곱합 (평균·분산을 행 하나로 계산)"""
+    n_language = Column(Integer, nullable=False, default=0, server_default="0")
+    sum_language = Column(Integer, nullable=False, default=0, server_default="0")
+    sumsq_language = Column(Integer, nullable=False, default=0, server_default="0")
+    n_organization = Column(Integer, nullable=False, default=0, server_default="0")
+    sum_organization = Column(Integer, nullable=False, default=0, server_default="0")
+    sumsq_organization = Column(Integer, nullable=False, default=0, server_default="0")
+    n_content = Column(Integer, nullable=False, default=0, server_default="0")
+    sum_content = Column(Integer, nullable=False, default=0, server_default="0")
+    sumsq_content = Column(Integer, nullable=False, default=0, server_default="0")
+    n_ai_feedback = Column(Integer, nullable=False, default=0, server_default="0")
+    sum_ai_feedback = Column(Integer, nullable=False, default=0, server_default="0")
+    sumsq_ai_feedback = Column(Integer, nullable=False, default=0, server_default="0")
+
+# ---------------------------------------------------------
+# 집계 테이블: 제출/수정 트랜잭션 안에서 증분 갱신 (aggregates.py)
+class StudyStats(TraitScoreSums, Base):
+    """연구 전체 진행률과 점수 합계 (id=1 단일 행)"""
+    __tablename__ = "study_stats"
+    
+    id = Column(Integer, primary_key=True)
+    assigned_count = Column(Integer, nullable=False, default=0, server_default="0")
+    submitted_count = Column(Integer, nullable=False, default=0, server_default="0")
+    revision = Column(Integer, nullable=False, default=0, server_default="0")  # 집계가 바뀔 때마다 증가 (캐시 무효화 키)
+
+class UserProgress(Base):
+    __tablename__ = "user_progress"
+    
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    assigned_count = Column(Integer, nullable=False, default=0, server_default="0")
+    submitted_count = Column(Integer, nullable=False, default=0, server_default="0")
+
+class EssayScoreStats(TraitScoreSums, Base):
+    __tablename__ = "essay_score_stats"
+    
+    essay_id = Column(Integer, ForeignKey("essays.id"), primary_key=True)
+
+class QuestionScoreHistogram(Base):
+    """(논문, 질문, trait, 점수)별 제출 건수. 메타데이터가 없는 에세이는 filename/q_id가 빈 문자열"""
+    __tablename__ = "question_score_histograms"
+    
+    filename = Column(String, primary_key=True)
+    q_id = Column(String, primary_key=True)
+    trait = Column(String, primary_key=True)
+    score = Column(Integer, primary_key=True)
+    count = Column(Integer, nullable=False, default=0, server_default="0")
+# ---------------------------------------------------------
+
+class ThreadedSession:
+    """
+    동기 Session을 AsyncSession과 같은 await 인터페이스로 감싼 어댑터 (DB_ASYNC=0).
+    모든 DB 작업은 스레드풀에서 실행되고 결과는 미리 버퍼링되어 반환됩니다.
+    """
+    def __init__(self, session):
+        self.sync_session = session
+
+    async def execute(self, statement, *args, **kwargs):
+        def run():
+            result = self.sync_session.execute(statement, *args, **kwargs)
+            # 행을 반환하는 결과만 버퍼링 (UPSERT 등 DML 결과는 rowcount만 사용)
+            if isinstance(result, CursorResult) and not result.returns_rows:
+                return result
+            return result.freeze()
+        result = await run_in_threadpool(run)
+        return result() if isinstance(result, FrozenResult) else result
+
+    async def scalar(self, statement, *args, **kwargs):
+        return await run_in_threadpool(self.sync_session.scalar, statement, *args, **kwargs)
+
+    async def get(self, entity, ident, **kwargs):
+        return await run_in_threadpool(self.sync_session.get, entity, ident, **kwargs)
+
+    async def run_sync(self, fn, *args, **kwargs):
+        return await run_in_threadpool(fn, self.sync_session, *args, **kwargs)
+
+    def add(self, instance):
+        self.sync_session.add(instance)
+
+    async def flush(self):
+        await run_in_threadpool(self.sync_session.flush)
+
+    async def refresh(self, instance):
+        await run_in_threadpool(self.sync_session.refresh, instance)
+
+    async def commit(self):
+        await run_in_threadpool(self.sync_session.commit)
+
+    async def rollback(self):
+        await run_in_threadpool(self.sync_session.rollback)
+
+    async def close(self):
+        await run_in_threadpool(self.sync_session.close)
+
+async def dispose_engines():
+    """서버 종료 시 풀에 남은 커넥션 정리 (aiosqlite 커넥션 스레드가 남아 있으면 프로세스가 종료되지 않음)"""
+    if DB_ASYNC:
+        await async_engine.dispose()
+    engine.dispose()
+
+async def get_db():
+    if DB_ASYNC:
+        async with AsyncSessionLocal() as db:
+            yield db
+    else:
+        db = ThreadedSession(ThreadedSessionLocal())
+        try:
+            yield db
+        finally:
+            await db.close()
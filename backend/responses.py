@@ -0,0 +1,45 @@
+from typing import Iterable
+
+import orjson
+from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
+
+# 이 크기(바이트) 미만의 응답은 압축하지 않음
+COMPRESSION_MINIMUM_SIZE = 1024
+
+def _embed_raw_json(content: dict, raw_fields: Iterable[str]) -> dict:
+    """
+    raw_fields에 지정한 경로(최상위 키, 또는 "essay.summary"처럼 점으로 구분한 경로)의 문자열만
+    orjson.Fragment로 바꿉니다. 지정하지 않은 키는 이름과 무관하게 일반 문자열로 직렬화됩니다.
+    """
+    for path in raw_fields:
+        *parents, key = path.split(".")
+        target = content
+        for parent in parents:
+            target = target.get(parent) if isinstance(target, dict) else None
+        if isinstance(target, dict) and isinstance(target.get(key), str):
+            target[key] = orjson.Fragment(target[key])
+    return content
+
+def json_response(data, exclude_unset: bool = False, raw_fields: Iterable[str] = ()) -> ORJSONResponse:
+    """
+    응답 모델(또는 모델 리스트)을 orjson으로 직렬화합니다.
+    raw_fields로 지정한 필드는 DB의 JSON 텍스트를 이중 인코딩 없이 JSON 값으로 삽입합니다.
+    이 필드에는 유효한 JSON만 저장되어 있어야 합니다. (init_db.py가 json.dumps로 기록하고,
+    migrations.upgrade()가 기존 DB의 유효하지 않은 값을 JSON 문자열로 감쌈)
+    """
+    raw_fields = tuple(raw_fields)
+    if isinstance(data, BaseModel):
+        return ORJSONResponse(_embed_raw_json(data.model_dump(exclude_unset=exclude_unset), raw_fields))
+    return ORJSONResponse([_embed_raw_json(item.model_dump(exclude_unset=exclude_unset), raw_fields) for item in data])
+
+def add_compression(app: FastAPI) -> None:
+    """brotli-asgi가 설치되어 있으면 br(+gzip 대체), 없으면 gzip으로 응답을 압축"""
+    try:
+        from brotli_asgi import BrotliMiddleware
+    except ImportError:
+        from starlette.middleware.gzip import GZipMiddleware
+        app.add_middleware(GZipMiddleware, minimum_size=COMPRESSION_MINIMUM_SIZE)
+    else:
+        app.add_middleware(BrotliMiddleware, minimum_size=COMPRESSION_MINIMUM_SIZE, gzip_fallback=True)
@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Optional, List
+from pydantic import BaseModel, Field, StrictInt
+from typing import Annotated, Any, Optional, List
 
 # Auth schemas
 class UserLogin(BaseModel):
@@ -21,13 +21,15 @@ class Token(BaseModel):
 
 # Essay schemas
 class EssayResponse(BaseModel):
+    # fields= 로 일부 컬럼만 요청한 경우 나머지는 응답에서 생략됨
     id: int
-    title: str
-    content: str
-    question: str
+    title: Optional[str] = None
+    content: Optional[str] = None
+    question: Optional[str] = None
     is_annotated: bool = False
-    summary: Optional[str] = None
-    paper_summary: Optional[str] = None
+    summary: Optional[Any] = None  # JSON 객체 (DB의 JSON 텍스트를 그대로 전달)
+    paper_id: Optional[int] = None  # 논문 요약은 GET /api/papers/{id}
+    question_id: Optional[int] = None  # 질문별 참고자료는 GET /api/questions/{id}
     blind_id: Optional[str] = None
     
     class Config:
@@ -38,19 +40,32 @@ class EssayDetail(BaseModel):
     title: str
     content: str
     question: str
-    evidence: Optional[str] = None
     sentences: List[str]
-    summary: Optional[str] = None
-    paper_summary: Optional[str] = None
+    summary: Optional[Any] = None  # JSON 객체 (DB의 JSON 텍스트를 그대로 전달)
+    paper_id: Optional[int] = None
+    question_id: Optional[int] = None
     blind_id: Optional[str] = None
     
     class Config:
         from_attributes = True
 
+# 여러 에세이가 공유하는 논문 요약 / 질문별 참고자료 (에세이 응답에는 id만 포함)
+class PaperResponse(BaseModel):
+    id: int
+    summary: Optional[str] = None
+
+class QuestionResponse(BaseModel):
+    id: int
+    paper_id: Optional[int] = None
+    evidence: Optional[Any] = None  # JSON 배열 (DB의 JSON 텍스트를 그대로 전달)
+
 # Annotation schemas
+# 문장 번호: 0 이상의 정수만 허용 (true, 1.0, "1" 같은 값을 정수로 바꾸지 않음)
+SentenceIndex = Annotated[StrictInt, Field(ge=0)]
+
 class TraitAnnotation(BaseModel):
     score: Optional[int] = None
-    selected_sentences: List[int] = []
+    selected_sentences: List[SentenceIndex] = []
 
 class AnnotationCreate(BaseModel):
     essay_id: int
@@ -64,6 +79,7 @@ class AnnotationUpdate(BaseModel):
     organization: Optional[TraitAnnotation] = None
     content: Optional[TraitAnnotation] = None
     ai_feedback_score: Optional[int] = None
+    version: Optional[int] = None  # 마지막으로 읽은 version (다르면 409). 생략 시 검사하지 않음
 
 class AnnotationResponse(BaseModel):
     id: int
@@ -73,6 +89,7 @@ class AnnotationResponse(BaseModel):
     content: TraitAnnotation
     ai_feedback_score: Optional[int] = None
     is_submitted: bool
+    version: int = 1
     
     class Config:
         from_attributes = True
@@ -0,0 +1,107 @@
+"""
+근거 문장 선택 저장 (annotation_sentences 테이블)
+
+선택한 문장을 (annotation_id, trait, sentence_idx) 행으로 저장합니다.
+JSON 문자열과 달리 읽을 때 파싱이 필요 없고, 문장별 선택 빈도를 SQL로 바로 집계할 수 있습니다.
+    SELECT sentence_idx, COUNT(*) FROM annotation_sentences
+    WHERE essay_id = ? AND trait = ? GROUP BY sentence_idx   -- 인덱스만 읽음
+
+API 입력 형식(정수 리스트 또는 JSON 배열 문자열)은 그대로이며 쓰기 시점에 한 번만 변환합니다.
+"""
+import json
+from collections import defaultdict
+from sqlalchemy import select, delete, insert, exists, func, bindparam
+
+from models import Annotation, AnnotationSentence
+
+SELECTION_TRAITS = ("language", "organization", "content")
+
+def parse_selection(value):
+    """
+    API 입력(JSON 배열 문자열, 리스트, None) → 중복 없는 정렬된 정수 리스트.
+    배열이 아니거나 정수가 아닌 원소(1.7, true, "1" 등), 음수 번호는 ValueError
+    """
+    if value is None or value == "":
+        return []
+    if isinstance(value, str):
+        value = json.loads(value)
+    if not isinstance(value, (list, tuple)):
+        raise ValueError("selection must be an array")
+    if any(isinstance(i, bool) or not isinstance(i, int) for i in value):
+        raise ValueError("sentence index must be an integer")
+    indices = sorted(set(value))
+    if indices and indices[0] < 0:
+        raise ValueError("sentence index must be non-negative")
+    return indices
+
+def selections_query(annotation_ids, traits=SELECTION_TRAITS):
+    return select(
+        AnnotationSentence.annotation_id, AnnotationSentence.trait, AnnotationSentence.sentence_idx
+    ).where(
+        AnnotationSentence.annotation_id.in_(annotation_ids),
+        AnnotationSentence.trait.in_(traits)
+    ).order_by(AnnotationSentence.annotation_id, AnnotationSentence.trait, AnnotationSentence.sentence_idx)
+
+def group_selections(rows):
+    """selections_query 결과 → {annotation_id: {trait: [sentence_idx, ...]}} (선택이 없는 trait은 키 없음)"""
+    grouped = defaultdict(lambda: defaultdict(list))
+    for annotation_id, trait, sentence_idx in rows:
+        grouped[annotation_id][trait].append(sentence_idx)
+    return grouped
+
+async def load_selections(db, annotation_ids, traits=SELECTION_TRAITS):
+    """AsyncSession / ThreadedSession: 여러 어노테이션의 선택 문장을 쿼리 한 번으로 조회"""
+    if not annotation_ids:
+        return group_selections([])
+    return group_selections((await db.execute(selections_query(annotation_ids, traits))).all())
+
+async def replace_selections(db, changes, unsubmitted_only=False):
+    """
+    changes: (annotation_id, essay_id, trait, [sentence_idx, ...]) 목록.
+    해당 (어노테이션, trait)의 기존 선택을 지우고 새로 기록합니다. (executemany DELETE 1회 + INSERT 1회)
+    unsubmitted_only=True이면 실행 시점에 제출되지 않은 어노테이션만 바꿉니다. (draft 기록용:
+    대상을 조회한 뒤 다른 요청이 먼저 제출했다면 제출된 선택을 덮어쓰지 않음)
+    """
+    if not changes:
+        return
+    table = AnnotationSentence.__table__
+    delete_stmt = delete(table).where(
+        table.c.annotation_id == bindparam("target_annotation_id"),
+        table.c.trait == bindparam("target_trait")
+    )
+    if unsubmitted_only:
+        delete_stmt = delete_stmt.where(_unsubmitted(bindparam("target_annotation_id")))
+    await db.execute(delete_stmt, [
+        {"target_annotation_id": annotation_id, "target_trait": trait} for annotation_id, _, trait, _ in changes
+    ])
+
+    rows = [
+        {"annotation_id": annotation_id, "essay_id": essay_id, "trait": trait, "sentence_idx": idx}
+        for annotation_id, essay_id, trait, indices in changes
+        for idx in indices
+    ]
+    if not rows:
+        return
+    if unsubmitted_only:
+        columns = ("annotation_id", "essay_id", "trait", "sentence_idx")
+        await db.execute(insert(table).from_select(
+            columns,
+            select(*(bindparam(column, type_=table.c[column].type) for column in columns))
+            .where(_unsubmitted(bindparam("annotation_id")))
+        ), rows)
+    else:
+        await db.execute(insert(table), rows)
+
+def _unsubmitted(annotation_id):
+    """어노테이션이 (이 문장을 실행하는 시점에) 제출되지 않았는지 — 기본키 조회 한 번"""
+    return exists().where(Annotation.id == annotation_id, Annotation.is_submitted == False)
+
+def selection_counts_query(essay_id, trait, submitted_only=True):
+    """에세이의 문장별 선택 횟수 (sentence_idx, count)"""
+    stmt = select(AnnotationSentence.sentence_idx, func.count()).where(
+        AnnotationSentence.essay_id == essay_id,
+        AnnotationSentence.trait == trait
+    )
+    if submitted_only:
+        stmt = stmt.join(Annotation, AnnotationSentence.annotation_id == Annotation.id).where(Annotation.is_submitted == True)
+    return stmt.group_by(AnnotationSentence.sentence_idx).order_by(AnnotationSentence.sentence_idx)
@@ -0,0 +1,106 @@
+import re
+import argparse
+from typing import List
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from models import SessionLocal, Essay, EssaySentence
+from migrations import upgrade
+
+# 분리 규칙(정규식/약어 목록)을 바꾸면 반드시 버전을 올려야 기존 인덱스가 재생성됩니다.
+SPLITTER_VERSION = 1
+
+# 1. 단순 분리: 온점/물음표/느낌표 뒤에 공백이 오면 일단 분리
+# (?<=[.!?]) : 문장 부호 뒤를 보되
+# \s+(?=[A-Z가-힣]) : 뒤에 공백이 있고 그 다음에 대문자나 한글이 올 때만 분리
+SPLIT_PATTERN = re.compile(r'(?<=[.!?])\s+(?=[A-Z가-힣])|\n')
+
+# 2. 예외 케이스 병합 (후처리)
+# 약어 목록 (이 단어들로 문장이 끝나면 다음 문장과 합침)
+ABBREVIATIONS = ('et al.', 'e.g.', 'i.e.', 'Fig.', 'vs.', 'Eq.', 'Dr.', 'Mr.', 'Mrs.', '.NET', '. NET')
+CONTINUATION_PREFIXES = ('.NET', '. NET', 'NET')
+
+def split_sentences(content: str) -> List[str]:
+    """에세이 본문을 문장 단위로 분리합니다."""
+    raw_content = content.strip()
+    temp_sentences = [s.strip() for s in SPLIT_PATTERN.split(raw_content) if s.strip()]
+
+    final_sentences = []
+    for s in temp_sentences:
+        if final_sentences:
+            prev = final_sentences[-1]
+            # 이전 문장이 약어로 끝나거나, 현재 문장이 NET 등으로 시작하면 합침
+            if prev.endswith(ABBREVIATIONS) or s.startswith(CONTINUATION_PREFIXES):
+                final_sentences[-1] = prev + " " + s
+                continue
+        final_sentences.append(s)
+    return final_sentences
+
+def index_essay(db: Session, essay: Essay) -> List[str]:
+    """하나의 에세이에 대한 문장 인덱스를 (재)생성합니다. commit은 호출자가 담당합니다."""
+    sentences = split_sentences(essay.content)
+    db.query(EssaySentence).filter(EssaySentence.essay_id == essay.id).delete(synchronize_session=False)
+    db.bulk_insert_mappings(EssaySentence, [
+        {"essay_id": essay.id, "idx": idx, "text": text, "splitter_version": SPLITTER_VERSION}
+        for idx, text in enumerate(sentences)
+    ])
+    return sentences
+
+def get_sentences(db: Session, essay: Essay) -> List[str]:
+    """
+    저장된 문장 인덱스를 반환합니다.
+    인덱스가 없거나 오래된 버전이면 저장하지 않고 메모리에서 분리한 결과를 반환합니다.
+    (읽기 요청에서는 쓰지 않음. 인덱스는 수집 시점과 서버 시작 시 ensure_sentence_index()로 생성)
+    """
+    rows = db.query(EssaySentence.text, EssaySentence.splitter_version).filter(
+        EssaySentence.essay_id == essay.id
+    ).order_by(EssaySentence.idx.asc()).all()
+
+    if rows and all(version == SPLITTER_VERSION for _, version in rows):
+        return [text for text, _ in rows]
+    return split_sentences(essay.content)
+
+def stale_essay_ids(db: Session) -> List[int]:
+    """현재 SPLITTER_VERSION으로 인덱싱되지 않은(누락되었거나 오래된) 에세이 ID 목록"""
+    fresh = db.query(EssaySentence.essay_id).group_by(EssaySentence.essay_id).having(
+        func.min(EssaySentence.splitter_version) == SPLITTER_VERSION,
+        func.max(EssaySentence.splitter_version) == SPLITTER_VERSION
+    )
+    return [essay_id for (essay_id,) in db.query(Essay.id).filter(Essay.id.notin_(fresh)).order_by(Essay.id)]
+
+def rebuild_sentence_index(db: Session, force: bool = False) -> int:
+    """
+    오래된 문장 인덱스만 다시 생성합니다. force=True이면 전체를 재생성합니다.
+    재생성한 에세이 개수를 반환합니다.
+    """
+    if force:
+        essay_ids = [essay_id for (essay_id,) in db.query(Essay.id).order_by(Essay.id)]
+    else:
+        essay_ids = stale_essay_ids(db)
+
+    for essay in db.query(Essay).filter(Essay.id.in_(essay_ids)):
+        index_essay(db, essay)
+    db.commit()
+    return len(essay_ids)
+
+def ensure_sentence_index() -> int:
+    """서버 시작 시 (요청을 받기 전에) 누락되었거나 오래된 인덱스만 생성"""
+    db = SessionLocal()
+    try:
+        return rebuild_sentence_index(db)
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="에세이 문장 인덱스 재생성")
+    parser.add_argument("--force", action="store_true", help="버전과 무관하게 전체 인덱스를 재생성")
+    args = parser.parse_args()
+
+    upgrade()
+    db = SessionLocal()
+    try:
+        count = rebuild_sentence_index(db, force=args.force)
+        print(f"✓ Rebuilt sentence index for {count} essays (splitter v{SPLITTER_VERSION}).")
+    finally:
+        db.close()
@@ -0,0 +1,112 @@
+"""
+테스트 공용 설정
+
+models가 import 시점에 DATABASE_URL을 읽으므로 다른 모듈보다 먼저 임시 DB 경로를 지정합니다.
+각 테스트는 seed 픽스처로 비운 DB에 작은 데이터셋(평가자 2명 × 에세이 4개)을 채운 뒤 실행됩니다.
+
+실행 (backend 디렉터리에서):
+    pip install -r requirements-dev.txt
+    python -m pytest tests
+"""
+import os
+import sys
+import tempfile
+from types import SimpleNamespace
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+TEST_DB_PATH = os.path.join(tempfile.mkdtemp(prefix="annotation-test-"), "annotation.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{TEST_DB_PATH}"
+os.environ["ADMIN_USERNAMES"] = "admin"
+os.environ["DRAFT_FLUSH_INTERVAL"] = "3600"  # 테스트에서는 flush를 직접 호출
+
+import pytest
+from fastapi.testclient import TestClient
+
+import models
+from models import Base, engine, SessionLocal, User, Paper, Question, Essay, EssaySentence, Annotation
+import auth
+from auth import get_password_hash, create_user_token
+from aggregates import rebuild_aggregates
+from sentences import SPLITTER_VERSION, split_sentences
+from drafts import draft_buffer
+
+PASSWORD = "password123"
+PASSWORD_HASH = get_password_hash(PASSWORD)
+ESSAY_CONTENT = "첫 번째 문장입니다. 두 번째 문장입니다. 세 번째 문장입니다."
+
+# API 요청이 실행하는 SQL을 가로챌 엔진 (DB_ASYNC=1이면 aiosqlite 엔진의 동기 엔진)
+API_ENGINE = models.async_engine.sync_engine if models.DB_ASYNC else engine
+
+def token_headers(user):
+    return {"Authorization": f"Bearer {create_user_token(user)}"}
+
+def seed_database():
+    """DB를 비우고 (평가자 2명 + 관리자, 논문 1개, 질문 2개, 에세이 4개, 평가자별 에세이 4개 할당) 생성"""
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        users = [
+            User(username=username, password_hash=PASSWORD_HASH, full_name=username)
+            for username in ("annotator1", "annotator2", "admin")
+        ]
+        paper = Paper(filename="paper.pdf", summary="논문 요약")
+        questions = [
+            Question(paper=paper, q_id=f"Q{i + 1}", evidence=f'[{{"section": "s", "original_sentence": "근거 {i + 1}"}}]')
+            for i in range(2)
+        ]
+        db.add_all([*users, paper, *questions])
+        db.flush()
+
+        essays = []
+        for i in range(4):
+            question = questions[i // 2]
+            essay = Essay(
+                title=f"평가 문항 #{i + 1}", content=ESSAY_CONTENT, question=f"질문 {question.q_id}", summary='{"scores": {}}',
+                paper_id=paper.id, question_id=question.id, content_hash=f"hash-{i}",
+                filename=paper.filename, q_id=question.q_id, is_original=i % 2 == 0, noise_level=i % 2
+            )
+            essays.append(essay)
+        db.add_all(essays)
+        db.flush()
+        db.add_all([
+            EssaySentence(essay_id=essay.id, idx=idx, text=text, splitter_version=SPLITTER_VERSION)
+            for essay in essays for idx, text in enumerate(split_sentences(essay.content))
+        ])
+
+        annotations = [
+            Annotation(
+                user_id=user.id, essay_id=essay.id, blind_id=f"U{user.id}E{essay.id}",
+                display_order=order + 1, is_submitted=False
+            )
+            for user in users[:2] for order, essay in enumerate(essays)
+        ]
+        db.add_all(annotations)
+        db.flush()
+        rebuild_aggregates(db)
+        db.commit()
+
+        plain = lambda obj, *names: SimpleNamespace(**{name: getattr(obj, name) for name in names})
+        return SimpleNamespace(
+            users=[plain(user, "id", "username", "full_name") for user in users[:2]],
+            admin=plain(users[2], "id", "username", "full_name"),
+            essays=[plain(essay, "id", "paper_id", "question_id") for essay in essays],
+            annotations=[plain(a, "id", "user_id", "essay_id", "blind_id", "display_order") for a in annotations],
+        )
+    finally:
+        db.close()
+
+@pytest.fixture
+def seed():
+    draft_buffer.pending.clear()
+    for state in (auth._user_cache, auth._revoked_at, auth._claims_stale_at):
+        state.clear()  # 테스트마다 같은 사용자 id를 다시 만들므로 인증 캐시도 비움
+    return seed_database()
+
+@pytest.fixture
+def client(seed):
+    import main
+    with TestClient(main.app) as test_client:
+        yield test_client
@@ -0,0 +1,120 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from sqlalchemy import and_, event, select
+
+import models
+from conftest import API_ENGINE, token_headers
+from models import SessionLocal, StudyStats, UserProgress, EssayScoreStats, QuestionScoreHistogram
+from aggregates import TRAITS, rebuild_aggregates
+
+AGGREGATE_MODELS = (StudyStats, UserProgress, EssayScoreStats, QuestionScoreHistogram)
+
+def snapshot(db):
+    """
+    집계 테이블 전체 (revision 제외). 건수가 0인 행은 있든 없든 같은 결과이므로 제외하고 비교
+    (증분 갱신은 0이 된 히스토그램 행을 남기고, 재계산은 점수 없이 제출된 에세이에도 0인 행을 만듦)
+    """
+    empty = {
+        QuestionScoreHistogram: QuestionScoreHistogram.count == 0,
+        EssayScoreStats: and_(*(getattr(EssayScoreStats, f"n_{trait}") == 0 for trait in TRAITS)),
+    }
+    tables = {}
+    for model in AGGREGATE_MODELS:
+        columns = [column for column in model.__table__.columns if column.name != "revision"]
+        stmt = select(*columns)
+        if model in empty:
+            stmt = stmt.where(~empty[model])
+        tables[model.__tablename__] = sorted(tuple(row) for row in db.execute(stmt))
+    return tables
+
+def assert_matches_rebuild():
+    """요청마다 적용한 증분(AggregateChanges)이 전체 재계산 결과와 같아야 함"""
+    db = SessionLocal()
+    try:
+        incremental = snapshot(db)
+        rebuild_aggregates(db)
+        assert snapshot(db) == incremental
+        db.rollback()
+    finally:
+        db.close()
+
+def test_deltas_match_rebuild(client, seed):
+    first, second = seed.users
+    own = [a for a in seed.annotations if a.user_id == first.id]
+    scores = {"score_language": 4, "score_organization": 3, "score_content": 2, "score_ai_feedback": 5}
+
+    # PUT 제출
+    assert client.put(f"/api/annotations/{own[0].blind_id}", headers=token_headers(first), json=scores).status_code == 200
+    assert_matches_rebuild()
+
+    # 제출된 문항 수정 (일부 trait만)
+    response = client.patch(f"/api/annotations/{own[0].id}", headers=token_headers(first), json={
+        "language": {"score": 1, "selected_sentences": [0]}, "ai_feedback_score": 2
+    })
+    assert response.status_code == 200
+    assert_matches_rebuild()
+
+    # 제출 전 문항 PATCH (제출로 전환)
+    response = client.patch(f"/api/annotations/{own[1].id}", headers=token_headers(first), json={
+        "content": {"score": 5, "selected_sentences": [1]}
+    })
+    assert response.status_code == 200
+    assert_matches_rebuild()
+
+    # batch 제출
+    response = client.post("/api/annotations/batch", headers=token_headers(first), json={
+        "items": [{"blind_id": own[2].blind_id, **scores}, {"blind_id": own[0].blind_id, **scores}]
+    })
+    assert response.json()["submitted_count"] == 1
+    assert_matches_rebuild()
+
+    # 임시 저장 후 전체 제출 (점수가 없는 문항 포함)
+    own_second = [a for a in seed.annotations if a.user_id == second.id]
+    client.put(f"/api/annotations/{own_second[0].blind_id}/draft", headers=token_headers(second), json={"score_language": 3})
+    assert client.post("/api/annotations/submit-all", headers=token_headers(second)).json() == {"submitted_count": 4}
+    assert_matches_rebuild()
+
+
+# aiosqlite 모드에서는 이벤트 리스너가 이벤트 루프 스레드에서 실행되므로 Barrier로 두 요청을 맞출 수 없음
+@pytest.mark.skipif(models.DB_ASYNC, reason="requires the threaded session (DB_ASYNC=0)")
+def test_concurrent_submissions_are_counted_once(client, seed):
+    """두 요청이 모두 미제출 상태를 읽은 뒤 쓰면 하나만 반영되고 나머지는 409 (집계는 한 번만 증가)"""
+    target = seed.annotations[0]
+    headers = token_headers(seed.users[0])
+    barrier = threading.Barrier(2, timeout=10)
+    waiting = set()
+
+    def wait_for_other(conn, cursor, statement, parameters, context, executemany):
+        # 두 요청(커넥션)이 모두 조회를 마치고 첫 쓰기 직전에 도달할 때까지 대기
+        connection = id(conn.connection.dbapi_connection)
+        if statement.lstrip().upper().startswith(("UPDATE", "DELETE", "INSERT")) and connection not in waiting:
+            waiting.add(connection)
+            barrier.wait()
+
+    def submit(score):
+        return client.put(f"/api/annotations/{target.blind_id}", headers=headers, json={
+            "score_language": score, "score_organization": score, "score_content": score, "score_ai_feedback": score
+        }).status_code
+
+    event.listen(API_ENGINE, "before_cursor_execute", wait_for_other)
+    try:
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            statuses = sorted(pool.map(submit, (2, 3)))
+    finally:
+        event.remove(API_ENGINE, "before_cursor_execute", wait_for_other)
+
+    assert statuses == [200, 409]
+    db = SessionLocal()
+    try:
+        stats = db.get(StudyStats, 1)
+        assert (stats.submitted_count, stats.n_language) == (1, 1)
+    finally:
+        db.close()
+    assert_matches_rebuild()
+
+    # 전체 제출도 이미 제출된 문항을 다시 세지 않음
+    assert client.post("/api/annotations/submit-all", headers=headers).json() == {"submitted_count": 3}
+    assert client.post("/api/annotations/submit-all", headers=headers).json() == {"submitted_count": 0}
+    assert_matches_rebuild()
@@ -0,0 +1,79 @@
+import sqlite3
+
+from sqlalchemy import event
+
+from conftest import API_ENGINE, TEST_DB_PATH, token_headers
+from models import SessionLocal, Annotation
+
+SCORES = {"score_language": 4, "score_organization": 3, "score_content": 2, "score_ai_feedback": 5}
+
+def stored(annotation_id):
+    db = SessionLocal()
+    try:
+        annotation = db.get(Annotation, annotation_id)
+        return annotation.is_submitted, annotation.score_language, annotation.version
+    finally:
+        db.close()
+
+def test_patch_with_stale_version_is_rejected(client, seed):
+    target = seed.annotations[0]
+    headers = token_headers(seed.users[0])
+    trait = {"score": 3, "selected_sentences": [1]}
+
+    first = client.patch(f"/api/annotations/{target.id}", headers=headers, json={"language": trait, "version": 1})
+    assert first.status_code == 200
+    assert first.json()["version"] == 2
+
+    # 다른 탭에서 읽은 version 1로 저장하면 먼저 저장된 내용을 덮어쓰지 않음
+    stale = client.patch(f"/api/annotations/{target.id}", headers=headers, json={"language": {"score": 1}, "version": 1})
+    assert stale.status_code == 409
+    assert stored(target.id) == (True, 3, 2)
+
+    other_user = client.patch(f"/api/annotations/{target.id}", headers=token_headers(seed.users[1]), json={"language": trait})
+    assert other_user.status_code == 404
+
+def test_batch_reports_each_item(client, seed):
+    own = [a for a in seed.annotations if a.user_id == seed.users[0].id]
+    other = next(a for a in seed.annotations if a.user_id == seed.users[1].id)
+    headers = token_headers(seed.users[0])
+    assert client.put(f"/api/annotations/{own[1].blind_id}", headers=headers, json=SCORES).status_code == 200
+
+    response = client.post("/api/annotations/batch", headers=headers, json={"items": [
+        {"blind_id": blind_id, **SCORES, "selected_sentences_content": "[2]"}
+        for blind_id in (own[0].blind_id, own[0].blind_id, own[1].blind_id, other.blind_id, own[2].blind_id)
+    ]})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["submitted_count"] == 2
+    assert [item["status"] for item in body["results"]] == [
+        "submitted", "duplicate", "already_submitted", "not_found", "submitted"
+    ]
+    assert stored(own[0].id) == (True, 4, 2)
+    assert stored(other.id) == (False, None, 1)
+
+def test_batch_conflict_rolls_back(client, seed):
+    """조회 이후 다른 요청이 먼저 제출하면 UPDATE 행 수가 달라지므로 전체를 롤백하고 409"""
+    own = [a for a in seed.annotations if a.user_id == seed.users[0].id][:2]
+
+    submitted = []
+    def submit_concurrently(conn, cursor, statement, parameters, context, executemany):
+        if submitted or not (executemany and statement.lstrip().upper().startswith("UPDATE ANNOTATIONS")):
+            return
+        submitted.append(True)
+        other = sqlite3.connect(TEST_DB_PATH)
+        with other:
+            other.execute("UPDATE annotations SET is_submitted = 1, score_language = 1, version = version + 1 WHERE id = ?", (own[1].id,))
+        other.close()
+
+    event.listen(API_ENGINE, "before_cursor_execute", submit_concurrently)
+    try:
+        response = client.post("/api/annotations/batch", headers=token_headers(seed.users[0]), json={
+            "items": [{"blind_id": a.blind_id, **SCORES} for a in own]
+        })
+    finally:
+        event.remove(API_ENGINE, "before_cursor_execute", submit_concurrently)
+
+    assert submitted
+    assert response.status_code == 409
+    assert stored(own[0].id) == (False, None, 1)
+    assert stored(own[1].id) == (True, 1, 2)
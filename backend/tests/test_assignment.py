@@ -0,0 +1,83 @@
+import random
+from collections import Counter
+
+import pytest
+
+from assignment import build_assignments, cyclic_design, stratified_blocks, anchoring_free_order
+
+def make_items(n_papers=2, n_questions=5, per_question=13):
+    return [
+        {"id": f"p{p}-q{q}-{k}", "filename": f"p{p}.pdf", "q_id": f"Q{q + 1}", "is_original": k == 0}
+        for p in range(n_papers) for q in range(n_questions) for k in range(per_question)
+    ]
+
+question_key = lambda item: (item["filename"], item["q_id"])
+
+def assign(seed, annotators=("a", "b", "c", "d", "e"), overlap=2, items=None):
+    return build_assignments(items or make_items(), list(annotators), overlap=overlap, seed=seed,
+                             strata_key=question_key, priority=lambda item: item["is_original"])
+
+def ids(assignments):
+    return {annotator: [item["id"] for item in items] for annotator, items in assignments.items()}
+
+def test_same_seed_gives_same_design():
+    assert ids(assign(42)) == ids(assign(42))
+    assert ids(assign(42)) != ids(assign(43))
+
+@pytest.mark.parametrize("annotators, overlap", [(5, 2), (5, 3), (10, 2), (4, 4)])
+def test_every_stratum_is_replicated_equally(annotators, overlap):
+    items = make_items()
+    assignments = assign(7, annotators=[f"u{i}" for i in range(annotators)], overlap=overlap, items=items)
+
+    raters = Counter(item["id"] for assigned in assignments.values() for item in assigned)
+    assert set(raters) == {item["id"] for item in items}
+    assert set(raters.values()) == {overlap}  # 모든 층의 모든 문항이 같은 수의 평가자
+
+    # 평가자마다 각 층에서 받는 문항 수의 차이는 블록 배분 차이(블록당 최대 1) 이내
+    for assigned in assignments.values():
+        per_stratum = Counter(question_key(item) for item in assigned)
+        assert max(per_stratum.values()) - min(per_stratum.values()) <= overlap
+
+def test_blocks_are_balanced_and_spread_originals():
+    items = make_items()
+    blocks = stratified_blocks(items, 5, question_key, random.Random(0), priority=lambda item: item["is_original"])
+    sizes = [len(block) for block in blocks]
+    assert max(sizes) - min(sizes) <= 1
+    for stratum in {question_key(item) for item in items}:
+        counts = [sum(question_key(item) == stratum for item in block) for block in blocks]
+        assert max(counts) - min(counts) <= 1
+    # 정답 문항 10개(논문 2 x 질문 5)가 블록 5개에 2개씩
+    assert [sum(item["is_original"] for item in block) for block in blocks] == [2] * 5
+
+def test_cyclic_design_rejects_impossible_overlap():
+    assert cyclic_design(3, 3, 2) == [[0, 1], [1, 2], [2, 0]]
+    with pytest.raises(ValueError):
+        cyclic_design(3, 3, 4)
+    with pytest.raises(ValueError):
+        cyclic_design(2, 5, 2)
+
+def test_anchoring_free_order_never_repeats_when_possible():
+    rng = random.Random(1)
+    for _ in range(500):
+        n_keys = rng.randint(1, 6)
+        keys = [rng.randrange(n_keys) for _ in range(rng.randint(1, 40))]
+        counts = Counter(keys)
+        # 최다 key가 (n+1)/2개인 경계 사례도 포함
+        if rng.random() < 0.3 and len(counts) > 1:
+            top = counts.most_common(1)[0][0]
+            others = len(keys) - counts[top]
+            keys = [k for k in keys if k != top] + [top] * (others + 1)
+        items = [(k, i) for i, k in enumerate(keys)]
+        order = anchoring_free_order(items, key=lambda item: item[0], rng=rng)
+        assert sorted(order) == sorted(items)
+        if max(Counter(keys).values()) <= (len(keys) + 1) // 2:
+            assert all(a[0] != b[0] for a, b in zip(order, order[1:]))
+
+def test_assigned_orders_have_no_consecutive_question():
+    for assigned in assign(3).values():
+        assert all(question_key(a) != question_key(b) for a, b in zip(assigned, assigned[1:]))
+
+def test_impossible_order_returns_permutation():
+    items = [("a", i) for i in range(5)] + [("b", 0)]
+    order = anchoring_free_order(items, key=lambda item: item[0], rng=random.Random(0))
+    assert sorted(order) == sorted(items)
@@ -0,0 +1,147 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import event, update
+
+import auth
+from conftest import API_ENGINE, token_headers
+from models import SessionLocal, User
+
+@pytest.fixture
+def clock(monkeypatch):
+    """토큰 iat와 폐기 시각에 쓰는 정수 초 시계"""
+    now = SimpleNamespace(second=1_000_000)
+    monkeypatch.setattr(auth, "_now", lambda: now.second)
+    return now
+
+@pytest.fixture
+def user_queries():
+    """users 테이블을 조회한 SQL 수"""
+    queries = []
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if "FROM users" in statement:
+            queries.append(statement)
+    event.listen(API_ENGINE, "before_cursor_execute", capture)
+    yield queries
+    event.remove(API_ENGINE, "before_cursor_execute", capture)
+
+def me(client, headers):
+    return client.get("/api/users/me", headers=headers)
+
+def test_claims_fast_path_skips_user_lookup(client, seed, user_queries):
+    user = seed.users[0]
+    response = me(client, token_headers(user))
+    assert response.json() == {"id": user.id, "username": user.username, "full_name": user.full_name}
+    assert user_queries == []
+
+def test_user_cache_expires_after_ttl(monkeypatch):
+    clock = SimpleNamespace(now=100.0)
+    monkeypatch.setattr(auth.time, "monotonic", lambda: clock.now)
+    old = auth.create_access_token({"sub": "u", "uid": 99, "name": "이전 이름"})
+    new = auth.create_access_token({"sub": "u", "uid": 99, "name": "새 이름"})
+    resolve = lambda token: asyncio.run(auth.get_current_user(token, db=None)).full_name
+
+    assert resolve(old) == "이전 이름"
+    clock.now += auth.USER_CACHE_TTL_SECONDS - 1
+    assert resolve(new) == "이전 이름"  # TTL 동안은 캐시 사용
+    clock.now += 2
+    assert resolve(new) == "새 이름"
+
+def test_logout_revokes_tokens_issued_up_to_that_second(client, seed, clock):
+    user = seed.users[0]
+    old = token_headers(user)
+    clock.second += 1
+    same_second = token_headers(user)
+    assert client.post("/api/auth/logout", headers=same_second).status_code == 200
+
+    assert me(client, old).status_code == 401
+    assert me(client, same_second).status_code == 401  # 폐기와 같은 초에 발급된 토큰도 거부
+    clock.second += 1
+    assert me(client, token_headers(user)).status_code == 200
+    assert me(client, token_headers(seed.users[1])).status_code == 200
+
+def test_admin_revokes_tokens_including_legacy_tokens(client, seed, clock, user_queries):
+    user, admin = seed.users[0], token_headers(seed.admin)
+    assert client.post(f"/api/admin/users/{user.id}/revoke", headers=token_headers(seed.users[1])).status_code == 403
+    assert client.post("/api/admin/users/9999/revoke", headers=admin).status_code == 404
+
+    # uid/name 클레임이 없는 이전 형식 토큰은 DB에서 조회하고 같은 기준으로 폐기
+    legacy = {"Authorization": f"Bearer {auth.create_access_token({'sub': user.username})}"}
+    assert me(client, legacy).json()["id"] == user.id
+    assert user_queries
+
+    claims = token_headers(user)
+    assert client.post(f"/api/admin/users/{user.id}/revoke", headers=admin).status_code == 200
+    assert me(client, claims).status_code == 401
+    assert me(client, legacy).status_code == 401
+
+def test_refresh_reads_renamed_user_for_existing_tokens(client, seed, clock, user_queries):
+    user = seed.users[0]
+    old = token_headers(user)
+    assert me(client, old).json()["full_name"] == user.full_name
+
+    db = SessionLocal()
+    db.execute(update(User).where(User.id == user.id).values(full_name="바뀐 이름"))
+    db.commit()
+    db.close()
+    assert client.post(f"/api/admin/users/{user.id}/refresh", headers=token_headers(seed.admin)).status_code == 200
+
+    user_queries.clear()
+    assert me(client, old).json()["full_name"] == "바뀐 이름"  # 이전 토큰의 name 클레임 대신 DB 사용
+    assert user_queries
+
+    # 이후 발급된 토큰은 다시 클레임만 사용
+    auth._user_cache.clear()
+    user_queries.clear()
+    clock.second += 1
+    renamed = SimpleNamespace(id=user.id, username=user.username, full_name="바뀐 이름")
+    assert me(client, token_headers(renamed)).json()["full_name"] == "바뀐 이름"
+    assert user_queries == []
+
+def test_revocation_survives_restart(client, seed, clock):
+    user = seed.users[0]
+    headers = token_headers(user)
+    assert client.post("/api/auth/logout", headers=headers).status_code == 200
+
+    auth._revoked_at.clear()  # 재시작
+    assert auth.load_revocations() == 1
+    assert me(client, headers).status_code == 401
+
+def test_password_verification_rejects_when_pool_is_saturated(monkeypatch):
+    release = threading.Event()
+    def blocking_verify(plain_password, hashed_password):
+        release.wait(5)
+        return plain_password == hashed_password
+    monkeypatch.setattr(auth, "PASSWORD_WORKERS", 1)
+    monkeypatch.setattr(auth, "PASSWORD_QUEUE_LIMIT", 1)
+    monkeypatch.setattr(auth, "verify_password", blocking_verify)
+    monkeypatch.setattr(auth, "_password_pool", ThreadPoolExecutor(max_workers=1))
+
+    async def scenario():
+        running = [asyncio.create_task(auth.verify_password_async("pw", "pw")) for _ in range(2)]
+        await asyncio.sleep(0)
+        assert auth._password_pending == 2
+        with pytest.raises(HTTPException) as rejected:
+            await auth.verify_password_async("pw", "pw")
+        release.set()
+        return rejected.value, await asyncio.gather(*running)
+
+    try:
+        rejected, results = asyncio.run(scenario())
+    finally:
+        release.set()
+        auth._password_pool.shutdown(wait=True)
+    assert rejected.status_code == 503
+    assert rejected.headers == {"Retry-After": "1"}
+    assert results == [True, True]
+    assert auth._password_pending == 0
+
+def test_login_returns_503_with_retry_after_when_saturated(client, seed, monkeypatch):
+    monkeypatch.setattr(auth, "_password_pending", auth.PASSWORD_WORKERS + auth.PASSWORD_QUEUE_LIMIT)
+    response = client.post("/api/auth/login", data={"username": seed.users[0].username, "password": "x"})
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
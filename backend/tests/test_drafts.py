@@ -0,0 +1,117 @@
+import asyncio
+import sqlite3
+
+from sqlalchemy import event, select
+
+from conftest import API_ENGINE, TEST_DB_PATH, token_headers
+from models import SessionLocal, Annotation, AnnotationSentence
+from drafts import draft_buffer
+
+def selections(annotation_id, trait):
+    db = SessionLocal()
+    try:
+        return list(db.scalars(select(AnnotationSentence.sentence_idx).where(
+            AnnotationSentence.annotation_id == annotation_id, AnnotationSentence.trait == trait
+        ).order_by(AnnotationSentence.sentence_idx)))
+    finally:
+        db.close()
+
+def test_draft_is_written_on_flush(seed):
+    target = seed.annotations[0]
+    draft_buffer.put(target.user_id, target.blind_id, {"score_language": 2, "selected_sentences_language": "[1, 2]"})
+    assert asyncio.run(draft_buffer.flush()) == 1
+
+    db = SessionLocal()
+    try:
+        annotation = db.get(Annotation, target.id)
+        assert (annotation.score_language, annotation.is_submitted, annotation.version) == (2, False, 1)
+    finally:
+        db.close()
+    assert selections(target.id, "language") == [1, 2]
+    assert not draft_buffer.pending
+
+def test_submit_during_flush_keeps_submitted_selections(seed):
+    """대상 조회와 기록 사이에 다른 요청이 제출을 커밋해도 draft가 제출 내용을 덮어쓰지 않음"""
+    target = seed.annotations[0]
+    draft_buffer.put(target.user_id, target.blind_id, {"score_language": 1, "selected_sentences_language": "[2]"})
+
+    submitted = []
+    def submit_concurrently(conn, cursor, statement, parameters, context, executemany):
+        # flush의 첫 쓰기 직전 (대상 SELECT는 끝났고 쓰기 트랜잭션은 아직 시작 전)
+        if submitted or not statement.lstrip().upper().startswith(("UPDATE", "DELETE", "INSERT")):
+            return
+        submitted.append(True)
+        other = sqlite3.connect(TEST_DB_PATH)
+        with other:
+            other.execute("UPDATE annotations SET is_submitted = 1, score_language = 5, version = version + 1 WHERE id = ?", (target.id,))
+            other.execute("DELETE FROM annotation_sentences WHERE annotation_id = ? AND trait = 'language'", (target.id,))
+            other.execute(
+                "INSERT INTO annotation_sentences (annotation_id, essay_id, trait, sentence_idx) VALUES (?, ?, 'language', 0)",
+                (target.id, target.essay_id)
+            )
+        other.close()
+
+    event.listen(API_ENGINE, "before_cursor_execute", submit_concurrently)
+    try:
+        asyncio.run(draft_buffer.flush())
+    finally:
+        event.remove(API_ENGINE, "before_cursor_execute", submit_concurrently)
+
+    assert submitted
+    db = SessionLocal()
+    try:
+        assert db.get(Annotation, target.id).score_language == 5
+    finally:
+        db.close()
+    assert selections(target.id, "language") == [0]
+
+def test_draft_after_submit_is_ignored(client, seed):
+    target = seed.annotations[0]
+    headers = token_headers(seed.users[0])
+    response = client.put(f"/api/annotations/{target.blind_id}", headers=headers, json={
+        "score_language": 4, "score_organization": 4, "score_content": 4, "score_ai_feedback": 4,
+        "selected_sentences_language": "[0]"
+    })
+    assert response.status_code == 200
+
+    # 제출 후 늦게 도착한 draft
+    draft_buffer.put(target.user_id, target.blind_id, {"score_language": 1, "selected_sentences_language": "[2]"})
+    asyncio.run(draft_buffer.flush())
+    assert selections(target.id, "language") == [0]
+
+def test_submit_discards_pending_draft(client, seed):
+    target = seed.annotations[1]
+    headers = token_headers(seed.users[0])
+    assert client.put(f"/api/annotations/{target.blind_id}/draft", headers=headers, json={"score_language": 2}).status_code == 202
+    assert draft_buffer.contains(target.user_id, target.blind_id)
+
+    workspace = client.get(f"/api/annotations/{target.blind_id}/workspace", headers=headers).json()
+    assert workspace["annotation"]["language"]["score"] == 2  # 기록 전 draft도 작업 화면에 반영
+
+    client.put(f"/api/annotations/{target.blind_id}", headers=headers, json={
+        "score_language": 3, "score_organization": 3, "score_content": 3, "score_ai_feedback": 3
+    })
+    assert not draft_buffer.contains(target.user_id, target.blind_id)
+
+def test_submit_all_flushes_drafts(client, seed):
+    target = seed.annotations[0]
+    headers = token_headers(seed.users[0])
+    response = client.put(f"/api/annotations/{target.blind_id}/draft", headers=headers,
+                          json={"score_language": 2, "selected_sentences_language": "[0, 2]"})
+    assert response.status_code == 202
+    assert draft_buffer.pending  # 요청마다 기록하지 않음
+
+    # 기록 전에도 작업 화면에는 임시 저장 내용이 보임
+    workspace = client.get(f"/api/annotations/{target.blind_id}/workspace", headers=headers).json()
+    assert workspace["annotation"]["language"] == {"score": 2, "selected_sentences": [0, 2]}
+
+    assert client.post("/api/annotations/submit-all", headers=headers).json() == {"submitted_count": 4}
+    assert not draft_buffer.pending
+    db = SessionLocal()
+    try:
+        annotation = db.get(Annotation, target.id)
+        # draft 기록은 version을 올리지 않으므로 제출로만 1 증가
+        assert (annotation.score_language, annotation.is_submitted, annotation.version) == (2, True, 2)
+    finally:
+        db.close()
+    assert selections(target.id, "language") == [0, 2]
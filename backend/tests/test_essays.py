@@ -0,0 +1,31 @@
+from conftest import token_headers, ESSAY_CONTENT
+
+def essays(client, user, **params):
+    return client.get("/api/essays", params=params, headers=token_headers(user))
+
+def test_listing_leaves_out_text_by_default(client, seed):
+    user = seed.users[0]
+    response = essays(client, user)
+    assert response.status_code == 200
+
+    expected = sorted((a for a in seed.annotations if a.user_id == user.id), key=lambda a: a.display_order)
+    rows = response.json()
+    assert [row["blind_id"] for row in rows] == [a.blind_id for a in expected]
+    for row in rows:
+        assert set(row) == {"id", "title", "question", "is_annotated", "paper_id", "question_id", "blind_id"}
+        assert not {"content", "summary", "paper_summary"} & set(row)
+
+def test_fields_projects_the_listing(client, seed):
+    user = seed.users[0]
+    rows = essays(client, user, fields="title, is_annotated").json()
+    assert rows and all(set(row) == {"id", "blind_id", "title", "is_annotated"} for row in rows)
+
+    rows = essays(client, user, fields="content,summary").json()
+    assert all(set(row) == {"id", "blind_id", "content", "summary"} for row in rows)
+    assert rows[0]["content"] == ESSAY_CONTENT
+    assert rows[0]["summary"] == {"scores": {}}
+
+def test_unknown_fields_are_rejected(client, seed):
+    response = essays(client, seed.users[0], fields="title,paper_summary,bogus")
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Unknown fields: bogus, paper_summary"
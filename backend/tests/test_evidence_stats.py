@@ -0,0 +1,68 @@
+import itertools
+import random
+
+import numpy as np
+import pytest
+
+from evidence_stats import EVIDENCE_TRAITS, evidence_data, evidence_report
+from validate_stats import krippendorff_alpha
+
+def random_study(seed, n_essays=30):
+    """(annotation_rows, selection_rows, essays) — essays: {essay_id: (n_sentences, [{trait: set}])}"""
+    rng = random.Random(seed)
+    annotation_rows, selection_rows, essays = [], [], {}
+    ids = rng.sample(range(1, 10000), n_essays * 4)
+    for essay_id in range(1, n_essays + 1):
+        n_sentences = rng.randint(1, 20)
+        raters = []
+        for _ in range(rng.randint(1, 4)):
+            annotation_id = ids.pop()
+            chosen = {trait: {i for i in range(n_sentences) if rng.random() < 0.3} if rng.random() < 0.8 else set()
+                      for trait in EVIDENCE_TRAITS}
+            annotation_rows.append((annotation_id, essay_id, n_sentences))
+            selection_rows += [(annotation_id, trait, i) for trait, idx in chosen.items() for i in idx]
+            raters.append(chosen)
+        essays[essay_id] = (n_sentences, raters)
+    rng.shuffle(selection_rows)
+    return annotation_rows, selection_rows, essays
+
+def brute_force(essays, trait):
+    jaccard, f1, sizes, rates = [], [], [], []
+    units = []
+    for n_sentences, raters in essays.values():
+        sets = [chosen[trait] for chosen in raters]
+        sizes += [len(s) for s in sets]
+        for a, b in itertools.combinations(sets, 2):
+            if a or b:
+                jaccard.append(len(a & b) / len(a | b))
+                f1.append(2 * len(a & b) / (len(a) + len(b)))
+        for i in range(n_sentences):
+            votes = [float(i in s) for s in sets]
+            rates.append(sum(votes) / len(votes))
+            if len(votes) >= 2:
+                units.append(votes + [np.nan] * (4 - len(votes)))
+    return {
+        'mean_selected': np.mean(sizes),
+        'jaccard': np.mean(jaccard),
+        'f1': np.mean(f1),
+        'alpha': krippendorff_alpha(np.array(units), 'nominal', np.arange(2)),
+        'selection_rate': np.mean(rates),
+    }
+
+@pytest.mark.parametrize("seed", range(5))
+def test_report_matches_brute_force(seed):
+    annotation_rows, selection_rows, essays = random_study(seed)
+    report = evidence_report(evidence_data(annotation_rows, selection_rows))
+
+    for trait in EVIDENCE_TRAITS:
+        expected = brute_force(essays, trait)
+        for key, value in expected.items():
+            assert report[trait][key] == pytest.approx(value), (trait, key)
+        assert report[trait]['n_annotations'] == len(annotation_rows)
+        assert report[trait]['n_pairs'] == sum(len(r) * (len(r) - 1) // 2 for _, r in essays.values())
+
+def test_pairs_with_no_selection_are_not_scored():
+    report = evidence_report(evidence_data([(1, 1, 3), (2, 1, 3)], [(1, 'content', 0), (2, 'content', 0)]))
+    assert report['content']['jaccard'] == report['content']['f1'] == 1.0
+    assert report['language']['n_empty_pairs'] == 1
+    assert np.isnan(report['language']['jaccard'])
@@ -0,0 +1,18 @@
+import csv
+import io
+
+from conftest import token_headers
+
+def test_csv_export_has_single_charset(client, seed):
+    response = client.get("/api/admin/export", params={"format": "csv", "include_unsubmitted": True},
+                          headers=token_headers(seed.admin))
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "text/csv; charset=utf-8"
+    assert response.headers["content-disposition"] == 'attachment; filename="annotations.csv"'
+    rows = list(csv.DictReader(io.StringIO(response.content.decode("utf-8-sig"))))
+    assert len(rows) == len(seed.annotations)
+
+def test_jsonl_export_content_type(client, seed):
+    response = client.get("/api/admin/export", params={"format": "jsonl"}, headers=token_headers(seed.admin))
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert response.content == b""  # 제출된 어노테이션 없음
@@ -0,0 +1,37 @@
+import pytest
+
+from conftest import token_headers
+
+def revalidate(client, url, headers):
+    first = client.get(url, headers=headers)
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+    assert first.headers["cache-control"] == "private, no-cache"
+
+    cached = client.get(url, headers={**headers, "If-None-Match": f"W/{etag}"})
+    assert cached.status_code == 304
+    assert cached.headers["etag"] == etag and not cached.content
+    assert client.get(url, headers={**headers, "If-None-Match": '"other"'}).status_code == 200
+    return etag
+
+@pytest.mark.parametrize("path", ["essays/{essay_id}", "papers/{paper_id}", "questions/{question_id}", "annotations/{blind_id}"])
+def test_immutable_resources_revalidate(client, seed, path):
+    target = seed.annotations[0]
+    essay = seed.essays[0]
+    url = "/api/" + path.format(essay_id=essay.id, paper_id=essay.paper_id, question_id=essay.question_id, blind_id=target.blind_id)
+    revalidate(client, url, token_headers(seed.users[0]))
+
+def test_admin_etag_changes_with_revision(client, seed):
+    admin_headers = token_headers(seed.admin)
+    etags = {path: revalidate(client, f"/api/admin/{path}", admin_headers) for path in ("progress", "stats")}
+
+    target = seed.annotations[0]
+    response = client.put(f"/api/annotations/{target.blind_id}", headers=token_headers(seed.users[0]), json={
+        "score_language": 4, "score_organization": 4, "score_content": 4, "score_ai_feedback": 4
+    })
+    assert response.status_code == 200
+
+    for path, etag in etags.items():
+        response = client.get(f"/api/admin/{path}", headers={**admin_headers, "If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["etag"] != etag
@@ -0,0 +1,179 @@
+import json
+
+import pytest
+from sqlalchemy import select, func
+
+import init_db
+from models import SessionLocal, Essay, Annotation, Paper, Question, StudyStats, UserProgress, QuestionScoreHistogram
+from aggregates import rebuild_aggregates, STUDY_STATS_ID
+
+def write_dataset(path, papers):
+    """논문마다 질문 5개 × (정답 1 + 노이즈 12) 문항"""
+    data = [
+        {
+            "filename": paper, "question": f"{paper} 질문 {q}", "input": f"{paper} 에세이 {q}-{k}. 두 번째 문장입니다.",
+            "is_original": k == 0, "noise_level": k,
+            "evidence_list": [{"section": "s", "original_sentence": f"{paper}-{q}"}] if k == 0 else [],
+            "output": {"content": 3, "organization": 3, "language": 3, "consistency": 3},
+        }
+        for paper in papers for q in range(5) for k in range(13)
+    ]
+    path.write_text(json.dumps({"data": data}, ensure_ascii=False), encoding="utf-8")
+
+STREAM_DOCUMENTS = [
+    {"data": ["x" * 48, 4.5]},
+    {"version": 1.25, "data": [1, -2.5e-3, 3e10, True, None, "문자열 \"escape\"", {"a": [1.5, {}]}, []], "score": 0.75},
+    {"meta": {"threshold": 12.125, "tags": ["a", "b"]}, "data": [{"n": 123456789.5}, 0, -0.0], "tail": -7.5},
+    {"data": []},
+    {"other": [1, 2]},
+]
+
+@pytest.mark.parametrize("document", STREAM_DOCUMENTS)
+def test_iter_json_array_matches_json_loads(tmp_path, document):
+    """버퍼 경계가 값 중간(잘린 숫자, 문자열, 키)에 오더라도 json.loads와 같은 결과"""
+    expected = json.loads(json.dumps(document)).get("data", [])
+    for indent in (None, 2):
+        path = tmp_path / "stream.json"
+        path.write_text(json.dumps(document, ensure_ascii=False, indent=indent), encoding="utf-8")
+        for chunk_size in [*range(1, 80), 128, 1 << 20]:
+            assert list(init_db.iter_json_array(str(path), chunk_size=chunk_size)) == expected, chunk_size
+
+def aggregate_snapshot(db):
+    study = db.get(StudyStats, STUDY_STATS_ID)
+    users = sorted(db.execute(select(UserProgress.user_id, UserProgress.assigned_count, UserProgress.submitted_count)).all())
+    return (study.assigned_count, study.submitted_count, study.n_language, study.sum_language), users
+
+@pytest.fixture
+def dataset(tmp_path):
+    summaries = tmp_path / "summaries.json"
+    summaries.write_text(json.dumps({"p1.pdf": "요약 1", "p2.pdf": "요약 2"}), encoding="utf-8")
+    return tmp_path / "dataset.json", summaries
+
+def run(dataset_path, summary_path, **kwargs):
+    return init_db.main(n_annotators=3, seed=1, dataset_path=str(dataset_path), summary_path=str(summary_path), **kwargs)
+
+def test_append_reuses_papers_and_applies_aggregate_deltas(dataset):
+    dataset_path, summary_path = dataset
+    write_dataset(dataset_path, ["p1.pdf"])
+    assert run(dataset_path, summary_path)
+
+    # 제출된 평가가 있는 상태에서 증분 수집
+    db = SessionLocal()
+    annotation = db.scalars(select(Annotation).order_by(Annotation.id)).first()
+    annotation.is_submitted, annotation.score_language = True, 4
+    db.flush()
+    rebuild_aggregates(db)
+    db.commit()
+    db.close()
+
+    write_dataset(dataset_path, ["p1.pdf", "p2.pdf"])
+    assert run(dataset_path, summary_path, append=True, n_papers=2)
+    assert run(dataset_path, summary_path, append=True, n_papers=2)  # 바뀐 것이 없으면 아무것도 추가하지 않음
+
+    db = SessionLocal()
+    try:
+        assert db.scalar(select(func.count(Essay.id))) == 130
+        assert db.scalar(select(func.count(Paper.id))) == 2
+        assert db.scalar(select(func.count(Question.id))) == 10
+        incremental = aggregate_snapshot(db)
+        rebuild_aggregates(db)
+        assert aggregate_snapshot(db) == incremental
+        assert incremental[0] == (260, 1, 1, 4)
+    finally:
+        db.rollback()
+        db.close()
+
+def test_append_refuses_essays_without_content_hash(dataset):
+    dataset_path, summary_path = dataset
+    write_dataset(dataset_path, ["p1.pdf"])
+    assert run(dataset_path, summary_path)
+
+    db = SessionLocal()
+    db.execute(Essay.__table__.update().values(content_hash=None))
+    db.commit()
+    db.close()
+
+    assert run(dataset_path, summary_path, append=True) is False
+    db = SessionLocal()
+    try:
+        assert db.scalar(select(func.count(Essay.id))) == 65
+    finally:
+        db.close()
+
+def test_backfill_metadata_restores_legacy_essays(dataset):
+    """메타데이터 컬럼 이전에 수집된 DB: 본문·질문으로 데이터셋과 매칭해 채운 뒤 --append가 가능해짐"""
+    dataset_path, summary_path = dataset
+    write_dataset(dataset_path, ["p1.pdf"])
+    assert run(dataset_path, summary_path)
+
+    metadata = lambda db: sorted(db.execute(select(
+        Essay.id, Essay.content_hash, Essay.filename, Essay.q_id, Essay.is_original, Essay.noise_level
+    )).all())
+    db = SessionLocal()
+    expected = metadata(db)
+    first = db.scalars(select(Annotation).order_by(Annotation.id)).first()
+    first.is_submitted, first.score_language = True, 4
+    essay_id = first.essay_id
+    db.flush()
+    # 이전 버전 DB와 같은 상태: 메타데이터 없음, 마이그레이션이 만든 논문/질문 행에도 식별자 없음
+    db.execute(Essay.__table__.update().values(content_hash=None, filename=None, q_id=None, is_original=None, noise_level=None))
+    db.execute(Paper.__table__.update().values(filename=None))
+    db.execute(Question.__table__.update().values(q_id=None))
+    original_content = db.get(Essay, essay_id).content
+    db.execute(Essay.__table__.update().where(Essay.id == essay_id).values(content="데이터셋에 없는 본문"))
+    rebuild_aggregates(db)
+    db.commit()
+    assert db.execute(select(QuestionScoreHistogram.filename, QuestionScoreHistogram.q_id)).all() == [("", "")]
+    db.close()
+
+    assert init_db.backfill_metadata(str(dataset_path)) == {"matched": 64, "unmatched": 1, "ambiguous": 0, "unknown_levels": 0}
+    assert run(dataset_path, summary_path, append=True) is False  # 매칭되지 않은 에세이가 남아 있음
+
+    db = SessionLocal()
+    db.execute(Essay.__table__.update().where(Essay.id == essay_id).values(content=original_content))
+    db.commit()
+    db.close()
+    assert init_db.backfill_metadata(str(dataset_path))["matched"] == 1
+
+    db = SessionLocal()
+    try:
+        assert metadata(db) == expected
+        assert db.execute(select(Paper.filename)).scalars().all() == ["p1.pdf"]
+        assert sorted(db.scalars(select(Question.q_id))) == [f"Q{q + 1}" for q in range(5)]
+        histogram = db.execute(select(QuestionScoreHistogram.filename, QuestionScoreHistogram.q_id, QuestionScoreHistogram.count)).all()
+        assert histogram == [("p1.pdf", db.get(Essay, essay_id).q_id, 1)]
+    finally:
+        db.close()
+
+    write_dataset(dataset_path, ["p1.pdf", "p2.pdf"])
+    assert run(dataset_path, summary_path, append=True, n_papers=2)
+    db = SessionLocal()
+    try:
+        assert db.scalar(select(func.count(Essay.id))) == 130
+        assert db.scalar(select(func.count(Paper.id))) == 2
+    finally:
+        db.close()
+
+@pytest.mark.parametrize("item, expected", [
+    ({"is_original": True, "noise_level": 3}, 0),
+    ({"noise_level": "2"}, 2),
+    ({"level": 4}, 4),
+    ({"id": "2302.03287v3.pdf_Q1_L2_0"}, 2),
+    ({"title": "2302.03287v3.pdf_Q1_Orig_1"}, 0),
+    ({"noise_level": "high", "id": "paper.pdf_Q3_L5_7"}, 5),
+    ({"id": "paper.pdf_Q3_7"}, None),
+    ({}, None),
+])
+def test_item_noise_level(item, expected):
+    assert init_db.item_noise_level(item) == expected
+
+def test_ingestion_reports_unknown_noise_levels(dataset, capsys):
+    dataset_path, summary_path = dataset
+    write_dataset(dataset_path, ["p1.pdf"])
+    data = json.loads(dataset_path.read_text(encoding="utf-8"))
+    for item in data["data"][1:3]:
+        del item["noise_level"]
+    dataset_path.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+
+    assert run(dataset_path, summary_path)
+    assert "noise_level을 알 수 없는 문항 2개" in capsys.readouterr().out
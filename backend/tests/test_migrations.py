@@ -0,0 +1,98 @@
+import sqlite3
+
+from sqlalchemy import create_engine, inspect
+
+import migrations
+from models import Base
+
+def legacy_database(path):
+    """현재 스키마에 이전 버전 컬럼(selected_sentences_*, paper_summary, evidence)과 옮기기 전 데이터를 채운 DB"""
+    bind = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=bind)
+    conn = sqlite3.connect(path)
+    with conn:
+        for column in migrations.LEGACY_SELECTION_COLUMNS:
+            conn.execute(f"ALTER TABLE annotations ADD COLUMN {column} TEXT")
+        conn.execute("ALTER TABLE essays ADD COLUMN paper_summary TEXT")
+        conn.execute("ALTER TABLE essays ADD COLUMN evidence TEXT")
+        conn.execute("INSERT INTO users (id, username, password_hash, full_name) VALUES (1, 'u', 'x', 'u')")
+        conn.execute("""
+            INSERT INTO essays (id, title, content, question, filename, q_id, paper_summary, evidence)
+            VALUES (1, 't', 'c', 'q', 'paper.pdf', 'Q1', '요약', '["근거"]')
+        """)
+        conn.execute("""
+            INSERT INTO annotations (id, user_id, essay_id, blind_id, display_order, selected_sentences_language)
+            VALUES (1, 1, 1, 'B1', 1, '[2, 0, -1]')
+        """)
+    conn.close()
+    return bind
+
+def test_upgrade_copies_legacy_columns_without_clearing(tmp_path):
+    path = tmp_path / "legacy.db"
+    bind = legacy_database(path)
+    migrations.upgrade(bind)
+
+    conn = sqlite3.connect(path)
+    try:
+        assert conn.execute("SELECT selected_sentences_language FROM annotations").fetchone() == ("[2, 0, -1]",)
+        assert conn.execute("SELECT paper_summary, evidence FROM essays").fetchone() == ("요약", '["근거"]')
+        # 음수 번호는 복사하지 않음
+        assert conn.execute("SELECT sentence_idx FROM annotation_sentences ORDER BY sentence_idx").fetchall() == [(0,), (2,)]
+        assert conn.execute("SELECT summary FROM papers").fetchall() == [("요약",)]
+        assert conn.execute("SELECT evidence FROM questions").fetchall() == [('["근거"]',)]
+
+        # API에서 바뀐 선택은 다시 upgrade해도 이전 값으로 되돌아가지 않음
+        with conn:
+            conn.execute("DELETE FROM annotation_sentences")
+            conn.execute("INSERT INTO annotation_sentences (annotation_id, essay_id, trait, sentence_idx) VALUES (1, 1, 'language', 1)")
+        migrations.upgrade(bind)
+        assert conn.execute("SELECT sentence_idx FROM annotation_sentences").fetchall() == [(1,)]
+        assert conn.execute("SELECT COUNT(*) FROM papers").fetchone() == (1,)
+    finally:
+        conn.close()
+
+def test_drop_legacy_columns_creates_backup(tmp_path):
+    path = tmp_path / "legacy.db"
+    backup_path = tmp_path / "backup.db"
+    bind = legacy_database(path)
+
+    applied = migrations.drop_legacy_columns(bind, backup_path=str(backup_path))
+    assert f"backup database to {backup_path}" in applied
+
+    columns = {col["name"] for col in inspect(bind).get_columns("annotations")}
+    columns |= {col["name"] for col in inspect(bind).get_columns("essays")}
+    assert not columns & {"paper_summary", "evidence", *migrations.LEGACY_SELECTION_COLUMNS}
+
+    backup = sqlite3.connect(backup_path)
+    try:
+        assert backup.execute("SELECT paper_summary, evidence FROM essays").fetchone() == ("요약", '["근거"]')
+        assert backup.execute("SELECT selected_sentences_language FROM annotations").fetchone() == ("[2, 0, -1]",)
+    finally:
+        backup.close()
+
+    # 삭제할 컬럼이 없으면 백업도 만들지 않음
+    assert not any(change.startswith("backup") for change in migrations.drop_legacy_columns(bind))
+
+def test_upgrade_adds_missing_schema_once(tmp_path):
+    path = tmp_path / "old.db"
+    bind = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=bind)
+    conn = sqlite3.connect(path)
+    with conn:
+        conn.execute("DROP TABLE study_stats")
+        conn.execute("DROP INDEX ix_annotations_user_essay")
+        conn.execute("ALTER TABLE annotations DROP COLUMN version")
+        conn.execute("INSERT INTO users (id, username, password_hash, full_name) VALUES (1, 'u', 'x', 'u')")
+        conn.execute("INSERT INTO essays (id, title, content, question) VALUES (1, 't', 'c', 'q')")
+        conn.execute("INSERT INTO annotations (id, user_id, essay_id, blind_id, display_order) VALUES (1, 1, 1, 'B1', 1)")
+    conn.close()
+
+    applied = migrations.upgrade(bind)
+    assert {"create table study_stats", "create index ix_annotations_user_essay", "add column annotations.version"} <= set(applied)
+    assert migrations.upgrade(bind) == []
+
+    conn = sqlite3.connect(path)
+    try:
+        assert conn.execute("SELECT version FROM annotations").fetchone() == (1,)  # server_default
+    finally:
+        conn.close()
@@ -0,0 +1,18 @@
+from sqlalchemy import text
+
+from check_query_plans import query_plan_scans
+from models import engine
+
+def test_endpoints_have_no_table_scans(seed):
+    """check_query_plans.py와 같은 검사: 엔드포인트가 실행하는 모든 쿼리에 전체 테이블 스캔이 없어야 함"""
+    results = list(query_plan_scans())
+    assert all(n_queries for _, n_queries, _ in results)
+    assert {name: scans for name, _, scans in results if scans} == {}
+
+def test_missing_index_is_reported(seed):
+    with engine.begin() as conn:
+        conn.execute(text("DROP INDEX ix_annotations_user_order"))
+        conn.execute(text("DROP INDEX ix_annotations_user_submitted_order"))
+        conn.execute(text("DROP INDEX ix_annotations_user_essay"))
+    failing = {name for name, _, scans in query_plan_scans() if scans}
+    assert "GET /api/annotations/pending" in failing
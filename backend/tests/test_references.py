@@ -0,0 +1,20 @@
+from conftest import token_headers
+
+def test_essay_responses_reference_papers_and_questions(client, seed):
+    headers = token_headers(seed.users[0])
+    essays = client.get("/api/essays", headers=headers).json()
+    assert {essay["paper_id"] for essay in essays} == {seed.essays[0].paper_id}
+    assert "paper_summary" not in essays[0] and "evidence" not in essays[0]
+
+    paper = client.get(f"/api/papers/{seed.essays[0].paper_id}", headers=headers)
+    assert paper.json() == {"id": seed.essays[0].paper_id, "summary": "논문 요약"}
+    question = client.get(f"/api/questions/{seed.essays[0].question_id}", headers=headers).json()
+    assert question["evidence"] == [{"section": "s", "original_sentence": "근거 1"}]
+    assert client.get("/api/questions/9999", headers=headers).status_code == 404
+
+def test_workspace_includes_question_evidence(client, seed):
+    target = seed.annotations[2]  # 두 번째 질문의 에세이
+    workspace = client.get(f"/api/annotations/{target.blind_id}/workspace", headers=token_headers(seed.users[0])).json()
+    assert workspace["essay"]["question_id"] == seed.essays[2].question_id
+    assert workspace["evidence"] == [{"section": "s", "original_sentence": "근거 2"}]
+    assert workspace["essay"]["sentences"] == ["첫 번째 문장입니다.", "두 번째 문장입니다.", "세 번째 문장입니다."]
@@ -0,0 +1,49 @@
+import orjson
+from pydantic import BaseModel
+from sqlalchemy import update
+
+from conftest import token_headers
+from models import SessionLocal, engine, Essay, Question
+from migrations import upgrade
+from responses import json_response
+from schemas import PaperResponse
+
+class Inner(BaseModel):
+    summary: str
+
+class Outer(BaseModel):
+    evidence: str
+    summary: str
+    inner: Inner
+
+def body(response):
+    return orjson.loads(response.body)
+
+def test_only_listed_fields_are_embedded():
+    data = Outer(evidence='[1, 2]', summary='{"a": 1}', inner=Inner(summary='{"b": 2}'))
+    assert body(json_response(data)) == {"evidence": "[1, 2]", "summary": '{"a": 1}', "inner": {"summary": '{"b": 2}'}}
+    assert body(json_response(data, raw_fields=("evidence", "inner.summary"))) == {
+        "evidence": [1, 2], "summary": '{"a": 1}', "inner": {"summary": {"b": 2}}
+    }
+    assert body(json_response([data], raw_fields=("summary",)))[0]["summary"] == {"a": 1}
+
+def test_plain_text_summary_is_a_string():
+    assert body(json_response(PaperResponse(id=1, summary="일반 텍스트 요약"))) == {"id": 1, "summary": "일반 텍스트 요약"}
+
+def test_upgrade_quotes_invalid_json_columns(client, seed):
+    db = SessionLocal()
+    db.execute(update(Essay).where(Essay.id == seed.essays[0].id).values(summary="AI 피드백 (JSON 아님)"))
+    db.execute(update(Question).where(Question.id == seed.essays[0].question_id).values(evidence="[잘린 JSON"))
+    db.commit()
+    db.close()
+
+    applied = upgrade(engine)
+    assert "quote 1 non-JSON values of essays.summary" in applied
+    assert "quote 1 non-JSON values of questions.evidence" in applied
+    assert not any(change.startswith("quote") for change in upgrade(engine))
+
+    headers = token_headers(seed.users[0])
+    essay = client.get(f"/api/essays/{seed.essays[0].id}", headers=headers).json()
+    assert essay["summary"] == "AI 피드백 (JSON 아님)"
+    assert client.get(f"/api/questions/{seed.essays[0].question_id}", headers=headers).json()["evidence"] == "[잘린 JSON"
+    assert client.get(f"/api/essays/{seed.essays[1].id}", headers=headers).json()["summary"] == {"scores": {}}
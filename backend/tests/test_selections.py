@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from conftest import token_headers
+from evidence_stats import evidence_data, selection_matrix
+from selections import parse_selection
+
+def test_parse_selection_rejects_negative_indices():
+    assert parse_selection("[2, 0, 2]") == [0, 2]
+    with pytest.raises(ValueError):
+        parse_selection("[0, -1]")
+
+@pytest.mark.parametrize("value", ["[1.7]", "[1.0]", "[true]", '["1"]', '"12"', '{"0": 1}', "[[0]]", [True], [0.5]])
+def test_parse_selection_accepts_only_integers(value):
+    with pytest.raises(ValueError):
+        parse_selection(value)
+
+def test_api_rejects_non_integer_indices(client, seed):
+    target = seed.annotations[0]
+    headers = token_headers(seed.users[0])
+    scores = {"score_language": 4, "score_organization": 4, "score_content": 4, "score_ai_feedback": 4}
+
+    for value in ("[1.7]", "[true]"):
+        response = client.put(f"/api/annotations/{target.blind_id}", headers=headers,
+                              json={**scores, "selected_sentences_language": value})
+        assert response.status_code == 422
+        response = client.put(f"/api/annotations/{target.blind_id}/draft", headers=headers,
+                              json={"selected_sentences_content": value})
+        assert response.status_code == 422
+    for value in ([1.7], [True], [1.0], ["1"]):
+        response = client.patch(f"/api/annotations/{target.id}", headers=headers,
+                                 json={"language": {"score": 3, "selected_sentences": value}})
+        assert response.status_code == 422
+    response = client.patch(f"/api/annotations/{target.id}", headers=headers,
+                            json={"language": {"score": 3, "selected_sentences": [2, 0]}})
+    assert response.status_code == 200
+    assert response.json()["language"]["selected_sentences"] == [0, 2]
+
+def test_api_rejects_negative_indices(client, seed):
+    target = seed.annotations[0]
+    headers = token_headers(seed.users[0])
+    scores = {"score_language": 4, "score_organization": 4, "score_content": 4, "score_ai_feedback": 4}
+
+    response = client.put(f"/api/annotations/{target.blind_id}", headers=headers,
+                          json={**scores, "selected_sentences_language": "[-1]"})
+    assert response.status_code == 422
+    response = client.put(f"/api/annotations/{target.blind_id}/draft", headers=headers,
+                          json={"selected_sentences_content": "[0, -2]"})
+    assert response.status_code == 422
+    response = client.patch(f"/api/annotations/{target.id}", headers=headers,
+                            json={"language": {"score": 3, "selected_sentences": [-1]}})
+    assert response.status_code == 422
+
+def test_evidence_data_ignores_negative_indices():
+    # (annotation_id, essay_id, 문장 수) / (annotation_id, trait, sentence_idx)
+    data = evidence_data([(1, 1, 3), (2, 1, 3)], [(1, "language", 0), (1, "language", -1), (2, "language", 2)])
+    selected = selection_matrix(data, "language")
+    assert selected.tolist() == [[True, False, False], [False, False, True]]
+    assert np.array_equal(data["n_sentences"], [3])
@@ -0,0 +1,38 @@
+from sqlalchemy import select, func, delete, update
+
+from conftest import token_headers
+from models import SessionLocal, EssaySentence
+from sentences import SPLITTER_VERSION, ensure_sentence_index
+
+EXPECTED = ["첫 번째 문장입니다.", "두 번째 문장입니다.", "세 번째 문장입니다."]
+
+def sentence_rows(essay_id):
+    db = SessionLocal()
+    try:
+        return db.execute(select(EssaySentence.idx, EssaySentence.splitter_version).where(
+            EssaySentence.essay_id == essay_id
+        ).order_by(EssaySentence.idx)).all()
+    finally:
+        db.close()
+
+def test_read_path_does_not_write_missing_or_stale_index(client, seed):
+    missing, stale = seed.essays[0].id, seed.essays[1].id
+    db = SessionLocal()
+    db.execute(delete(EssaySentence).where(EssaySentence.essay_id == missing))
+    db.execute(update(EssaySentence).where(EssaySentence.essay_id == stale).values(splitter_version=SPLITTER_VERSION - 1))
+    db.commit()
+    db.close()
+
+    headers = token_headers(seed.users[0])
+    for essay_id in (missing, stale):
+        assert client.get(f"/api/essays/{essay_id}", headers=headers).json()["sentences"] == EXPECTED
+    workspace = client.get(f"/api/annotations/{seed.annotations[0].blind_id}/workspace", headers=headers).json()
+    assert workspace["essay"]["sentences"] == EXPECTED
+
+    assert sentence_rows(missing) == []
+    assert {version for _, version in sentence_rows(stale)} == {SPLITTER_VERSION - 1}
+
+    # 서버 시작 시 호출되는 인덱스 생성은 누락/오래된 에세이만 다시 만듦
+    assert ensure_sentence_index() == 2
+    assert sentence_rows(missing) == [(0, SPLITTER_VERSION), (1, SPLITTER_VERSION), (2, SPLITTER_VERSION)]
+    assert ensure_sentence_index() == 0
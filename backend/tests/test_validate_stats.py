@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+from scipy import stats
+
+from validate_stats import BOOTSTRAP_METRICS, bootstrap_ci, krippendorff_alpha, pairwise_weighted_kappa, run_bootstrap
+
+nan = np.nan
+
+# Krippendorff (2011), "Computing Krippendorff's Alpha-Reliability"의 예제: 12 units × 4 평가자, 결측 포함
+RELIABILITY_DATA = np.array([
+    [1, 1, nan, 1],
+    [2, 2, 3, 2],
+    [3, 3, 3, 3],
+    [3, 3, 3, 3],
+    [2, 2, 2, 2],
+    [1, 2, 3, 4],
+    [4, 4, 4, 4],
+    [1, 1, 2, 1],
+    [2, 2, 2, 2],
+    [nan, 5, 5, 5],
+    [nan, nan, 1, 1],
+    [nan, 3, nan, nan],
+])
+
+@pytest.mark.parametrize("level, expected", [("nominal", 0.743), ("ordinal", 0.815), ("interval", 0.849)])
+def test_alpha_matches_reference_example(level, expected):
+    assert krippendorff_alpha(RELIABILITY_DATA, level) == pytest.approx(expected, abs=5e-4)
+
+def test_alpha_is_nan_without_pairable_units():
+    assert np.isnan(krippendorff_alpha(np.array([[1, nan], [nan, 2]])))
+
+def test_pairwise_kappa_matches_sklearn():
+    metrics = pytest.importorskip("sklearn.metrics")
+    rng = np.random.default_rng(0)
+    matrix = rng.integers(1, 6, size=(40, 3)).astype(float)
+    matrix[rng.random(matrix.shape) < 0.2] = nan
+
+    kappa, n_common = pairwise_weighted_kappa(matrix)
+
+    a, b = matrix[:, 0], matrix[:, 2]
+    common = ~np.isnan(a) & ~np.isnan(b)
+    expected = metrics.cohen_kappa_score(a[common], b[common], weights="quadratic")
+    assert kappa[0, 2] == pytest.approx(expected)
+    assert kappa[2, 0] == pytest.approx(expected)
+    assert n_common[0, 2] == common.sum()
+    assert np.isnan(kappa).diagonal().all()
+
+def bootstrap_tasks():
+    rng = np.random.default_rng(1)
+    matrix = rng.integers(1, 6, size=(26, 4)).astype(float)
+    matrix[rng.random(matrix.shape) < 0.3] = nan
+    noise_level = rng.integers(0, 3, size=26).astype(float)
+    score = rng.integers(1, 6, size=26).astype(float)
+    data = {'matrix': matrix, 'noise_level': noise_level, 'score': score}
+    return {('trait', metric): data for metric in BOOTSTRAP_METRICS}
+
+def test_bootstrap_with_unit_weights_reproduces_point_estimates():
+    data = bootstrap_tasks()[('trait', 'kappa')]
+    kappa, n_common = pairwise_weighted_kappa(data['matrix'])
+    upper = np.triu(np.isfinite(kappa), k=1)
+    weights = np.ones((1, len(data['matrix'])))
+
+    assert BOOTSTRAP_METRICS['kappa'](weights, data)[0] == pytest.approx(np.average(kappa[upper], weights=n_common[upper]))
+    assert BOOTSTRAP_METRICS['alpha'](weights, data)[0] == pytest.approx(krippendorff_alpha(data['matrix'], 'ordinal'))
+    assert BOOTSTRAP_METRICS['spearman'](weights, data)[0] == pytest.approx(stats.spearmanr(data['noise_level'], data['score'])[0])
+    groups = [data['score'][data['noise_level'] == level] for level in np.unique(data['noise_level'])]
+    assert BOOTSTRAP_METRICS['anova'](weights, data)[0] == pytest.approx(stats.f_oneway(*groups)[0])
+
+def test_bootstrap_ci_does_not_depend_on_worker_count():
+    tasks = bootstrap_tasks()
+    serial = run_bootstrap(tasks, n_resamples=500, seed=42, workers=1)
+    parallel = run_bootstrap(tasks, n_resamples=500, seed=42, workers=2)
+
+    assert serial == parallel
+    assert serial[('trait', 'kappa')] == bootstrap_ci('kappa', tasks[('trait', 'kappa')], 500, 42)
+    assert run_bootstrap(tasks, n_resamples=500, seed=43, workers=2) != serial
@@ -1,14 +1,11 @@
 import sqlite3
 import pandas as pd
 import numpy as np
-import re
+import argparse
+from concurrent.futures import ProcessPoolExecutor
 from scipy import stats
-from sklearn.metrics import cohen_kappa_score
 import warnings
 
-# 경고 무시 (데이터 수가 적을 때의 ANOVA 경고 등)
-warnings.filterwarnings('ignore')
-
 def get_kappa_interpretation(kappa):
     if kappa < 0: return "일치 불일치 (Poor)"
     if kappa < 0.2: return "아주 낮은 일치 (Slight)"
@@ -17,104 +14,331 @@ def get_kappa_interpretation(kappa):
     if kappa < 0.8: return "높은 일치 (Substantial)"
     return "매우 높은 일치 (Almost Perfect)"
 
-def parse_noise_level(title):
+# 평가 점수 범주 (models.Annotation의 CHECK 제약: 1~5)
+SCORE_CATEGORIES = np.arange(1, 6)
+
+def score_matrix(df, score_col):
+    """essay × 평가자 점수 행렬 (미평가 칸은 NaN, 결측 행을 버리지 않음)"""
+    return df.pivot_table(index='essay_id', columns='user_id', values=score_col, aggfunc='first').to_numpy(dtype=float)
+
+def one_hot_scores(matrix, categories=SCORE_CATEGORIES):
+    """점수 행렬을 (essay, 평가자, 범주) 원-핫 배열로 변환. 결측/범위 밖 점수는 0 벡터"""
+    return (matrix[:, :, None] == categories[None, None, :]).astype(float)
+
+def krippendorff_alpha(matrix, level='interval', categories=SCORE_CATEGORIES):
+    """
+    Krippendorff's alpha (coincidence matrix 방식).
+    평가자 수가 essay마다 달라도 되며, 2명 이상 평가한 essay만 쌍 정보에 기여합니다.
+    level: 'nominal' | 'ordinal' | 'interval'
+    """
+    counts = one_hot_scores(matrix, categories).sum(axis=1)  # essay × 범주
+    m = counts.sum(axis=1)
+    counts, m = counts[m >= 2], m[m >= 2]
+    if len(m) == 0:
+        return np.nan
+
+    # o_ck = Σ_u (n_uc n_uk - [c==k] n_uc) / (m_u - 1)
+    scaled = counts / (m - 1)[:, None]
+    coincidence = scaled.T @ counts - np.diag(scaled.sum(axis=0))
+    return alpha_from_coincidence(coincidence, level, categories)
+
+def alpha_from_coincidence(coincidence, level='interval', categories=SCORE_CATEGORIES):
+    """coincidence matrix(..., C, C)로부터 alpha 계산. 앞쪽 차원은 부트스트랩 배치 등으로 사용"""
+    n_c = coincidence.sum(axis=-1)
+    n = n_c.sum(axis=-1)
+
+    if level == 'nominal':
+        delta = 1.0 - np.eye(len(categories))
+    elif level == 'interval':
+        delta = np.subtract.outer(categories, categories).astype(float) ** 2
+    elif level == 'ordinal':
+        cum = np.cumsum(n_c, axis=-1)
+        lo = np.minimum.outer(np.arange(len(categories)), np.arange(len(categories)))
+        hi = np.maximum.outer(np.arange(len(categories)), np.arange(len(categories)))
+        # Σ_{g=c..k} n_g - (n_c + n_k) / 2
+        between = cum[..., hi] - cum[..., lo] + n_c[..., lo]
+        delta = (between - (n_c[..., :, None] + n_c[..., None, :]) / 2) ** 2
+    else:
+        raise ValueError(f"Unknown level: {level}")
+
+    expected = (n_c[..., :, None] * n_c[..., None, :] * delta).sum(axis=(-2, -1))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        alpha = np.where(expected > 0, 1.0 - (n - 1) * (coincidence * delta).sum(axis=(-2, -1)) / expected, np.nan)
+    return alpha[()]
+
+def pairwise_weighted_kappa(matrix, categories=SCORE_CATEGORIES):
+    """
+    모든 평가자 쌍의 quadratic weighted kappa.
+    원-핫 배열 한 번의 행렬곱으로 모든 쌍의 혼동 행렬을 만들고, 두 평가자가 함께 평가한
+    essay만 사용합니다. 반환값: (kappa 행렬, 공통 평가 essay 수 행렬), 대각/공통 2건 미만은 NaN
+    """
+    one_hot = one_hot_scores(matrix, categories)
+    n_units, n_raters, n_cat = one_hot.shape
+    flat = one_hot.reshape(n_units, n_raters * n_cat)
+    # confusion[i, j, c, k] = 평가자 i가 c, 평가자 j가 k를 준 essay 수
+    confusion = (flat.T @ flat).reshape(n_raters, n_cat, n_raters, n_cat).transpose(0, 2, 1, 3)
+    n_common = confusion.sum(axis=(2, 3))
+
+    weights = np.subtract.outer(categories, categories).astype(float) ** 2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        expected = confusion.sum(axis=3)[:, :, :, None] * confusion.sum(axis=2)[:, :, None, :] / n_common[:, :, None, None]
+        kappa = 1.0 - (confusion * weights).sum(axis=(2, 3)) / (expected * weights).sum(axis=(2, 3))
+    kappa[(n_common < 2) | np.eye(n_raters, dtype=bool)] = np.nan
+    return kappa, n_common
+
+# ============ BOOTSTRAP ============
+# essay 단위 재표집: 재표집 인덱스 행렬(resample × essay)을 essay별 가중치(중복 횟수)로 바꾸면
+# 모든 통계량이 가중 합으로 표현되어 한 번의 행렬곱으로 배치 계산됩니다.
+
+BOOTSTRAP_RESAMPLES = 10000
+BOOTSTRAP_SEED = 42
+BOOTSTRAP_BATCH = 2000    # 한 번에 계산하는 재표집 수 (메모리 상한)
+CONFIDENCE_LEVEL = 0.95
+
+def resample_weights(rng, n_units, n_resamples):
+    """재표집 인덱스 행렬 → (resample × essay) 중복 횟수 행렬"""
+    idx = rng.integers(0, n_units, size=(n_resamples, n_units))
+    offsets = (np.arange(n_resamples) * n_units)[:, None]
+    return np.bincount((idx + offsets).ravel(), minlength=n_resamples * n_units).reshape(n_resamples, n_units).astype(float)
+
+def weighted_outer(weights, a, b):
+    """Σ_u w_bu a_ui b_uj 를 모든 재표집 b에 대해 한 번에 계산 → (resample, i, j)"""
+    n_units = a.shape[0]
+    pairs = (a[:, :, None] * b[:, None, :]).reshape(n_units, -1)
+    return (weights @ pairs).reshape(len(weights), a.shape[1], b.shape[1])
+
+def bootstrap_kappa(weights, matrix):
+    """
+    공통 평가 essay 수로 가중 평균한 pairwise quadratic kappa.
+    quadratic 가중치에서는 kappa = 1 - Σ(x_i - x_j)² / [S2_i + S2_j - 2 S1_i S1_j / n] 이므로
+    혼동 행렬 없이 평가자 쌍별 1·2차 모멘트만으로 계산됩니다 (pairwise_weighted_kappa와 동일한 값).
+    """
+    present = (~np.isnan(matrix)).astype(float)
+    x = np.nan_to_num(matrix)
+    n = weighted_outer(weights, present, present)        # 공통 essay 수
+    s1 = weighted_outer(weights, x, present)             # s1[i, j] = 평가자 i 점수 합 (j와 공통인 essay)
+    s2 = weighted_outer(weights, x ** 2, present)
+    cross = weighted_outer(weights, x, x)
+    s1_t, s2_t = s1.transpose(0, 2, 1), s2.transpose(0, 2, 1)
+    disagreement = s2 + s2_t - 2 * cross
+    with np.errstate(divide='ignore', invalid='ignore'):
+        expected = s2 + s2_t - 2 * s1 * s1_t / n
+        kappa = 1.0 - disagreement / expected
+    valid = np.triu(np.ones(matrix.shape[1], dtype=bool), k=1)[None] & (n >= 2) & np.isfinite(kappa)
+    n_valid = np.where(valid, n, 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return (np.where(valid, kappa, 0) * n_valid).sum(axis=(1, 2)) / n_valid.sum(axis=(1, 2))
+
+def bootstrap_alpha(weights, matrix, level='ordinal'):
+    """essay별 coincidence 기여분(C×C)의 가중 합으로 재표집별 Krippendorff's alpha 계산"""
+    counts = one_hot_scores(matrix).sum(axis=1)
+    m = counts.sum(axis=1)
+    keep = m >= 2
+    scaled = np.zeros_like(counts)
+    scaled[keep] = counts[keep] / (m[keep] - 1)[:, None]
+    coincidence = weighted_outer(weights, scaled, counts) - (weights @ scaled)[:, :, None] * np.eye(counts.shape[1])[None]
+    return alpha_from_coincidence(coincidence, level)
+
+def bootstrap_spearman(weights, noise_level, score):
+    """재표집별 Spearman rho: 각 essay의 가중 순위(평균 순위)로 가중 Pearson 상관 계산"""
+    def weighted_ranks(values):
+        order = np.argsort(values, kind='stable')
+        v, w = values[order], weights[:, order]
+        # 같은 값끼리 묶어 평균 순위 부여: 앞선 개수 + (묶음 개수 + 1) / 2
+        _, start, group_size = np.unique(v, return_index=True, return_counts=True)
+        group_weight = np.add.reduceat(w, start, axis=1)
+        before = np.cumsum(group_weight, axis=1) - group_weight
+        rank = before + (group_weight + 1) / 2
+        result = np.empty_like(w)
+        result[:, order] = np.repeat(rank, group_size, axis=1)
+        return result
+
+    rx, ry = weighted_ranks(noise_level), weighted_ranks(score)
+    total = weights.sum(axis=1, keepdims=True)
+    mx = (weights * rx).sum(axis=1, keepdims=True) / total
+    my = (weights * ry).sum(axis=1, keepdims=True) / total
+    dx, dy = rx - mx, ry - my
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return (weights * dx * dy).sum(axis=1) / np.sqrt((weights * dx ** 2).sum(axis=1) * (weights * dy ** 2).sum(axis=1))
+
+def bootstrap_anova(weights, noise_level, score):
+    """재표집별 one-way ANOVA F: 그룹별 개수/합/제곱합을 가중치 행렬곱으로 계산"""
+    levels = np.unique(noise_level)
+    membership = (noise_level[:, None] == levels[None, :]).astype(float)
+    n = weights @ membership
+    total = weights @ (membership * score[:, None])
+    squares = weights @ (membership * score[:, None] ** 2)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        group_mean_sq = np.where(n > 0, total ** 2 / n, 0)
+    n_all = n.sum(axis=1)
+    k = (n > 0).sum(axis=1)
+    ss_between = group_mean_sq.sum(axis=1) - total.sum(axis=1) ** 2 / n_all
+    ss_within = squares.sum(axis=1) - group_mean_sq.sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return (ss_between / (k - 1)) / (ss_within / (n_all - k))
+
+BOOTSTRAP_METRICS = {
+    'kappa': lambda w, data: bootstrap_kappa(w, data['matrix']),
+    'alpha': lambda w, data: bootstrap_alpha(w, data['matrix']),
+    'spearman': lambda w, data: bootstrap_spearman(w, data['noise_level'], data['score']),
+    'anova': lambda w, data: bootstrap_anova(w, data['noise_level'], data['score']),
+}
+
+def bootstrap_ci(metric, data, n_resamples=BOOTSTRAP_RESAMPLES, seed=BOOTSTRAP_SEED, confidence=CONFIDENCE_LEVEL):
     """
-    파일명_Q번호_노이즈레벨_인덱스 포맷에서 노이즈 레벨 추출
-    예: 2302.03287v3.pdf_Q1_L2_0 -> 2
-    예: ..._Orig_1 -> 0
+    percentile 부트스트랩 신뢰구간 (lower, upper). 프로세스 풀 작업 단위(영역 × 지표).
+    같은 seed면 작업 순서나 워커 수와 무관하게 같은 구간이 나옵니다.
     """
-    if 'Orig' in title:
-        return 0
-    match = re.search(r'_L(\d+)_', title)
-    if match:
-        return int(match.group(1))
-    return None
-
-def analyze():
+    rng = np.random.default_rng(seed)
+    n_units = len(data['matrix']) if metric in ('kappa', 'alpha') else len(data['score'])
+    estimates = []
+    for start in range(0, n_resamples, BOOTSTRAP_BATCH):
+        weights = resample_weights(rng, n_units, min(BOOTSTRAP_BATCH, n_resamples - start))
+        estimates.append(BOOTSTRAP_METRICS[metric](weights, data))
+    estimates = np.concatenate(estimates)
+    estimates = estimates[np.isfinite(estimates)]
+    if len(estimates) == 0:
+        return np.nan, np.nan
+    tail = (1 - confidence) / 2 * 100
+    lower, upper = np.percentile(estimates, [tail, 100 - tail])
+    return lower, upper
+
+def run_bootstrap(tasks, n_resamples=BOOTSTRAP_RESAMPLES, seed=BOOTSTRAP_SEED, workers=None):
+    """tasks: {(영역, 지표): data} → {(영역, 지표): (lower, upper)} (영역 × 지표별로 프로세스 풀에 분산)"""
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            key: pool.submit(bootstrap_ci, key[1], data, n_resamples, seed)
+            for key, data in tasks.items()
+        }
+        return {key: future.result() for key, future in futures.items()}
+
+def format_ci(ci):
+    return f"[{ci[0]:.4f}, {ci[1]:.4f}]"
+
+# 분석 대상: 제출되었고 노이즈 레벨 메타데이터가 있는 어노테이션
+SUBMITTED_SCORES_QUERY = """
+SELECT 
+    a.essay_id, 
+    a.user_id, 
+    a.score_language, 
+    a.score_organization, 
+    a.score_content, 
+    e.filename,
+    e.q_id,
+    e.is_original,
+    e.noise_level
+FROM annotations a
+JOIN essays e ON a.essay_id = e.id
+WHERE a.is_submitted = 1 AND e.noise_level IS NOT NULL
+"""
+
+TRAITS = {
+    'language': '언어 영역 (Language)',
+    'organization': '구성 영역 (Organization)',
+    'content': '내용 영역 (Content)'
+}
+
+def prepare_trait_data(df):
+    """영역별 분석 입력: essay × 평가자 점수 행렬과 essay별 평균 점수/노이즈 레벨"""
+    trait_data = {}
+    for trait_key in TRAITS:
+        score_col = f'score_{trait_key}'
+        # essay_id별 평균 점수 산출
+        validity_df = df.groupby('essay_id').agg({
+            score_col: 'mean',
+            'noise_level': 'first'
+        }).reset_index()
+        trait_data[trait_key] = {
+            # essay × 평가자 점수 행렬 (겹치는 평가자 쌍이 서로 달라도 결측을 버리지 않고 모두 사용)
+            'matrix': score_matrix(df, score_col),
+            'noise_level': validity_df['noise_level'].to_numpy(dtype=float),
+            'score': validity_df[score_col].to_numpy(dtype=float),
+            'validity_df': validity_df,
+        }
+    return trait_data
+
+def trait_statistics(data, score_col):
+    """영역 하나의 점추정치 (일치도 + 타당성). 계산할 수 없는 값은 NaN"""
+    result = {}
+    # 데이터 수가 적을 때의 ANOVA/상관분석 경고 무시
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+
+        # --- (1) 평가자 간 일치도 (IRR) ---
+        matrix = data['matrix']
+        kappa, n_common = pairwise_weighted_kappa(matrix)
+        pairs = np.triu(~np.isnan(kappa), k=1)
+        result['n_pairs'] = int(pairs.sum())
+        # 공통 평가 essay 수로 가중 평균
+        result['kappa'] = float(np.average(kappa[pairs], weights=n_common[pairs])) if pairs.any() else np.nan
+        result['alpha_ordinal'] = float(krippendorff_alpha(matrix, 'ordinal'))
+        result['alpha_interval'] = float(krippendorff_alpha(matrix, 'interval'))
+
+        # --- (2) 타당성 검증 (Validity) ---
+        validity_df = data['validity_df']
+        # Spearman 상관분석
+        rho, p_val = stats.spearmanr(validity_df['noise_level'], validity_df[score_col])
+        result['spearman_rho'], result['spearman_p'] = float(rho), float(p_val)
+        # ANOVA (그룹 간 평균 차이)
+        groups = [validity_df[validity_df['noise_level'] == lvl][score_col] for lvl in sorted(validity_df['noise_level'].unique())]
+        f_stat, anova_p = stats.f_oneway(*groups) if len(groups) >= 2 else (np.nan, np.nan)
+        result['anova_f'], result['anova_p'] = float(f_stat), float(anova_p)
+    return result
+
+def agreement_report(df):
+    """영역별 trait_statistics (관리자 API 등에서 사용)"""
+    trait_data = prepare_trait_data(df)
+    return {trait_key: trait_statistics(trait_data[trait_key], f'score_{trait_key}') for trait_key in TRAITS}
+
+def analyze(db_path='annotation.db', n_resamples=BOOTSTRAP_RESAMPLES, seed=BOOTSTRAP_SEED, workers=None):
     # 1. DB 연결 및 데이터 로드
-    db_path = 'annotation.db'
     try:
         conn = sqlite3.connect(db_path)
-        query = """
-        SELECT 
-            a.essay_id, 
-            a.user_id, 
-            a.score_language, 
-            a.score_organization, 
-            a.score_content, 
-            e.title
-        FROM annotations a
-        JOIN essays e ON a.essay_id = e.id
-        WHERE a.is_submitted = 1
-        """
-        df = pd.read_sql_query(query, conn)
+        df = pd.read_sql_query(SUBMITTED_SCORES_QUERY, conn)
         conn.close()
     except Exception as e:
         print(f"Error: DB를 읽을 수 없습니다. ({e})")
         return
 
     if df.empty:
-        print("분석할 데이터가 없습니다. (is_submitted=1 인 데이터가 필요합니다.)")
-        return
-
-    # 2. 노이즈 레벨 파싱
-    df['noise_level'] = df['title'].apply(parse_noise_level)
-    
-    # 노이즈 레벨이 파싱되지 않는 데이터(블라인드 처리된 경우 등) 제외
-    df = df.dropna(subset=['noise_level'])
-    if df.empty:
-        print("노이즈 레벨을 추출할 수 있는 데이터가 없습니다. (Title 포맷 확인 필요)")
+        print("분석할 데이터가 없습니다. (is_submitted=1 이고 essays.noise_level이 채워진 데이터가 필요합니다.)")
+        print("   noise_level은 init_db.py 수집 시점에 저장됩니다.")
         return
 
-    traits = {
-        'language': '언어 영역 (Language)',
-        'organization': '구성 영역 (Organization)',
-        'content': '내용 영역 (Content)'
+    # 2. 영역별 분석 데이터 준비 후 부트스트랩 신뢰구간을 (영역 × 지표) 단위로 병렬 계산
+    trait_data = prepare_trait_data(df)
+    tasks = {
+        (trait_key, metric): {k: v for k, v in data.items() if k != 'validity_df'}
+        for trait_key, data in trait_data.items() for metric in BOOTSTRAP_METRICS
     }
+    cis = run_bootstrap(tasks, n_resamples, seed, workers)
 
     print("" + "="*60)
     print("🎓 합성 데이터셋 평가 결과 통계 분석 리포트")
+    print(f"   (95% 신뢰구간: essay 단위 부트스트랩 {n_resamples}회, seed={seed})")
     print("="*60)
 
-    for trait_key, trait_name in traits.items():
-        score_col = f'score_{trait_key}'
+    for trait_key, trait_name in TRAITS.items():
+        result = trait_statistics(trait_data[trait_key], f'score_{trait_key}')
         
         print(f"[{trait_name}]")
         print("-" * 30)
 
         # --- (1) 평가자 간 일치도 (IRR) ---
-        # 동일 essay_id에 대해 user_id별로 피벗
-        try:
-            pivot_df = df.pivot(index='essay_id', columns='user_id', values=score_col).dropna()
-            if pivot_df.shape[1] >= 2:
-                # 첫 두 명의 평가자 점수 추출
-                rater1 = pivot_df.iloc[:, 0].astype(int)
-                rater2 = pivot_df.iloc[:, 1].astype(int)
-                
-                kappa = cohen_kappa_score(rater1, rater2, weights='quadratic')
-                print(f"1. 평가자 일치도 (Quadratic Kappa): {kappa:.4f}")
-                print(f"   => 해석: {get_kappa_interpretation(kappa)}")
-            else:
-                print("1. 평가자 일치도: 데이터 부족 (교차 평가 데이터 필요)")
-        except:
-            print("1. 평가자 일치도: 계산 오류 (데이터 형식을 확인하세요)")
+        if result['n_pairs']:
+            print(f"1. 평가자 일치도 (Quadratic Kappa, {result['n_pairs']}개 평가자 쌍 가중 평균): {result['kappa']:.4f} {format_ci(cis[(trait_key, 'kappa')])}")
+            print(f"   => 해석: {get_kappa_interpretation(result['kappa'])}")
+            print(f"   Krippendorff's alpha: ordinal {result['alpha_ordinal']:.4f} {format_ci(cis[(trait_key, 'alpha')])}, interval {result['alpha_interval']:.4f}")
+        else:
+            print("1. 평가자 일치도: 데이터 부족 (교차 평가 데이터 필요)")
 
         # --- (2) 타당성 검증 (Validity) ---
-        # essay_id별 평균 점수 산출
-        validity_df = df.groupby('essay_id').agg({
-            score_col: 'mean',
-            'noise_level': 'first'
-        }).reset_index()
-
-        # Spearman 상관분석
-        rho, p_val = stats.spearmanr(validity_df['noise_level'], validity_df[score_col])
-        print(f"2. Spearman 상관계수 (Noise vs Score): {rho:.4f}")
+        p_val = result['spearman_p']
+        print(f"2. Spearman 상관계수 (Noise vs Score): {result['spearman_rho']:.4f} {format_ci(cis[(trait_key, 'spearman')])}")
         print(f"   => p-value: {p_val:.4e} ({'유의미함' if p_val < 0.05 else '유의미하지 않음'})")
 
-        # ANOVA (그룹 간 평균 차이)
-        groups = [validity_df[validity_df['noise_level'] == lvl][score_col] for lvl in sorted(validity_df['noise_level'].unique())]
-        f_stat, anova_p = stats.f_oneway(*groups)
-        print(f"3. ANOVA 결과 (F-statistic): {f_stat:.4f}")
+        anova_p = result['anova_p']
+        print(f"3. ANOVA 결과 (F-statistic): {result['anova_f']:.4f} {format_ci(cis[(trait_key, 'anova')])}")
         print(f"   => p-value: {anova_p:.4e} ({'그룹 간 차이 유의미' if anova_p < 0.05 else '차이 없음'})")
 
     print("" + "="*60)
@@ -122,4 +346,12 @@ def analyze():
     print("="*60 + "")
 
 if __name__ == "__main__":
-    analyze()
+    # 경고 무시 (데이터 수가 적을 때의 ANOVA 경고 등)
+    warnings.filterwarnings('ignore')
+    parser = argparse.ArgumentParser(description="합성 데이터셋 평가 결과 통계 분석")
+    parser.add_argument("--db", default="annotation.db")
+    parser.add_argument("--resamples", type=int, default=BOOTSTRAP_RESAMPLES, help="부트스트랩 재표집 횟수")
+    parser.add_argument("--seed", type=int, default=BOOTSTRAP_SEED)
+    parser.add_argument("--workers", type=int, default=None, help="프로세스 풀 크기 (기본값: CPU 수)")
+    args = parser.parse_args()
+    analyze(args.db, args.resamples, args.seed, args.workers)
@@ -1,10 +1,30 @@
 import sqlite3
 import json
 
+def print_progress(cursor):
+    """집계 테이블(study_stats, user_progress)에서 진행률 요약 (어노테이션 전체를 읽지 않음)"""
+    try:
+        study = cursor.execute("SELECT assigned_count, submitted_count FROM study_stats WHERE id = 1").fetchone()
+        users = cursor.execute("""
+            SELECT u.username, p.submitted_count, p.assigned_count
+            FROM user_progress p JOIN users u ON p.user_id = u.id
+            ORDER BY u.username
+        """).fetchall()
+    except sqlite3.Error:
+        return  # 집계 테이블이 아직 없는 DB (서버를 한 번 실행하면 생성됨)
+    if not study:
+        return
+    print(f"전체 진행률: {study[1]}/{study[0]}")
+    for username, submitted, assigned in users:
+        print(f"  {username:<10} {submitted}/{assigned}")
+    print()
+
 def check_db():
     conn = sqlite3.connect('backend/annotation.db')
     cursor = conn.cursor()
 
+    print_progress(cursor)
+
     try:
         # 저장된 평가 데이터 조회
         cursor.execute("""
@@ -36,6 +36,7 @@ export interface Annotation {
     content: TraitAnnotation;
     ai_feedback_score?: number | null;
     is_submitted: boolean;
+    version?: number;
 }
 
 export interface BlindAnnotationInfo {
@@ -49,10 +50,35 @@ export interface Essay {
     title: string;
     content: string;
     question: string;
-    evidence?: string; // JSON string
     is_annotated?: boolean;
     sentences?: string[];
-    summary?: string;
+    summary?: unknown; // JSON object (older servers send it as a JSON string)
+    paper_id?: number | null; // paper summary: essayApi.getPaper
+    question_id?: number | null; // per-question evidence: essayApi.getQuestion
+}
+
+// Shared by every essay of the same paper / question, so they are fetched once and revalidated by ETag
+export interface Paper {
+    id: number;
+    summary: string | null;
+}
+
+export interface Question {
+    id: number;
+    paper_id: number | null;
+    evidence?: unknown; // JSON array
+}
+
+// summary/evidence are sent as JSON values; accept the legacy string form as well
+export const parseJsonField = <T = any>(value: unknown): T =>
+    (typeof value === 'string' ? JSON.parse(value) : value) as T;
+
+export interface Workspace {
+    blind_id: string;
+    display_order: number;
+    essay: Essay;
+    evidence?: unknown; // per-question evidence (JSON array)
+    annotation: Annotation;
 }
 
 export const authApi = {
@@ -68,11 +94,19 @@ export const authApi = {
         const response = await api.get<User>('/users/me');
         return response.data;
     },
+
+    // 서버에서 이 사용자에게 발급된 토큰을 모두 폐기
+    logout: async () => {
+        await api.post('/auth/logout');
+    },
 };
 
 export const essayApi = {
     getEssays: async () => {
-        const response = await api.get<Essay[]>('/essays');
+        // 대시보드는 목록 컬럼만 필요하므로 본문/요약 텍스트는 받지 않음
+        const response = await api.get<Essay[]>('/essays', {
+            params: { fields: 'id,title,question,is_annotated,blind_id' },
+        });
         return response.data;
     },
 
@@ -80,6 +114,16 @@ export const essayApi = {
         const response = await api.get<Essay>(`/essays/${id}`);
         return response.data;
     },
+
+    getPaper: async (id: number) => {
+        const response = await api.get<Paper>(`/papers/${id}`);
+        return response.data;
+    },
+
+    getQuestion: async (id: number) => {
+        const response = await api.get<Question>(`/questions/${id}`);
+        return response.data;
+    },
 };
 
 export const annotationApi = {
@@ -88,6 +132,11 @@ export const annotationApi = {
         return response.data;
     },
 
+    getWorkspace: async (blindId: string) => {
+        const response = await api.get<Workspace>(`/annotations/${blindId}/workspace`);
+        return response.data;
+    },
+
     getAnnotation: async (essayId: number) => {
         const response = await api.get<Annotation | null>(`/annotations/essay-data/${essayId}`);
         return response.data;
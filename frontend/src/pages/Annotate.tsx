@@ -1,6 +1,6 @@
 import { useEffect, useState } from 'react';
 import { useParams, useNavigate } from 'react-router-dom';
-import { essayApi, annotationApi } from '../api/client';
+import { annotationApi, parseJsonField } from '../api/client';
 import type { Essay, Annotation, TraitAnnotation, BlindAnnotationInfo } from '../api/client';
 import './Annotate.css';
 
@@ -55,6 +55,7 @@ export default function Annotate() {
     const [loading, setLoading] = useState(true);
     const [isSidebarOpen, setIsSidebarOpen] = useState(true);
     const [showEvidence, setShowEvidence] = useState(false);
+    const [evidence, setEvidence] = useState<unknown>(null);
 
     // Active trait for selection
     const [activeTrait, setActiveTrait] = useState<TraitType>('content');
@@ -81,33 +82,20 @@ export default function Annotate() {
         setLoading(true);
 
         try {
-            // 1. Fetch all blind annotations for navigation and mapping
-            const allBlindAnnotations = await annotationApi.getBlindAnnotationIds();
-            setBlindAnnotations(allBlindAnnotations);
-
-            // 2. Find the current blind annotation info based on the URL blindId
-            const currentBlindInfo = allBlindAnnotations.find(ba => ba.blind_id === blindId);
-            if (!currentBlindInfo) {
-                console.error(`Blind ID ${blindId} not found.`);
-                navigate('/dashboard'); // Redirect if blindId is invalid
-                return;
-            }
-
-            const essayId = currentBlindInfo.essay_id;
-            setCurrentEssayId(essayId); // Store the actual essayId
-
-            // 3. Fetch essay and annotation data using the actual essayId
-            const [essayData, annotationData] = await Promise.all([
-                essayApi.getEssay(essayId),
-                annotationApi.getAnnotation(essayId)
+            // 1. Fetch the workspace (essay + annotation) and the navigation list in parallel
+            const [allBlindAnnotations, workspace] = await Promise.all([
+                annotationApi.getBlindAnnotationIds(),
+                annotationApi.getWorkspace(blindId)
             ]);
+            setBlindAnnotations(allBlindAnnotations);
 
-            // 프론트엔드에서 문장 분리 재처리 (\n 및 공백 기준)
-            if (essayData && essayData.content) {
-                essayData.sentences = essayData.content.trim().split(/(?<=[.!?])\s+|\n/).filter(s => s.trim().length > 0);
-            }
+            const essayData = workspace.essay;
+            const annotationData = workspace.annotation;
+            setCurrentEssayId(essayData.id); // Store the actual essayId
 
+            // 문장 목록은 서버의 문장 인덱스를 그대로 사용 (selected_sentences 번호와 같은 기준)
             setEssay(essayData);
+            setEvidence(workspace.evidence ?? null);
 
             if (annotationData) {
                 setAnnotation(annotationData);
@@ -182,7 +170,8 @@ export default function Annotate() {
 
         try {
             if (annotation) {
-                await annotationApi.updateAnnotation(annotation.id, data);
+                // 다른 창에서 먼저 저장했다면 409 (version 불일치)
+                await annotationApi.updateAnnotation(annotation.id, { ...data, version: annotation.version });
             } else {
                 await annotationApi.createAnnotation(data);
             }
@@ -259,13 +248,13 @@ export default function Annotate() {
                         </div>
                         <div className="question-box">{essay.question}</div>
                         
-                        {showEvidence && essay.evidence && (
+                        {showEvidence && !!evidence && (
                             <div className="evidence-section">
                                 <h4>📚 채점 참고 근거 (Evidence List)</h4>
                                 <div className="evidence-list">
                                     {(() => {
                                         try {
-                                            const evidenceList = JSON.parse(essay.evidence);
+                                            const evidenceList = parseJsonField(evidence);
                                             return Array.isArray(evidenceList) ? evidenceList.map((item: any, idx: number) => (
                                                 <div key={idx} className="evidence-item">
                                                     <span className="evidence-section-name">[{item.section}]</span>
@@ -374,7 +363,7 @@ export default function Annotate() {
                                 try {
                                     if (essay.summary) {
                                         console.log("Raw essay.summary:", essay.summary); // Debugging line
-                                        const summaryJson = JSON.parse(essay.summary);
+                                        const summaryJson = parseJsonField(essay.summary);
                                         console.log("Parsed summaryJson:", summaryJson); // Debugging line
                                         console.log("summaryJson.feedback:", summaryJson.feedback); // Debugging line
                                         return summaryJson.feedback || "AI 피드백 내용을 찾을 수 없습니다.";
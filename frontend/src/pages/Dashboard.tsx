@@ -42,7 +42,12 @@ export default function Dashboard() {
         }
     };
 
-    const handleLogout = () => {
+    const handleLogout = async () => {
+        try {
+            await authApi.logout();
+        } catch (error) {
+            console.error('Failed to revoke token:', error);
+        }
         logout();
         navigate('/');
     };
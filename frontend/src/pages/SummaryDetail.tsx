@@ -1,12 +1,13 @@
 import { useEffect, useState } from 'react';
 import { useParams, useNavigate } from 'react-router-dom';
 import { essayApi } from '../api/client';
-import type { Essay } from '../api/client';
+import type { Essay, Paper } from '../api/client';
 import './SummaryDetail.css';
 
 export default function SummaryDetail() {
     const { essayId } = useParams<{ essayId: string }>();
     const [essay, setEssay] = useState<Essay | null>(null);
+    const [paper, setPaper] = useState<Paper | null>(null);
     const [loading, setLoading] = useState(true);
     const navigate = useNavigate();
 
@@ -16,6 +17,9 @@ export default function SummaryDetail() {
             try {
                 const data = await essayApi.getEssay(parseInt(essayId));
                 setEssay(data);
+                if (data.paper_id) {
+                    setPaper(await essayApi.getPaper(data.paper_id));
+                }
             } catch (error) {
                 console.error('Failed to load essay summary:', error);
             } finally {
@@ -39,7 +43,7 @@ export default function SummaryDetail() {
                 <div className="summary-info">
                     <h2>{essay.title}</h2>
                     <div className="summary-text">
-                        {essay.paper_summary || '요약 정보가 없습니다.'}
+                        {paper?.summary || '요약 정보가 없습니다.'}
                     </div>
                 </div>
             </div>